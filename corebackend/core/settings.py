@@ -240,5 +240,25 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared between the web processes and the simulator (e.g. plane clusters)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:{os.environ.get('REDIS_PORT', 6379)}/1",
+    },
+}
+
+
+ASGI_APPLICATION = 'core.asgi.py' # for Channels
+
+# Fleet WebSocket fan-out
+# With tile groups enabled, the simulator also publishes positions per web-mercator tile
+# (at FLEET_TILE_ZOOM) and per watched plane, and viewport-subscribed clients only
+# join the groups they can see instead of receiving the whole fleet.
+FLEET_TILE_GROUPS = os.environ.get('FLEET_TILE_GROUPS', '0') == '1'
+FLEET_TILE_ZOOM = int(os.environ.get('FLEET_TILE_ZOOM', 7))
 
-ASGI_APPLICATION = 'core.asgi.py' # for Channels
\ No newline at end of file
+# Track history: the simulator appends every plane's position each tick to the
+# day-partitioned PlanePosition table; partitions older than the retention are dropped.
+FLEET_TRACK_HISTORY = os.environ.get('FLEET_TRACK_HISTORY', '1') == '1'
+FLEET_TRACK_RETENTION_DAYS = int(os.environ.get('FLEET_TRACK_RETENTION_DAYS', 7))
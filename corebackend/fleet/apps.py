@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FleetConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fleet'
+
+    def ready(self):
+        # Register model signal handlers
+        from . import signals  # noqa: F401
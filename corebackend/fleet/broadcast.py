@@ -0,0 +1,35 @@
+import json
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+# Group every fleet WebSocket client is subscribed to.
+FLEET_GROUP = 'fleet_updates'
+# Whole-fleet positions when tile groups are enabled (commands stay on FLEET_GROUP).
+FLEET_POSITIONS_GROUP = 'fleet_positions'
+# Group the simulation engine listens on to pick up admin/API edits incrementally.
+SIMULATION_EVENTS_GROUP = 'simulation_events'
+
+
+def positions_group():
+    """Group that receives the whole fleet's positions every tick."""
+    return FLEET_POSITIONS_GROUP if settings.FLEET_TILE_GROUPS else FLEET_GROUP
+
+
+def encode_message(message_type, data, **extra):
+    """
+    Builds a `broadcast.message` event whose client message is JSON-encoded once, here.
+    Consumers forward the `text` as-is instead of running `json.dumps` per connection,
+    and the channel layer only has to pack a single string per recipient.
+    """
+    return {
+        'type': 'broadcast.message',
+        'text': json.dumps({'type': message_type, 'data': data}),
+        **extra,
+    }
+
+
+def broadcast(message_type, data, group=FLEET_GROUP):
+    """Sends a pre-encoded message to a group from synchronous code (e.g. views)."""
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(group, encode_message(message_type, data))
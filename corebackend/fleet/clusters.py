@@ -0,0 +1,127 @@
+import numpy as np
+from django.core.cache import cache
+from django.db.models import F
+from .models import Plane
+from .simulation.state import X, Y
+from .spatial import split_bbox
+from .tiles import lonlat_to_tile
+
+# Zoom levels served by the clustered plane list; above this the map shows single planes.
+CLUSTER_MIN_ZOOM = 0
+CLUSTER_MAX_ZOOM = 10
+# Clusters at zoom z are the tiles of zoom z + CELL_ZOOM_OFFSET (8x8 cells per map tile).
+CELL_ZOOM_OFFSET = 3
+CLUSTER_CACHE_KEY = 'fleet:clusters:{zoom}'
+# The simulator refreshes the index every few ticks; this only bounds how long a stopped simulator's index lives.
+CLUSTER_CACHE_TIMEOUT = 60
+
+LEVEL_DTYPE = np.dtype([
+    ('x', '<i4'), ('y', '<i4'), ('count', '<i4'), ('lon_sum', '<f8'), ('lat_sum', '<f8'),
+])
+
+
+class ClusterLevel:
+    """Grid clusters of one zoom level: cell coordinates, plane counts and coordinate sums."""
+
+    def __init__(self, zoom, cells):
+        self.zoom = zoom
+        self.cells = cells
+
+    @classmethod
+    def from_positions(cls, zoom, lon, lat):
+        cell_zoom = zoom + CELL_ZOOM_OFFSET
+        x, y = lonlat_to_tile(lon, lat, cell_zoom)
+        keys, inverse = np.unique((x << cell_zoom) | y, return_inverse=True)
+        cells = np.zeros(len(keys), dtype=LEVEL_DTYPE)
+        cells['x'] = keys >> cell_zoom
+        cells['y'] = keys & ((1 << cell_zoom) - 1)
+        cells['count'] = np.bincount(inverse, minlength=len(keys))
+        cells['lon_sum'] = np.bincount(inverse, weights=lon, minlength=len(keys))
+        cells['lat_sum'] = np.bincount(inverse, weights=lat, minlength=len(keys))
+        return cls(zoom, cells)
+
+    def parent(self):
+        """Aggregates this level into the next coarser one (four cells into one)."""
+        cell_zoom = self.zoom - 1 + CELL_ZOOM_OFFSET
+        parent_keys = ((self.cells['x'].astype(np.int64) >> 1) << cell_zoom) | (self.cells['y'] >> 1)
+        keys, inverse = np.unique(parent_keys, return_inverse=True)
+        cells = np.zeros(len(keys), dtype=LEVEL_DTYPE)
+        cells['x'] = keys >> cell_zoom
+        cells['y'] = keys & ((1 << cell_zoom) - 1)
+        for field in ('count', 'lon_sum', 'lat_sum'):
+            cells[field] = np.bincount(inverse, weights=self.cells[field], minlength=len(keys))
+        return ClusterLevel(self.zoom - 1, cells)
+
+    def in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Clusters whose cell overlaps the bbox, which may cross the antimeridian (min_lon > max_lon)."""
+        cell_zoom = self.zoom + CELL_ZOOM_OFFSET
+        cells = self.cells
+        mask = np.zeros(len(cells), dtype=bool)
+        for box in split_bbox(min_lon, min_lat, max_lon, max_lat):
+            x, y = lonlat_to_tile(np.array(box[0::2]), np.array(box[1::2]), cell_zoom)
+            mask |= (cells['x'] >= x[0]) & (cells['x'] <= x[1]) & (cells['y'] >= y[1]) & (cells['y'] <= y[0])
+        return ClusterLevel(self.zoom, cells[mask])
+
+    def features(self):
+        """GeoJSON features with the centroid and plane count of every cluster."""
+        cells = self.cells
+        lon = (cells['lon_sum'] / cells['count']).tolist()
+        lat = (cells['lat_sum'] / cells['count']).tolist()
+        return [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [x, y]},
+                'properties': {'cluster': True, 'count': count},
+            }
+            for x, y, count in zip(lon, lat, cells['count'].tolist())
+        ]
+
+    def to_bytes(self):
+        return self.cells.tobytes()
+
+    @classmethod
+    def from_bytes(cls, zoom, data):
+        return cls(zoom, np.frombuffer(data, dtype=LEVEL_DTYPE))
+
+
+def build_cluster_levels(lon, lat):
+    """
+    Builds every cluster level from the current positions. Only the finest level
+    touches the planes; each coarser level is derived from the one below it.
+    """
+    level = ClusterLevel.from_positions(CLUSTER_MAX_ZOOM, np.asarray(lon), np.asarray(lat))
+    levels = {CLUSTER_MAX_ZOOM: level}
+    while level.zoom > CLUSTER_MIN_ZOOM:
+        level = level.parent()
+        levels[level.zoom] = level
+    return levels
+
+
+def store_cluster_levels(levels):
+    cache.set_many(
+        {CLUSTER_CACHE_KEY.format(zoom=zoom): level.to_bytes() for zoom, level in levels.items()},
+        timeout=CLUSTER_CACHE_TIMEOUT,
+    )
+
+
+def load_cluster_level(zoom):
+    """Returns the cached `ClusterLevel` for `zoom`, or None if the simulator has not published one."""
+    data = cache.get(CLUSTER_CACHE_KEY.format(zoom=zoom))
+    return ClusterLevel.from_bytes(zoom, data) if data is not None else None
+
+
+def cluster_level(zoom):
+    """
+    Returns the clusters of `zoom` published by the simulator. If it is not running,
+    the index is built once from the stored positions and cached the same way.
+    """
+    level = load_cluster_level(zoom)
+    if level is None:
+        positions = np.array(
+            Plane.objects.annotate(lon=X(F('location')), lat=Y(F('location'))).values_list('lon', 'lat'),
+            dtype=float,
+        ).reshape(-1, 2)
+        levels = build_cluster_levels(positions[:, 0], positions[:, 1])
+        store_cluster_levels(levels)
+        level = levels[zoom]
+    return level
@@ -1,7 +1,101 @@
+import asyncio
+import contextlib
+import datetime
 import json
+import numpy as np
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from .broadcast import FLEET_GROUP, FLEET_POSITIONS_GROUP, SIMULATION_EVENTS_GROUP
+from .frames import BINARY_SUBPROTOCOL, COORD_SCALE, DeltaEncoder, unpack_positions
+from .replay import REPLAY_PREFETCH_FRAMES, REPLAY_SLICE, load_slice, parse_replay_request
+from .spatial import PositionGrid, Subscription
+from .tiles import MAX_SUBSCRIBED_TILES, plane_group, tile_group, tiles_for_bbox
 
-class FleetConsumer(AsyncWebsocketConsumer):
+# Tile and plane group messages of one tick arrive separately; wait this long
+# after the first one before sending the client a single combined update.
+GROUP_FLUSH_DELAY = 0.05
+
+# A replay that falls further behind than this (e.g. a slow client at 100x) drops frames to catch up
+REPLAY_MAX_LAG = 1.0
+
+# Reads history off the event loop, in any worker thread (slices are independent queries)
+read_slice = database_sync_to_async(load_slice, thread_sensitive=False)
+
+# Grid of the latest tick, shared by every consumer in this worker process
+# so it is built once per tick rather than once per client.
+_latest_grid = {'tick': None, 'grid': None}
+
+
+def grid_for(event):
+    """Returns the `PositionGrid` of a positions event, reusing it across consumers."""
+    tick = event.get('tick')
+    if tick is not None and _latest_grid['tick'] == tick:
+        return _latest_grid['grid']
+    grid = PositionGrid(*unpack_positions(event['positions']))
+    if tick is not None:
+        _latest_grid.update(tick=tick, grid=grid)
+    return grid
+
+
+class PositionFramesMixin:
+    """Sends position columns as binary delta frames (for clients that opted in) or `plane_locations` JSON."""
+
+    def frame_subprotocol(self):
+        """
+        Clients can opt in to binary delta frames with a subprotocol or `?frames=binary`.
+        Sets up `frame_encoder` and returns the subprotocol to accept.
+        """
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        subprotocol = BINARY_SUBPROTOCOL if BINARY_SUBPROTOCOL in self.scope.get('subprotocols', []) else None
+        self.frame_encoder = DeltaEncoder() if subprotocol or query.get('frames') == ['binary'] else None
+        return subprotocol
+
+    async def parse_message(self, text_data):
+        """
+        Decodes a client message. Returns None, after telling the client, for anything but
+        a JSON object; binary messages (`text_data` None) are ignored.
+        """
+        if text_data is None:
+            return None
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            await self.send(text_data=json.dumps({'type': 'error', 'message': 'Messages must be JSON objects.'}))
+            return None
+        return data
+
+    def receive_frame_control(self, data):
+        """Handles frame acknowledgements and resync requests; returns whether `data` was one."""
+        if self.frame_encoder and data.get('type') == 'ack':
+            seq = data.get('seq')
+            # An ack without a valid sequence number is dropped
+            if isinstance(seq, int) and not isinstance(seq, bool):
+                self.frame_encoder.ack(seq)
+            return True
+        if self.frame_encoder and data.get('type') == 'resync':
+            self.frame_encoder.reset()
+            return True
+        return False
+
+    async def send_columns(self, columns, **extra):
+        """Sends (ids, lon, lat, bearing) columns as a binary delta frame or as JSON (with `extra` keys)."""
+        if self.frame_encoder:
+            await self.send(bytes_data=self.frame_encoder.encode(*columns))
+            return
+
+        ids, lon, lat, bearing = columns
+        data = [
+            {'id': pk, 'coordinates': [x / COORD_SCALE, y / COORD_SCALE], 'bearing': b}
+            for pk, x, y, b in zip(ids.tolist(), lon.tolist(), lat.tolist(), bearing.tolist())
+        ]
+        await self.send(text_data=json.dumps({'type': 'plane_locations', 'data': data, **extra}))
+
+
+class FleetConsumer(PositionFramesMixin, AsyncWebsocketConsumer):
     """
     This consumer manages all real-time updates related to the fleet.
     """
@@ -11,7 +105,7 @@ class FleetConsumer(AsyncWebsocketConsumer):
         Runs when a new WebSocket connection is established.
         """
         # Name of the group where all fleet updates will be broadcast.
-        self.room_group_name = 'fleet_updates'
+        self.room_group_name = FLEET_GROUP
 
         # Include the client in this group.
         # This way, every message sent to this group is also forwarded to this client.
@@ -20,8 +114,21 @@ class FleetConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
+        subprotocol = self.frame_subprotocol()
+        # Set by a `subscribe` message; None means the whole fleet.
+        self.subscription = None
+
+        # With tile groups, positions come from the whole-fleet group or from the
+        # tile/plane groups matching the subscription (see `update_position_groups`).
+        self.position_groups = set()
+        self.watched_ids = set()
+        self.group_positions = {}
+        self.group_flush = None
+        if settings.FLEET_TILE_GROUPS:
+            await self.update_position_groups()
+
         # Accept WebSocket connection.
-        await self.accept()
+        await self.accept(subprotocol=subprotocol)
         print(f"WebSocket connected: {self.channel_name} to group '{self.room_group_name}'")
 
     async def disconnect(self, close_code):
@@ -33,15 +140,37 @@ class FleetConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        if self.group_flush:
+            self.group_flush.cancel()
+        if settings.FLEET_TILE_GROUPS:
+            self.subscription = None
+            await self.update_position_groups(leave_all=True)
         print(f"WebSocket disconnected: {self.channel_name}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         This function runs when a message is received from a client.
         It receives the incoming message and broadcasts it to everyone in the group.
+        Frame acknowledgements and subscriptions are handled here and not broadcast.
         """
-        data = json.loads(text_data)
-        
+        data = await self.parse_message(text_data)
+        if data is None:
+            return
+
+        # e.g. {"type": "subscribe", "bbox": [minLon, minLat, maxLon, maxLat], "plane_ids": [1, 2]}
+        if data.get('type') == 'subscribe':
+            try:
+                self.subscription = Subscription.from_message(data)
+            except (TypeError, ValueError) as e:
+                await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+                return
+            if settings.FLEET_TILE_GROUPS:
+                await self.update_position_groups()
+            return
+
+        if self.receive_frame_control(data):
+            return
+
         # To send incoming message to all clients in the group
         # channel_layer.group_send is used.
         # The 'type' field specifies which method will handle this message.
@@ -61,9 +190,187 @@ class FleetConsumer(AsyncWebsocketConsumer):
         This function runs when a message is received from the 'fleet_updates' group.
         It sends the message to the connected client.
         """
+        # Tile/plane group messages are combined per tick before reaching the client.
+        if 'tile' in event or 'plane' in event:
+            self.collect_group_positions(event)
+            return
+
+        # Binary and subscribed clients get positions built from the packed position columns.
+        if 'positions' in event and (self.frame_encoder or self.subscription):
+            await self.send_positions(event)
+            return
+
+        # Producers using `fleet.broadcast.encode_message` already encoded the message once for everyone.
+        if 'text' in event:
+            await self.send(text_data=event['text'])
+            return
+
         # Extract the actual payload (content) from the incoming event.
         # This payload contains 'type' (e.g.: 'plane_locations') and 'data' fields.
         payload = event['payload']
 
         # Send the received message to the client via WebSocket in JSON format.
-        await self.send(text_data=json.dumps(payload))
\ No newline at end of file
+        await self.send(text_data=json.dumps(payload))
+
+    async def send_positions(self, event):
+        """
+        Sends the positions of a tick, filtered by the client's subscription,
+        as a binary delta frame or as a `plane_locations` JSON message.
+        """
+        if self.subscription:
+            grid = grid_for(event)
+            rows = self.subscription.rows(grid)
+            columns = (grid.ids[rows], grid.lon[rows], grid.lat[rows], grid.bearing[rows])
+        else:
+            columns = unpack_positions(event['positions'])
+        await self.send_columns(columns)
+
+
+    async def update_position_groups(self, leave_all=False):
+        """
+        Joins the tile and plane groups matching the current subscription and leaves the rest.
+        Without a subscription (or for a very large viewport) the whole-fleet group is used.
+        Watched plane ids are reported to the simulator, which only publishes plane groups on demand.
+        """
+        zoom = settings.FLEET_TILE_ZOOM
+        groups, watched_ids = set(), set()
+        if leave_all:
+            pass
+        elif self.subscription is None:
+            groups.add(FLEET_POSITIONS_GROUP)
+        else:
+            if self.subscription.bbox:
+                tiles = {tile for box in self.subscription.boxes for tile in tiles_for_bbox(*box, zoom)}
+                if len(tiles) > MAX_SUBSCRIBED_TILES:
+                    groups.add(FLEET_POSITIONS_GROUP)
+                else:
+                    groups.update(tile_group(zoom, x, y) for x, y in tiles)
+            # The whole-fleet group already carries every plane
+            if FLEET_POSITIONS_GROUP not in groups:
+                watched_ids = set(self.subscription.plane_ids)
+                groups.update(plane_group(pk) for pk in watched_ids)
+
+        for group in groups - self.position_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in self.position_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+            self.group_positions.pop(group, None)
+        self.position_groups = groups
+
+        if watched_ids - self.watched_ids:
+            await self.channel_layer.group_send(
+                SIMULATION_EVENTS_GROUP, {'type': 'plane.watch', 'ids': list(watched_ids - self.watched_ids)}
+            )
+        if self.watched_ids - watched_ids:
+            await self.channel_layer.group_send(
+                SIMULATION_EVENTS_GROUP, {'type': 'plane.unwatch', 'ids': list(self.watched_ids - watched_ids)}
+            )
+        self.watched_ids = watched_ids
+
+    def collect_group_positions(self, event):
+        """Keeps the latest positions of each tile/plane group and schedules a combined send."""
+        group = tile_group(*event['tile']) if 'tile' in event else plane_group(event['plane'])
+        if group not in self.position_groups:
+            return  # Arrived after we left the group
+        self.group_positions[group] = unpack_positions(event['positions'])
+        if self.group_flush is None:
+            self.group_flush = asyncio.create_task(self.flush_group_positions())
+
+    async def flush_group_positions(self):
+        await asyncio.sleep(GROUP_FLUSH_DELAY)
+        self.group_flush = None
+        if not self.group_positions:
+            return
+
+        ids, lon, lat, bearing = (np.concatenate(column) for column in zip(*self.group_positions.values()))
+        # A watched plane can also be inside a subscribed tile
+        ids, first = np.unique(ids, return_index=True)
+        grid = PositionGrid(ids, lon[first], lat[first], bearing[first])
+        rows = self.subscription.rows(grid) if self.subscription else np.arange(len(ids))
+        await self.send_columns((grid.ids[rows], grid.lon[rows], grid.lat[rows], grid.bearing[rows]))
+
+
+class ReplayConsumer(PositionFramesMixin, AsyncWebsocketConsumer):
+    """
+    Streams recorded history as the `plane_locations` frames the live feed sends
+    (JSON or binary delta frames), for incident investigation and map load tests.
+
+    The client sends `{"type": "replay", "from": <ISO 8601>, "to": <ISO 8601>, "speed": 1-100}`
+    and receives `replay_started`, one frame per recorded tick (JSON frames also carry its
+    `time`) and `replay_finished`. `{"type": "stop"}` ends a replay; a new `replay` replaces it.
+    """
+
+    async def connect(self):
+        subprotocol = self.frame_subprotocol()
+        self.replay = None
+        await self.accept(subprotocol=subprotocol)
+
+    async def disconnect(self, close_code):
+        await self.stop_replay()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        data = await self.parse_message(text_data)
+        if data is None:
+            return
+        if data.get('type') == 'replay':
+            try:
+                start, end, speed = parse_replay_request(data)
+            except (TypeError, ValueError) as e:
+                await self.send(text_data=json.dumps({'type': 'error', 'message': str(e)}))
+                return
+            await self.stop_replay()
+            if self.frame_encoder:
+                self.frame_encoder.reset()
+            self.replay = asyncio.create_task(self.play(start, end, speed))
+        elif data.get('type') == 'stop':
+            await self.stop_replay()
+        else:
+            self.receive_frame_control(data)
+
+    async def stop_replay(self):
+        if self.replay:
+            self.replay.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.replay
+            self.replay = None
+
+    async def play(self, start, end, speed):
+        """Sends the frames read by `prefetch`, each at its recorded time divided by `speed`."""
+        # Bounded: the reader waits while playback is this far behind it
+        queue = asyncio.Queue(maxsize=REPLAY_PREFETCH_FRAMES)
+        reader = asyncio.create_task(self.prefetch(queue, start, end))
+        await self.send(text_data=json.dumps({
+            'type': 'replay_started', 'from': start.isoformat(), 'to': end.isoformat(), 'speed': speed,
+        }))
+
+        loop = asyncio.get_running_loop()
+        started_at, origin = loop.time(), start.timestamp()
+        sent = skipped = 0
+        try:
+            while (frame := await queue.get()) is not None:
+                recorded_at, positions = frame
+                delay = started_at + (recorded_at - origin) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -REPLAY_MAX_LAG and not queue.empty():
+                    skipped += 1
+                    continue
+                time = datetime.datetime.fromtimestamp(recorded_at, datetime.timezone.utc).isoformat()
+                await self.send_columns(unpack_positions(positions), time=time)
+                sent += 1
+            await self.send(text_data=json.dumps({'type': 'replay_finished', 'frames': sent, 'skipped': skipped}))
+        finally:
+            reader.cancel()
+
+    async def prefetch(self, queue, start, end):
+        """Reads the window slice by slice, in time order, into `queue`; None marks the end."""
+        try:
+            slice_start = start
+            while slice_start < end:
+                slice_end = min(slice_start + REPLAY_SLICE, end)
+                for frame in await read_slice(slice_start, slice_end):
+                    await queue.put(frame)
+                slice_start = slice_end
+        except Exception as e:
+            await self.send(text_data=json.dumps({'type': 'error', 'message': f'Could not read history: {e}'}))
+        await queue.put(None)
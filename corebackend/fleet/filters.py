@@ -0,0 +1,76 @@
+import datetime
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from .models import Command
+
+# Commands are searched as written: call signs and tail numbers must not be stemmed.
+# The GIN index on the message (see Command.Meta) is built from this exact expression.
+MESSAGE_SEARCH_CONFIG = 'simple'
+MESSAGE_SEARCH_VECTOR = SearchVector('message', config=MESSAGE_SEARCH_CONFIG)
+
+
+def _ids(params, name):
+    try:
+        return [int(value) for value in params[name].split(',') if value]
+    except ValueError:
+        raise ValidationError({name: 'Must be a comma separated list of ids.'})
+
+
+def _time(params, name):
+    # Naive times are UTC, as for the track and replay windows
+    try:
+        value = parse_datetime(params[name]) if params[name] else None
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({name: 'Must be an ISO 8601 date and time.'})
+    return value if timezone.is_aware(value) else timezone.make_aware(value, datetime.timezone.utc)
+
+
+def _bbox(params, name):
+    try:
+        bbox = [float(value) for value in params[name].split(',')]
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4:
+        raise ValidationError({name: 'Must be min_lon,min_lat,max_lon,max_lat.'})
+    return Polygon.from_bbox(bbox)
+
+
+def filter_commands(queryset, params):
+    """
+    Applies the command list filters in `params`, each backed by an index that serves it
+    in (created_at, id) order so filtered lists paginate as cheaply as unfiltered ones:
+
+    - `status`, `pilot`, `plane` (or `plane_id`): comma separated values
+    - `created_after`, `created_before`: ISO 8601 (UTC unless an offset is given), inclusive / exclusive
+    - `bbox`: min_lon,min_lat,max_lon,max_lat around `target_location`
+    - `search`: full-text search on the message (web search syntax: words, "phrases", -excluded, or)
+    - `message`: case-insensitive substring of the message (trigram index)
+    """
+    if params.get('status'):
+        statuses = params['status'].split(',')
+        valid = {value for value, _ in Command.STATUS_CHOICES}
+        if not valid.issuperset(statuses):
+            raise ValidationError({'status': f'Must be one of {", ".join(sorted(valid))}.'})
+        queryset = queryset.filter(status__in=statuses)
+    if params.get('pilot'):
+        queryset = queryset.filter(pilot_id__in=_ids(params, 'pilot'))
+    for name in ('plane', 'plane_id'):
+        if params.get(name):
+            queryset = queryset.filter(plane_id__in=_ids(params, name))
+    if 'created_after' in params:
+        queryset = queryset.filter(created_at__gte=_time(params, 'created_after'))
+    if 'created_before' in params:
+        queryset = queryset.filter(created_at__lt=_time(params, 'created_before'))
+    if 'bbox' in params:
+        queryset = queryset.filter(target_location__within=_bbox(params, 'bbox'))
+    if params.get('search'):
+        query = SearchQuery(params['search'], config=MESSAGE_SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.alias(message_vector=MESSAGE_SEARCH_VECTOR).filter(message_vector=query)
+    if params.get('message'):
+        queryset = queryset.filter(message__icontains=params['message'])
+    return queryset
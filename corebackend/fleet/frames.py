@@ -0,0 +1,117 @@
+"""
+Binary position frames for the fleet WebSocket.
+
+Clients opt in on connect with the `fleet.binary.v1` subprotocol (or `?frames=binary`).
+Every frame is little-endian and 4-byte aligned so it can be read with typed arrays:
+
+    header   uint8 version, uint8 frame type, uint16 flags, uint32 seq, uint32 count, uint32 removed
+    ids      int32[count]
+    lon      int32[count]     degrees * COORD_SCALE
+    lat      int32[count]     degrees * COORD_SCALE
+    bearing  float32[count]
+    removed  int32[removed]   ids the client should drop
+
+Only planes that moved more than the threshold since the last frame the client
+acknowledged (`{"type": "ack", "seq": <seq>}`) are included.
+"""
+import struct
+import numpy as np
+
+BINARY_SUBPROTOCOL = 'fleet.binary.v1'
+FRAME_VERSION = 1
+FRAME_POSITIONS = 1
+FLAG_KEYFRAME = 1
+
+COORD_SCALE = 1_000_000  # ~0.1 m resolution
+DEFAULT_MOVE_THRESHOLD = 100  # in quantized units, ~11 m
+MAX_PENDING_FRAMES = 16
+
+FRAME_HEADER = struct.Struct('<BBHIII')
+
+
+def pack_positions(ids, lon, lat, bearing):
+    """
+    Packs the fleet's positions once per tick into quantized columns, sorted by id.
+    The result travels through the channel layer and is turned into per-client frames by `DeltaEncoder`.
+    """
+    order = np.argsort(ids, kind='stable')
+    columns = [
+        np.asarray(ids)[order].astype('<i4'),
+        np.round(np.asarray(lon)[order] * COORD_SCALE).astype('<i4'),
+        np.round(np.asarray(lat)[order] * COORD_SCALE).astype('<i4'),
+        np.asarray(bearing)[order].astype('<f4'),
+    ]
+    return struct.pack('<I', len(order)) + b''.join(column.tobytes() for column in columns)
+
+
+def unpack_positions(data):
+    """Inverse of `pack_positions`. Returns (ids, lon_q, lat_q, bearing) arrays."""
+    (count,) = struct.unpack_from('<I', data)
+    ids = np.frombuffer(data, dtype='<i4', count=count, offset=4)
+    lon = np.frombuffer(data, dtype='<i4', count=count, offset=4 + 4 * count)
+    lat = np.frombuffer(data, dtype='<i4', count=count, offset=4 + 8 * count)
+    bearing = np.frombuffer(data, dtype='<f4', count=count, offset=4 + 12 * count)
+    return ids, lon, lat, bearing
+
+
+class DeltaEncoder:
+    """
+    Per-client frame encoder.
+
+    Keeps the positions the client has acknowledged as a baseline and sends only
+    the planes that moved beyond `threshold` relative to it. Frames that were sent
+    but not acknowledged yet are kept so an ack can advance the baseline.
+    """
+
+    def __init__(self, threshold=DEFAULT_MOVE_THRESHOLD):
+        self.threshold = threshold
+        self.seq = 0
+        self.pending = {}
+        self.reset()
+
+    def reset(self):
+        """Forgets the baseline; the next frame is a keyframe with the whole fleet."""
+        self.ids = np.empty(0, dtype='<i4')
+        self.lon = np.empty(0, dtype='<i4')
+        self.lat = np.empty(0, dtype='<i4')
+        self.pending.clear()
+
+    def encode(self, ids, lon, lat, bearing):
+        """Builds the next frame from columns produced by `unpack_positions`."""
+        keyframe = not len(self.ids)
+        pos = np.searchsorted(self.ids, ids).clip(max=max(len(self.ids) - 1, 0))
+        known = (self.ids[pos] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+
+        moved = ~known
+        moved[known] = (
+            (np.abs(lon[known] - self.lon[pos[known]]) > self.threshold)
+            | (np.abs(lat[known] - self.lat[pos[known]]) > self.threshold)
+        )
+        removed = self.ids[~np.isin(self.ids, ids)]
+
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self.pending[self.seq] = (ids[moved], lon[moved], lat[moved], removed)
+        while len(self.pending) > MAX_PENDING_FRAMES:
+            self.pending.pop(next(iter(self.pending)))
+
+        header = FRAME_HEADER.pack(
+            FRAME_VERSION, FRAME_POSITIONS, FLAG_KEYFRAME if keyframe else 0,
+            self.seq, int(moved.sum()), len(removed)
+        )
+        return header + b''.join(
+            column.astype(dtype).tobytes()
+            for column, dtype in ((ids[moved], '<i4'), (lon[moved], '<i4'), (lat[moved], '<i4'),
+                                  (bearing[moved], '<f4'), (removed, '<i4'))
+        )
+
+    def ack(self, seq):
+        """Advances the baseline with every pending frame up to and including `seq`."""
+        for frame_seq in [s for s in self.pending if s <= seq]:
+            ids, lon, lat, removed = self.pending.pop(frame_seq)
+            keep = ~np.isin(self.ids, removed)
+            # Later values win: unique() keeps the first occurrence, so put the new rows first
+            all_ids = np.concatenate([ids, self.ids[keep]])
+            all_ids, first = np.unique(all_ids, return_index=True)
+            self.ids = all_ids
+            self.lon = np.concatenate([lon, self.lon[keep]])[first]
+            self.lat = np.concatenate([lat, self.lat[keep]])[first]
@@ -0,0 +1,68 @@
+import asyncio
+import time
+import msgpack
+import numpy as np
+from django.core.management.base import BaseCommand
+from fleet.broadcast import encode_message
+from fleet.consumers import FleetConsumer
+
+
+def make_locations(count, rng):
+    """Synthetic `plane_locations` data shaped like the simulator's payload."""
+    lon = rng.uniform(26, 45, count)
+    lat = rng.uniform(36, 42, count)
+    bearing = rng.uniform(0, 360, count)
+    return [
+        {'id': i, 'coordinates': [x, y], 'bearing': b}
+        for i, x, y, b in zip(range(1, count + 1), lon.tolist(), lat.tolist(), bearing.tolist())
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Measures per-tick CPU of a fleet broadcast as the number of WebSocket consumers grows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', type=int, default=10000, help='Number of planes in the payload.')
+        parser.add_argument(
+            '--consumers', type=int, nargs='+', default=[1, 10, 100, 500],
+            help='Consumer counts to measure.'
+        )
+
+    async def _tick_cpu(self, event, consumer_count):
+        """
+        CPU seconds for one tick: the channel layer packs the event once per recipient
+        (as channels_redis does) and every consumer handles it.
+        """
+        consumers = []
+        for _ in range(consumer_count):
+            consumer = FleetConsumer()
+            consumer.frame_encoder = None
+            consumer.send = self._discard
+            consumers.append(consumer)
+
+        started = time.process_time()
+        for consumer in consumers:
+            received = msgpack.unpackb(msgpack.packb(event))
+            await consumer.broadcast_message(received)
+        return time.process_time() - started
+
+    @staticmethod
+    async def _discard(text_data=None, bytes_data=None):
+        pass
+
+    def handle(self, *args, **kwargs):
+        locations = make_locations(kwargs['planes'], np.random.default_rng(0))
+
+        # Before: the dict travels through the layer and is JSON-encoded by each consumer
+        per_consumer = {'type': 'broadcast.message', 'payload': {'type': 'plane_locations', 'data': locations}}
+
+        self.stdout.write(f"{'consumers':>10} {'per-consumer (s)':>18} {'encode once (s)':>17} {'speedup':>9}")
+        for count in kwargs['consumers']:
+            before = asyncio.run(self._tick_cpu(per_consumer, count))
+
+            started = time.process_time()
+            encoded = encode_message('plane_locations', locations)
+            encode_cost = time.process_time() - started
+            after = encode_cost + asyncio.run(self._tick_cpu(encoded, count))
+
+            self.stdout.write(f"{count:>10} {before:>18.3f} {after:>17.3f} {before / after:>8.1f}x")
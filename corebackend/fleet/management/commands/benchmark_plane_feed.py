@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from fleet.models import Plane
+from fleet.serializers import PlaneFeatureSerializer, plane_features
+from fleet.views import PlaneViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compares the GeoJSON plane feed built by PlaneFeatureSerializer with the raw-row fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per variant; the best one is reported.')
+
+    def _best(self, build, repeat):
+        """Best wall time of `repeat` runs, including the query and JSON rendering."""
+        renderer = JSONRenderer()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = renderer.render({'type': 'FeatureCollection', 'features': build()})
+            timings.append(time.perf_counter() - started)
+        return min(timings), body
+
+    def handle(self, *args, **kwargs):
+        # The same projection PlaneViewSet.list uses
+        queryset = Plane.objects.select_related('pilot__user').only(
+            *PlaneViewSet.FEATURE_FIELDS, *PlaneViewSet.PILOT_FIELDS
+        )
+        count = queryset.count()
+        repeat = max(1, kwargs['repeat'])
+
+        serializer_time, serializer_body = self._best(lambda: PlaneFeatureSerializer(queryset, many=True).data, repeat)
+        fast_time, fast_body = self._best(lambda: plane_features(queryset), repeat)
+
+        self.stdout.write(f"{count} planes, best of {repeat}")
+        self.stdout.write(f"{'serializer':>12} {serializer_time * 1000:>9.1f} ms  ({serializer_time / max(count, 1) * 1e6:.1f} us/plane)")
+        self.stdout.write(f"{'raw rows':>12} {fast_time * 1000:>9.1f} ms  ({fast_time / max(count, 1) * 1e6:.1f} us/plane)")
+        self.stdout.write(f"{'speedup':>12} {serializer_time / fast_time:>8.1f}x")
+        if serializer_body == fast_body:
+            self.stdout.write(self.style.SUCCESS(f"Output is byte-identical ({len(fast_body)} bytes)."))
+        else:
+            self.stdout.write(self.style.ERROR("Output differs from the serializer!"))
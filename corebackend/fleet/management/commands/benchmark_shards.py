@@ -0,0 +1,71 @@
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from fleet.clusters import build_cluster_levels
+from fleet.frames import pack_positions
+from fleet.simulation.publishing import TilePublisher
+from fleet.simulation.sharding import ShardCoordinator
+
+# Per-tick columns, in milliseconds (medians over the measured ticks)
+COLUMNS = ('tick', 'compute', 'persist', 'payload', 'pack', 'clusters', 'tiles')
+
+
+class Command(BaseCommand):
+    help = 'Measures how the sharded simulation tick scales with the shard count, on the planes in the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8], help='Shard counts to compare.')
+        parser.add_argument('--ticks', type=int, default=10, help='Measured ticks per shard count, after one warm-up tick.')
+        parser.add_argument(
+            '--persist',
+            action='store_true',
+            help='Also write the positions every tick, as the simulator does (this moves the planes in the database).'
+        )
+
+    def _measure(self, shards, ticks, persist):
+        """Median per-tick timings of one shard count; `tick` is the wait for the shards."""
+        publisher = TilePublisher(settings.FLEET_TILE_ZOOM) if settings.FLEET_TILE_GROUPS else None
+        coordinator = ShardCoordinator(shards, seed=0)
+        planes = coordinator.start()
+        rows = []
+        try:
+            coordinator.tick(2, persist=persist)
+            for tick in range(ticks):
+                started = time.perf_counter()
+                fleet = coordinator.tick(2, persist=persist)
+                row = [
+                    time.perf_counter() - started,
+                    max(compute for compute, _, _ in coordinator.last_timings),
+                    max(persist for _, persist, _ in coordinator.last_timings),
+                ]
+                # What the coordinator then does itself (see run_simulation.tick_outputs and refresh_clusters)
+                for build in (
+                    fleet.payload,
+                    lambda: pack_positions(fleet.ids, fleet.lon, fleet.lat, fleet.bearing),
+                    lambda: build_cluster_levels(fleet.lon, fleet.lat),
+                    lambda: publisher.messages(fleet, tick) if publisher else None,
+                ):
+                    started = time.perf_counter()
+                    build()
+                    row.append(time.perf_counter() - started)
+                rows.append(row)
+        finally:
+            coordinator.stop()
+        return planes, [statistics.median(column) * 1000 for column in zip(*rows)]
+
+    def handle(self, *args, **kwargs):
+        ticks = max(1, kwargs['ticks'])
+        self.stdout.write(f"{'shards':>6} " + ' '.join(f'{column:>9}' for column in COLUMNS) + f" {'serial':>9} {'speedup':>8}")
+        baseline = None
+        for shards in kwargs['shards']:
+            planes, timings = self._measure(shards, ticks, kwargs['persist'])
+            total = timings[0] + sum(timings[3:])
+            baseline = baseline or total
+            self.stdout.write(
+                f"{shards:>6} " + ' '.join(f'{value:>9.1f}' for value in timings)
+                + f" {sum(timings[3:]):>9.1f} {baseline / total:>7.2f}x"
+            )
+        self.stdout.write(f"{planes} planes, median of {ticks} ticks, in ms; 'serial' is the coordinator's own share.")
+        style = self.style.SUCCESS if total < 2000 else self.style.ERROR
+        self.stdout.write(style(f"The last run needs {total:.0f} ms of the 2000 ms tick interval."))
@@ -0,0 +1,41 @@
+import datetime
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from fleet.simulation.persistence import record_positions
+from fleet.tracks import ensure_partitions
+
+
+class Command(BaseCommand):
+    help = 'Measures track history ingestion (COPY into the partitioned table) with synthetic positions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', type=int, default=10000)
+        parser.add_argument('--ticks', type=int, default=30, help='Ticks of positions to write, 2 s apart.')
+        parser.add_argument('--batch', type=int, default=5, help='Ticks per COPY, as the track recorder does.')
+
+    def handle(self, *args, **kwargs):
+        planes, ticks, batch = kwargs['planes'], kwargs['ticks'], max(1, kwargs['batch'])
+        rng = np.random.default_rng(0)
+        ids = np.arange(1, planes + 1)
+        start = timezone.now() - datetime.timedelta(seconds=2 * ticks)
+        batches = [
+            (start + datetime.timedelta(seconds=2 * tick), ids, rng.uniform(26, 45, planes),
+             rng.uniform(36, 42, planes), rng.uniform(0, 360, planes))
+            for tick in range(ticks)
+        ]
+        ensure_partitions()
+
+        # Rolled back at the end, so the benchmark leaves no rows behind
+        with transaction.atomic():
+            started = time.perf_counter()
+            rows = sum(record_positions(batches[i:i + batch]) for i in range(0, ticks, batch))
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        needed = planes / 2
+        self.stdout.write(f"{rows} rows in {elapsed * 1000:.0f} ms: {rows / elapsed:,.0f} rows/s")
+        style = self.style.SUCCESS if rows / elapsed >= needed else self.style.ERROR
+        self.stdout.write(style(f"The simulator produces {needed:,.0f} rows/s for {planes} planes at one tick per 2 s."))
@@ -0,0 +1,80 @@
+import datetime
+import json
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from fleet.models import PlanePosition
+from fleet.simulation.persistence import record_positions
+from fleet.tracks import TRACK_RESOLUTION, ensure_partitions, plane_track
+
+# Synthetic plane ids, far above real ones (track rows have no foreign key)
+FIRST_PLANE_ID = 10 ** 12
+
+
+class Command(BaseCommand):
+    help = 'Measures 24h track queries for several planes: raw rows versus the downsampled, simplified LineString.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--planes', type=int, default=10)
+        parser.add_argument('--hours', type=int, default=24)
+        parser.add_argument('--tolerance', type=float, default=50, help='Simplification tolerance in meters.')
+
+    def _synthetic_tracks(self, planes, end, hours):
+        """Writes `hours` of 2 s positions for `planes` planes flying smooth curves."""
+        rng = np.random.default_rng(0)
+        ticks = hours * 3600 // TRACK_RESOLUTION
+        start = end - datetime.timedelta(hours=hours)
+        ids = np.arange(FIRST_PLANE_ID, FIRST_PLANE_ID + planes)
+        lon, lat = rng.uniform(26, 45, planes), rng.uniform(36, 42, planes)
+        heading = rng.uniform(0, 2 * np.pi, planes)
+        batch = []
+        for tick in range(ticks):
+            heading += rng.normal(0, 0.01, planes)
+            lon += 0.002 * np.cos(heading)
+            lat += 0.002 * np.sin(heading)
+            batch.append((start + datetime.timedelta(seconds=tick * TRACK_RESOLUTION), ids, lon.copy(), lat.copy(),
+                          np.degrees(heading) % 360))
+            if len(batch) == 500:
+                record_positions(batch)
+                batch = []
+        record_positions(batch)
+        return start, ids.tolist()
+
+    def handle(self, *args, **kwargs):
+        planes, hours = kwargs['planes'], kwargs['hours']
+        end = timezone.now()
+        for offset in range(hours // 24 + 2):
+            ensure_partitions(end.date() - datetime.timedelta(days=offset), days_ahead=0)
+
+        # Rolled back at the end, so the benchmark leaves no rows behind
+        with transaction.atomic():
+            self.stdout.write(f"Writing {hours}h of positions for {planes} planes...")
+            start, ids = self._synthetic_tracks(planes, end, hours)
+
+            started = time.perf_counter()
+            raw_points = raw_bytes = 0
+            for plane_id in ids:
+                rows = list(PlanePosition.objects.filter(
+                    plane_id=plane_id, recorded_at__gte=start, recorded_at__lt=end
+                ).order_by('recorded_at').values_list('lon', 'lat'))
+                raw_points += len(rows)
+                raw_bytes += len(json.dumps({'type': 'LineString', 'coordinates': rows}))
+            raw_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            points = track_bytes = 0
+            for plane_id in ids:
+                track = plane_track(plane_id, start, end, kwargs['tolerance'])
+                points += track['properties']['points']
+                track_bytes += len(json.dumps(track, default=str))
+            track_time = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'raw rows':>12} {raw_time * 1000:>9.1f} ms  {raw_points:>9} points  {raw_bytes / 1024:>9.0f} KiB")
+        self.stdout.write(f"{'track':>12} {track_time * 1000:>9.1f} ms  {points:>9} points  {track_bytes / 1024:>9.0f} KiB")
+        self.stdout.write(self.style.SUCCESS(
+            f"{raw_points / max(points, 1):.0f}x fewer points, {raw_bytes / max(track_bytes, 1):.0f}x fewer bytes."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from fleet.tracks import existing_partitions, rollover
+
+
+class Command(BaseCommand):
+    help = 'Creates upcoming track history partitions and drops the ones past FLEET_TRACK_RETENTION_DAYS.'
+
+    def handle(self, *args, **kwargs):
+        # The simulator also does this hourly; running it from cron covers periods it is stopped
+        dropped = rollover()
+        for name in dropped:
+            self.stdout.write(f"Dropped {name}")
+        days = [day for day, _ in existing_partitions()]
+        if days:
+            self.stdout.write(self.style.SUCCESS(f"{len(days)} partitions, {days[0]} to {days[-1]}."))
@@ -1,115 +1,213 @@
-import time
 import asyncio
-import random
-import math
+import uuid
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from channels.layers import get_channel_layer
 from asgiref.sync import sync_to_async
-from django.db import transaction
-from fleet.models import Plane, Airport
-
-# --- HELPER FUNCTIONS ---
-def get_random_item(items):
-    """Returns a random object from a given list or queryset."""
-    if not items:
-        return None
-    return random.choice(list(items))
-
-def calculate_bearing(lat1, lon1, lat2, lon2):
-    """Calculates the initial bearing between two coordinates."""
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-
-    dLon = lon2_rad - lon1_rad
-    x = math.cos(lat2_rad) * math.sin(dLon)
-    y = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(dLon)
-    
-    initial_bearing = math.atan2(x, y)
-    initial_bearing = math.degrees(initial_bearing)
-    return (initial_bearing + 360) % 360
-
-def calculate_new_position(lat, lon, bearing, distance_km):
-    """Calculates a new point from a given point in a specific direction and distance."""
-    R = 6371  # Earth's radius (km)
-    lat_rad = math.radians(lat)
-    lon_rad = math.radians(lon)
-    bearing_rad = math.radians(bearing)
-
-    new_lat_rad = math.asin(math.sin(lat_rad) * math.cos(distance_km / R) +
-                            math.cos(lat_rad) * math.sin(distance_km / R) * math.cos(bearing_rad))
-    new_lon_rad = lon_rad + math.atan2(math.sin(bearing_rad) * math.sin(distance_km / R) * math.cos(lat_rad),
-                                       math.cos(distance_km / R) - math.sin(lat_rad) * math.sin(new_lat_rad))
-
-    return (math.degrees(new_lat_rad), math.degrees(new_lon_rad))
+from fleet.broadcast import SIMULATION_EVENTS_GROUP, encode_message, positions_group
+from fleet.clusters import build_cluster_levels, store_cluster_levels
+from fleet.frames import pack_positions
+from fleet.simulation.persistence import TrackRecorder, WriteBehindFlusher
+from fleet.simulation.profiling import TickProfiler
+from fleet.simulation.publishing import TilePublisher
+from fleet.simulation.scheduler import TickScheduler
+from fleet.simulation.sharding import ShardCoordinator
+from fleet.simulation.state import FleetState
+from fleet.vector_tiles import set_current_tick
+
+# Seconds between two tick boundaries
+TICK_INTERVAL = 2
+# Ticks between two refreshes of the low-zoom clusters
+CLUSTER_REFRESH_TICKS = 5
+
+@sync_to_async
+def load_fleet_state():
+    """Loads the fleet once into the resident simulation state."""
+    state = FleetState()
+    state.load()
+    return state
 
 @sync_to_async
-def update_plane_positions_in_db():
+def advance_fleet_state(state, time_delta_in_seconds, scheduler, full_delta=False, publisher=None, tick=None):
     """
-    Updates the positions of all aircraft in the database.
+    Advances the resident fleet state and returns the WebSocket payload, the packed
+    position columns used for binary frames and the per-tile messages (if any).
     This function is designed to run in an asynchronous environment.
     """
-    time_delta_in_seconds = 2
-    planes_to_update = []
-    
-    # Efficiently fetch all aircraft and related airport data in a single query
-    all_planes = list(Plane.objects.select_related('origin', 'destination').all())
-    all_airports = list(Airport.objects.all())
-
-    if not all_airports:
-        return []
-
-    for plane in all_planes:
-        step_distance = plane.speed * time_delta_in_seconds
-        
-        # Calculate the bearing from the plane's current location to its destination
-        bearing = calculate_bearing(plane.location.y, plane.location.x, plane.destination.location.y, plane.destination.location.x)
-        plane.bearing = bearing
-        
-        # Calculate new position
-        new_lat, new_lon = calculate_new_position(plane.location.y, plane.location.x, plane.bearing, step_distance)
-        
-        # Check if the destination has been reached
-        # (With a simple approach, if the new location "passes over" the target, it is considered to have reached the target)
-        current_dest_bearing = calculate_bearing(new_lat, new_lon, plane.destination.location.y, plane.destination.location.x)
-        if abs(current_dest_bearing - plane.bearing) > 90: # If direction deviates more than 90 degrees, we have passed the target
-            plane.location.y = plane.destination.location.y
-            plane.location.x = plane.destination.location.x
-            
-            # Determine a new route
-            plane.origin = plane.destination
-            new_dest = get_random_item(all_airports)
-            while new_dest and new_dest.code == plane.origin.code:
-                new_dest = get_random_item(all_airports)
-            
-            if new_dest:
-                plane.destination = new_dest
-            else:
-                # Skip simulation if no airport is left
-                continue
-        else:
-            plane.location.y = new_lat
-            plane.location.x = new_lon
-        
-        planes_to_update.append(plane)
-    
-    # Update all aircraft with a single database operation (critical for performance)
-    if planes_to_update:
-        Plane.objects.bulk_update(planes_to_update, ['location', 'bearing', 'origin', 'destination'])
-
-    # Prepare the WebSocket payload
-    payload = [
-        {'id': p.id, 'coordinates': [p.location.x, p.location.y], 'bearing': p.bearing} 
-        for p in planes_to_update
-    ]
-    return payload
+    # Pick up admin edits (new planes, deletions, pilot reassignment) incrementally
+    with scheduler.phase('load'):
+        state.refresh(full_delta=full_delta)
+    with scheduler.phase('compute'):
+        state.advance(time_delta_in_seconds)
+    with scheduler.phase('publish'):
+        return tick_outputs(state, publisher, tick)
+
+@sync_to_async
+def advance_shards(coordinator, time_delta_in_seconds, scheduler, events, full_delta=False, persist=True, publisher=None, tick=None):
+    """
+    Sharded `advance_fleet_state`: the shard processes advance (and persist) in parallel.
+    Also returns the merged fleet, which is not kept anywhere else.
+    """
+    fleet = coordinator.tick(time_delta_in_seconds, full_delta=full_delta, events=events, persist=persist)
+    # Shards run in parallel, so the slowest one is what the tick waited for
+    scheduler.record_phase('compute', max(compute for compute, _, _ in coordinator.last_timings))
+    scheduler.record_phase('persist', max(persist for _, persist, _ in coordinator.last_timings))
+    with scheduler.phase('publish'):
+        return fleet, tick_outputs(fleet, publisher, tick)
+
+def tick_outputs(fleet, publisher, tick):
+    """Builds the payload, packed positions and tile messages of a tick."""
+    tile_messages = publisher.messages(fleet, tick) if publisher else []
+    return fleet.payload(), pack_positions(fleet.ids, fleet.lon, fleet.lat, fleet.bearing), tile_messages
+
+@sync_to_async(thread_sensitive=False)
+def refresh_clusters(lon, lat):
+    """Rebuilds the low-zoom clusters, which plane lists read from the cache instead of clustering per request."""
+    store_cluster_levels(build_cluster_levels(lon, lat))
+
+@sync_to_async
+def flush_now(flusher, scheduler):
+    """Persists the dirty rows on the simulation thread, before the broadcast."""
+    with scheduler.phase('persist'):
+        flusher.write(flusher.snapshot())
+
+# Runs in its own worker thread (and DB connection) so it never blocks a tick
+write_behind = sync_to_async(WriteBehindFlusher.write, thread_sensitive=False)
+record_tracks = sync_to_async(TrackRecorder.write, thread_sensitive=False)
 
 
 class Command(BaseCommand):
     help = 'Runs the real-time plane location simulation.'
 
-    async def _simulation_loop(self):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resync-every',
+            type=int,
+            default=15,
+            help='Run the updated_at delta query every N ticks to catch edits missed by change notifications.'
+        )
+        parser.add_argument(
+            '--write-behind',
+            action='store_true',
+            help='Broadcast every tick and persist positions from a separate task at --flush-interval.'
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            default=10.0,
+            help='Seconds between database flushes in write-behind mode.'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=1,
+            help='Split the fleet by plane id across this many worker processes.'
+        )
+        parser.add_argument(
+            '--report-every',
+            type=int,
+            default=30,
+            help='Log tick latency, throughput, overrun and phase statistics every N ticks.'
+        )
+        parser.add_argument(
+            '--profile',
+            type=int,
+            default=0,
+            metavar='TICKS',
+            help='Run cProfile over the first TICKS ticks (in this process; shards are not profiled).'
+        )
+        parser.add_argument(
+            '--profile-output',
+            help='Write the --profile stats to this file instead of printing the top entries.'
+        )
+
+    async def _listen_for_events(self, channel_layer, pending_events):
+        """Collects change notifications sent by `fleet.signals` until the next tick drains them."""
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(SIMULATION_EVENTS_GROUP, channel)
+        while True:
+            try:
+                pending_events.append(await channel_layer.receive(channel))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Could not receive simulation event: {e}"))
+                await asyncio.sleep(5)
+                await channel_layer.group_add(SIMULATION_EVENTS_GROUP, channel)
+
+    async def _flush(self, flusher, snapshot, tick):
+        """Write-behind task: persists a snapshot taken between two ticks."""
+        try:
+            await write_behind(flusher, snapshot)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Write-behind flush failed: {e}"))
+            return
+        await self._set_current_tick(tick)
+        metrics = flusher.metrics()
+        self.stdout.write(
+            f"Flushed {metrics['last_flush_rows']} planes in {metrics['last_flush_seconds'] * 1000:.0f} ms "
+            f"(dirty: {metrics['dirty_rows']}, lag: {metrics['flush_lag_seconds']:.1f}s)"
+        )
+
+    async def _set_current_tick(self, tick):
+        """
+        Vector tiles rendered from now on see this tick's positions. On failure tiles are
+        served for the previous tick (for at most TILE_CACHE_TIMEOUT), so the tick goes on.
+        """
+        try:
+            await sync_to_async(set_current_tick)(tick)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Could not set the current tick: {e}"))
+
+    async def _record_tracks(self, recorder, batches):
+        """Background task: appends buffered ticks to the track history."""
+        try:
+            await record_tracks(recorder, batches)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Track history write failed: {e}"))
+
+    async def _refresh_clusters(self, lon, lat):
+        """Background task: a failure leaves the previous clusters in place until the next refresh."""
+        try:
+            await refresh_clusters(lon, lat)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"Cluster refresh failed: {e}"))
+
+    def _start_cluster_refresh(self, tick, task, lon, lat):
+        """Starts a cluster refresh every CLUSTER_REFRESH_TICKS ticks unless the previous one still runs."""
+        if tick % CLUSTER_REFRESH_TICKS != 1 or (task is not None and not task.done()):
+            return task
+        # Copied, as the simulation moves on while the task runs
+        return asyncio.create_task(self._refresh_clusters(lon.copy(), lat.copy()))
+
+    async def _publish(self, channel_layer, publisher, tick_id, updated_locations, packed_positions, tile_messages):
+        """Broadcasts a tick; returns the bytes handed to the channel layer (before its own encoding)."""
+        sent_bytes = 0
+        if updated_locations:
+            # Encoded once here instead of once per connected consumer;
+            # `positions` is consumed by binary and subscribed clients, `tick` lets
+            # consumers in the same process share one spatial index per tick
+            message = encode_message('plane_locations', updated_locations, positions=packed_positions, tick=tick_id)
+            await channel_layer.group_send(positions_group(), message)
+            sent_bytes += len(message['text']) + len(packed_positions)
+        if tile_messages:
+            await publisher.publish(channel_layer, tile_messages)
+            sent_bytes += sum(len(event['positions']) for _, event in tile_messages)
+        return sent_bytes
+
+    async def _end_tick(self, scheduler, tick, report_every, planes, sent_bytes, detail=''):
+        """Reports overruns and periodic statistics, then waits for the next tick boundary."""
+        overruns = scheduler.stats.overruns
+        delay = scheduler.finish_tick(planes, sent_bytes)
+        if scheduler.stats.overruns > overruns:
+            self.stdout.write(self.style.WARNING(
+                f"Tick {tick} overran the {scheduler.interval} s interval; "
+                f"the next tick coalesces the skipped time{detail}"
+            ))
+        if tick % report_every == 0:
+            self.stdout.write(f"Tick stats: {scheduler.stats.report()}")
+            scheduler.stats.reset()
+        await asyncio.sleep(delay)
+
+    async def _simulation_loop(self, resync_every, write_behind_interval=None, report_every=30, profiler=None):
         self.stdout.write(self.style.SUCCESS("Starting real-time simulation engine..."))
         channel_layer = get_channel_layer()
 
@@ -117,29 +215,157 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR("Cannot get channel layer. Is Redis running and configured?"))
             return
 
-        while True:
-            try:
-                updated_locations = await update_plane_positions_in_db()
-
-                if updated_locations:
-                    await channel_layer.group_send(
-                        'fleet_updates',
-                        {
-                            'type': 'broadcast.message',
-                            'payload': {
-                                'type': 'plane_locations',
-                                'data': updated_locations
-                            }
-                        }
+        pending_events = []
+        listener = asyncio.create_task(self._listen_for_events(channel_layer, pending_events))
+
+        state = await load_fleet_state()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(state)} planes into the simulation state."))
+
+        flusher = WriteBehindFlusher(state)
+        flush_task = None
+        recorder = TrackRecorder(state) if settings.FLEET_TRACK_HISTORY else None
+        track_task = None
+        cluster_task = None
+        loop = asyncio.get_running_loop()
+        next_flush_at = loop.time() + (write_behind_interval or 0)
+
+        # Identifies this run so tick numbers of a restarted simulator never collide
+        run_id = uuid.uuid4().hex[:8]
+        # With tile groups, positions are also sharded per web-mercator tile and watched plane
+        publisher = TilePublisher(settings.FLEET_TILE_ZOOM) if settings.FLEET_TILE_GROUPS else None
+
+        scheduler = TickScheduler(TICK_INTERVAL, profiler=profiler)
+        tick = 0
+        try:
+            while True:
+                try:
+                    tick += 1
+                    # Planes advance by the time that actually passed, not the nominal interval
+                    time_delta = scheduler.start_tick()
+                    # Events are applied here on the loop thread, never while the state is being updated
+                    with scheduler.phase('load'):
+                        for event in pending_events:
+                            state.note_event(event)
+                            if publisher:
+                                publisher.note_event(event)
+                        pending_events.clear()
+
+                    tick_id = f'{run_id}:{tick}'
+                    outputs = await advance_fleet_state(
+                        state, time_delta, scheduler, full_delta=tick % resync_every == 0, publisher=publisher, tick=tick_id
                     )
-                
-                await asyncio.sleep(2)
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"An error occurred in simulation loop: {e}"))
-                await asyncio.sleep(5)
+                    cluster_task = self._start_cluster_refresh(tick, cluster_task, state.lon, state.lat)
+                    if not write_behind_interval:
+                        await flush_now(flusher, scheduler)
+                        await self._set_current_tick(tick_id)
+                    elif loop.time() >= next_flush_at and (flush_task is None or flush_task.done()):
+                        # The snapshot is taken here, between ticks, and written in the background
+                        next_flush_at = loop.time() + write_behind_interval
+                        with scheduler.phase('persist'):
+                            snapshot = flusher.snapshot()
+                        flush_task = asyncio.create_task(self._flush(flusher, snapshot, tick_id))
+                    if recorder:
+                        with scheduler.phase('persist'):
+                            recorder.sample()
+                        if recorder.due() and (track_task is None or track_task.done()):
+                            track_task = asyncio.create_task(self._record_tracks(recorder, recorder.take()))
+
+                    with scheduler.phase('publish'):
+                        sent_bytes = await self._publish(channel_layer, publisher, tick_id, *outputs)
+                    await self._end_tick(scheduler, tick, report_every, len(state), sent_bytes)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"An error occurred in simulation loop: {e}"))
+                    await asyncio.sleep(5)
+        finally:
+            listener.cancel()
+            if recorder:
+                if track_task:
+                    await asyncio.wait([track_task])
+                await self._record_tracks(recorder, recorder.take())
+            if write_behind_interval:
+                # Do not lose the positions simulated since the last flush
+                if flush_task:
+                    await asyncio.wait([flush_task])
+                await self._flush(flusher, flusher.snapshot(), f'{run_id}:{tick}')
+
+    async def _sharded_loop(self, coordinator, resync_every, write_behind_interval=None, report_every=30, profiler=None):
+        """
+        Like `_simulation_loop`, with the fleet split across `coordinator`'s worker processes.
+        Each shard persists its own rows (every tick, or every flush interval in write-behind
+        mode); this process merges their positions into one broadcast per tick.
+        """
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            self.stdout.write(self.style.ERROR("Cannot get channel layer. Is Redis running and configured?"))
+            return
+
+        pending_events = []
+        listener = asyncio.create_task(self._listen_for_events(channel_layer, pending_events))
+        cluster_task = None
+        loop = asyncio.get_running_loop()
+        next_flush_at = loop.time() + (write_behind_interval or 0)
+        run_id = uuid.uuid4().hex[:8]
+        publisher = TilePublisher(settings.FLEET_TILE_ZOOM) if settings.FLEET_TILE_GROUPS else None
+
+        scheduler = TickScheduler(TICK_INTERVAL, profiler=profiler)
+        tick = 0
+        try:
+            while True:
+                try:
+                    tick += 1
+                    time_delta = scheduler.start_tick()
+                    events = list(pending_events)
+                    pending_events.clear()
+                    if publisher:
+                        for event in events:
+                            publisher.note_event(event)
+
+                    persist = not write_behind_interval or loop.time() >= next_flush_at
+                    if persist and write_behind_interval:
+                        next_flush_at = loop.time() + write_behind_interval
+
+                    tick_id = f'{run_id}:{tick}'
+                    fleet, outputs = await advance_shards(
+                        coordinator, time_delta, scheduler, events, full_delta=tick % resync_every == 0,
+                        persist=persist, publisher=publisher, tick=tick_id
+                    )
+                    if persist:
+                        await self._set_current_tick(tick_id)
+                    cluster_task = self._start_cluster_refresh(tick, cluster_task, fleet.lon, fleet.lat)
+                    with scheduler.phase('publish'):
+                        sent_bytes = await self._publish(channel_layer, publisher, tick_id, *outputs)
+
+                    slowest = max(range(coordinator.shards), key=lambda i: sum(coordinator.last_timings[i][:2]))
+                    compute, write, rows = coordinator.last_timings[slowest]
+                    await self._end_tick(scheduler, tick, report_every, coordinator.planes, sent_bytes, detail=(
+                        f" (slowest shard {slowest}: compute {compute * 1000:.0f} ms, "
+                        f"persist {write * 1000:.0f} ms for {rows} rows)"
+                    ))
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"An error occurred in simulation loop: {e}"))
+                    await asyncio.sleep(5)
+        finally:
+            listener.cancel()
+            # Each shard writes its remaining positions before exiting
+            await sync_to_async(coordinator.stop)()
 
     def handle(self, *args, **kwargs):
+        resync_every = max(1, kwargs['resync_every'])
+        write_behind_interval = kwargs['flush_interval'] if kwargs['write_behind'] else None
+        report_every = max(1, kwargs['report_every'])
+        profiler = TickProfiler(kwargs['profile'], kwargs['profile_output'], self.stdout) if kwargs['profile'] else None
         try:
-            asyncio.run(self._simulation_loop())
+            if kwargs['shards'] > 1:
+                # Workers are forked before the event loop (and any thread or connection) starts
+                coordinator = ShardCoordinator(kwargs['shards'])
+                planes = coordinator.start()
+                self.stdout.write(self.style.SUCCESS(f"Loaded {planes} planes into {kwargs['shards']} simulation shards."))
+                asyncio.run(self._sharded_loop(coordinator, resync_every, write_behind_interval, report_every, profiler))
+            else:
+                asyncio.run(self._simulation_loop(resync_every, write_behind_interval, report_every, profiler))
         except KeyboardInterrupt:
-            self.stdout.write(self.style.SUCCESS("Simulation stopped by user."))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS("Simulation stopped by user."))
+        finally:
+            if profiler and profiler.active:
+                # Stopped before the profiled ticks were over
+                profiler.dump()
@@ -1,10 +1,15 @@
+import io
+import multiprocessing
 import random
 import time
+import numpy as np
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User, Group
 from django.contrib.gis.geos import Point
-from django.db import transaction, IntegrityError
+from django.db import connection, connections, transaction, IntegrityError
 from fleet.models import Airport, Pilot, Plane
+from fleet.response_cache import invalidate
 
 # --- CONSTANT DATA (No changes) ---
 ENGLISH_FIRST_NAMES = ["James", "John", "Robert", "Michael", "William", "David", "Richard", "Joseph", "Thomas", "Christopher", "Charles", "Daniel", "Matthew", "Anthony", "Mark", "Mary", "Patricia", "Jennifer", "Linda", "Elizabeth"]
@@ -32,6 +37,101 @@ def get_random_item(arr):
 def get_random_coord(min_val, max_val):
     return random.uniform(min_val, max_val)
 
+# --- FAST PATH (--fast) ---
+SEED_STAGE_TABLE = 'fleet_seed_stage'
+
+# One statement per chunk: the staged rows become users, group memberships, pilots and
+# planes. Rows that already exist are skipped (ON CONFLICT DO NOTHING); users and pilots
+# left by an interrupted run or by the regular seeding are picked up again, so their
+# missing pilots and planes are still created and re-running a chunk is harmless.
+# (The SELECTs from auth_user/fleet_pilot see the tables as they were before this statement.)
+SEED_SQL = f'''
+WITH new_users AS (
+    INSERT INTO auth_user (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)
+    SELECT %(password)s, false, username, first_name, last_name, '', false, true, now() FROM {SEED_STAGE_TABLE}
+    ON CONFLICT DO NOTHING
+    RETURNING id, username
+),
+users AS (
+    SELECT id, username FROM new_users
+    UNION ALL
+    SELECT u.id, u.username FROM auth_user AS u JOIN {SEED_STAGE_TABLE} AS s USING (username)
+),
+memberships AS (
+    INSERT INTO auth_user_groups (user_id, group_id)
+    SELECT id, %(group)s FROM users
+    ON CONFLICT DO NOTHING
+),
+new_pilots AS (
+    INSERT INTO fleet_pilot (user_id, rank, call_sign)
+    SELECT users.id, s.rank, s.call_sign FROM users JOIN {SEED_STAGE_TABLE} AS s USING (username)
+    ON CONFLICT DO NOTHING
+    RETURNING id, user_id
+),
+pilots AS (
+    SELECT id, user_id FROM new_pilots
+    UNION ALL
+    SELECT p.id, p.user_id FROM fleet_pilot AS p JOIN users ON p.user_id = users.id
+)
+INSERT INTO fleet_plane (pilot_id, model, tail_number, status, origin_id, destination_id, location, altitude, bearing, speed, updated_at, version)
+SELECT pilots.id, s.model, s.tail_number, 'In Flight', s.origin_id, s.destination_id,
+       ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326), 20000.0, 0.0, s.speed, now(), 0
+FROM pilots JOIN users ON pilots.user_id = users.id JOIN {SEED_STAGE_TABLE} AS s USING (username)
+ON CONFLICT DO NOTHING
+'''
+
+
+def tail_number(index):
+    return f'TC-BYK-{index:04d}'
+
+
+def seed_rows(first, last, airport_ids, seed):
+    """
+    Tab-separated stage rows for the pilots/planes numbered `first` to `last`.
+    The generator is seeded per chunk, so a resumed run produces the same rows.
+    """
+    count = last - first + 1
+    rng = np.random.default_rng([seed, first])
+    origin = rng.integers(len(airport_ids), size=count)
+    # Any airport but the origin
+    destination = (origin + rng.integers(1, len(airport_ids), size=count)) % len(airport_ids)
+    indices = range(first, last + 1)
+    columns = zip(
+        [f'pilot{i}' for i in indices], [f'Asena-{i}' for i in indices], [tail_number(i) for i in indices],
+        rng.choice(ENGLISH_FIRST_NAMES, count), rng.choice(ENGLISH_LAST_NAMES, count),
+        rng.choice(RANKS, count), rng.choice(PLANE_MODELS, count),
+        np.asarray(airport_ids)[origin].tolist(), np.asarray(airport_ids)[destination].tolist(),
+        rng.uniform(TURKEY_BOUNDS['minLon'], TURKEY_BOUNDS['maxLon'], count).tolist(),
+        rng.uniform(TURKEY_BOUNDS['minLat'], TURKEY_BOUNDS['maxLat'], count).tolist(),
+        (rng.uniform(200, 400, count) / 3600).tolist(),
+    )
+    return ''.join('\t'.join(map(str, row)) + '\n' for row in columns)
+
+
+def seed_chunk(first, last, airport_ids, group_id, password, seed):
+    """Loads one chunk in its own transaction. Returns the planes created (0 if the chunk was already done)."""
+    # Chunks commit atomically, so the chunk is complete if its last plane exists (rerunning it is harmless otherwise)
+    if Plane.objects.filter(tail_number=tail_number(last)).exists():
+        return 0
+
+    buffer = io.StringIO(seed_rows(first, last, airport_ids, seed))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {SEED_STAGE_TABLE} ("
+            "username text, call_sign text, tail_number text, first_name text, last_name text, rank text, model text, "
+            "origin_id bigint, destination_id bigint, lon double precision, lat double precision, speed double precision"
+            ")"
+        )
+        cursor.execute(f"TRUNCATE {SEED_STAGE_TABLE}")
+        cursor.copy_expert(f"COPY {SEED_STAGE_TABLE} FROM STDIN", buffer)
+        cursor.execute(SEED_SQL, {'password': password, 'group': group_id})
+        return cursor.rowcount
+
+
+def seed_chunk_worker(arguments):
+    """`seed_chunk` in a worker process, with the process' own database connection."""
+    return seed_chunk(*arguments)
+
 class Command(BaseCommand):
     help = 'Seeds the database with initial mock data if it is empty.'
 
@@ -42,9 +142,62 @@ class Command(BaseCommand):
             default=10000,
             help='Specifies the number of users, pilots, and planes to create.'
         )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Load with COPY in resumable chunks across --workers processes (for 100k-1M plane datasets). '
+                 'Every user shares one password hash.'
+        )
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='Processes for --fast.')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Planes per --fast chunk (one transaction each).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of --fast; keep it when resuming.')
+
+    def fast_seed(self, count, workers, chunk_size, seed):
+        """
+        Seeds pilots/planes 1..count. Chunks already loaded by an earlier (interrupted or
+        smaller) run are skipped, so the command can be re-run until it completes.
+        """
+        start_time = time.time()
+        Group.objects.get_or_create(name='Admins')
+        pilots_group, _ = Group.objects.get_or_create(name='Pilots')
+        for a in AIRPORTS_DATA:
+            Airport.objects.get_or_create(code=a['code'], defaults={'name': a['name'], 'location': Point(a['lon'], a['lat'])})
+        airport_ids = list(Airport.objects.filter(code__in=[a['code'] for a in AIRPORTS_DATA]).order_by('code').values_list('id', flat=True))
+        # PBKDF2 runs once instead of once per user
+        password = make_password('12345')
+
+        chunks = [
+            (first, min(first + chunk_size - 1, count), airport_ids, pilots_group.pk, password, seed)
+            for first in range(1, count + 1, chunk_size)
+        ]
+        self.stdout.write(f'Seeding {count} pilots and planes in {len(chunks)} chunks with {workers} workers...')
+        created = 0
+        if workers > 1:
+            # Connections must not be shared with forked children
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                for done, planes in enumerate(pool.imap_unordered(seed_chunk_worker, chunks), 1):
+                    created += planes
+                    self.stdout.write(f'  {done}/{len(chunks)} chunks, {created} planes created')
+        else:
+            for done, chunk in enumerate(chunks, 1):
+                created += seed_chunk(*chunk)
+                self.stdout.write(f'  {done}/{len(chunks)} chunks, {created} planes created')
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE auth_user, auth_user_groups, fleet_pilot, fleet_plane')
+        # Rows were inserted without signals, so cached lists are retired here
+        invalidate('planes', 'pilots', 'airports')
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} planes created ({count - created} already present) in {time.time() - start_time:.2f} seconds.'
+        ))
 
     def handle(self, *args, **kwargs):
         count = kwargs['count']
+        if kwargs['fast']:
+            self.fast_seed(count, max(1, kwargs['workers']), max(1, kwargs['chunk_size']), kwargs['seed'])
+            return
+
         start_time = time.time()
         if Plane.objects.exists() or User.objects.count() > 1:
             self.stdout.write(self.style.SUCCESS('Database already contains data. Skipping seeding.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2025-07-21 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plane',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
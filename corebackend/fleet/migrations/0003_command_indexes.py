@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2025-07-21 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0002_plane_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='command',
+            index=models.Index(fields=['-created_at', '-id'], name='command_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='command',
+            index=models.Index(fields=['pilot', '-created_at', '-id'], name='command_pilot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='command',
+            index=models.Index(fields=['plane', '-created_at', '-id'], name='command_plane_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='command',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['pilot', '-created_at'], name='command_pending_idx'),
+        ),
+    ]
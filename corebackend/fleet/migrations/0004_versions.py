@@ -0,0 +1,95 @@
+# Generated by Django 5.2.4 on 2025-07-21 10:12
+
+from django.db import migrations, models
+
+# One monotonic sequence per resource. Rows take the next value on every insert/update
+# (ORM saves, queryset updates and the simulator's COPY + UPDATE alike), and deleted
+# rows leave a tombstone with a version of their own.
+VERSION_SQL = '''
+CREATE SEQUENCE fleet_plane_version_seq;
+CREATE SEQUENCE fleet_command_version_seq;
+
+CREATE FUNCTION fleet_set_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := nextval(TG_ARGV[0]::regclass);
+    NEW.changed_at := now();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION fleet_record_deletion() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO fleet_tombstone (resource, object_id, version, deleted_at)
+    VALUES (TG_ARGV[1], OLD.id, nextval(TG_ARGV[0]::regclass), now());
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER fleet_plane_version BEFORE INSERT OR UPDATE ON fleet_plane
+    FOR EACH ROW EXECUTE FUNCTION fleet_set_version('fleet_plane_version_seq');
+CREATE TRIGGER fleet_plane_deletion AFTER DELETE ON fleet_plane
+    FOR EACH ROW EXECUTE FUNCTION fleet_record_deletion('fleet_plane_version_seq', 'planes');
+CREATE TRIGGER fleet_command_version BEFORE INSERT OR UPDATE ON fleet_command
+    FOR EACH ROW EXECUTE FUNCTION fleet_set_version('fleet_command_version_seq');
+CREATE TRIGGER fleet_command_deletion AFTER DELETE ON fleet_command
+    FOR EACH ROW EXECUTE FUNCTION fleet_record_deletion('fleet_command_version_seq', 'commands');
+
+-- Give existing rows a version
+UPDATE fleet_plane SET version = 0;
+UPDATE fleet_command SET version = 0;
+'''
+
+REVERSE_SQL = '''
+DROP TRIGGER fleet_plane_version ON fleet_plane;
+DROP TRIGGER fleet_plane_deletion ON fleet_plane;
+DROP TRIGGER fleet_command_version ON fleet_command;
+DROP TRIGGER fleet_command_deletion ON fleet_command;
+DROP FUNCTION fleet_set_version();
+DROP FUNCTION fleet_record_deletion();
+DROP SEQUENCE fleet_plane_version_seq;
+DROP SEQUENCE fleet_command_version_seq;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0003_command_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plane',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='plane',
+            name='changed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='command',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='command',
+            name='changed_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('version', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resource', 'version'], name='tombstone_resource_version_idx')],
+            },
+        ),
+        migrations.RunSQL(VERSION_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2025-07-28 09:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Partitions (one per day) are created at runtime by `fleet.tracks.ensure_partitions`.
+# The primary key doubles as the index track queries use: one plane over a time range.
+TRACK_SQL = '''
+CREATE TABLE fleet_planeposition (
+    plane_id bigint NOT NULL,
+    recorded_at timestamp with time zone NOT NULL,
+    lon double precision NOT NULL,
+    lat double precision NOT NULL,
+    bearing double precision NOT NULL,
+    PRIMARY KEY (plane_id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+'''
+
+REVERSE_SQL = 'DROP TABLE fleet_planeposition;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0004_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanePosition',
+            fields=[
+                ('pk', models.CompositePrimaryKey('plane', 'recorded_at', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('recorded_at', models.DateTimeField()),
+                ('lon', models.FloatField()),
+                ('lat', models.FloatField()),
+                ('bearing', models.FloatField()),
+                ('plane', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='positions', to='fleet.plane')),
+            ],
+            options={
+                'db_table': 'fleet_planeposition',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(TRACK_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2025-08-04 14:05
+
+from django.db import migrations
+
+# Replays scan the track history by time. Rows are appended in time order, so a BRIN
+# index stays tiny and costs almost nothing on ingestion; partitions created later inherit it.
+BRIN_SQL = 'CREATE INDEX fleet_planeposition_recorded_brin ON fleet_planeposition USING brin (recorded_at);'
+
+REVERSE_SQL = 'DROP INDEX fleet_planeposition_recorded_brin;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0005_plane_positions'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BRIN_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2025-08-11 11:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fleet', '0006_planeposition_recorded_at_brin'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='command',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='command_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='command',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('message', config='simple'), name='command_message_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='command',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('message'), name='gin_trgm_ops'), name='command_message_trgm_idx'),
+        ),
+    ]
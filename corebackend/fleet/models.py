@@ -1,5 +1,8 @@
 from django.contrib.gis.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db.models.functions import Upper
 
 class Airport(models.Model):
     code = models.CharField(max_length=3, unique=True)
@@ -33,6 +36,15 @@ class Plane(models.Model):
     bearing = models.FloatField(default=0.0)
     speed = models.FloatField(default=0.0) # km/s
 
+    # Bumped on every admin/API edit; the simulator polls it to pick up changes incrementally.
+    # Position updates written by the simulator itself do not touch it.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Set by a database trigger on every insert/update, including the simulator's
+    # position writes (see migration 0004 and `fleet.versions`).
+    version = models.BigIntegerField(default=0, editable=False, db_index=True)
+    changed_at = models.DateTimeField(null=True, editable=False)
+
     def __str__(self):
         return self.tail_number
 
@@ -46,5 +58,60 @@ class Command(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Set by a database trigger on every insert/update (see `fleet.versions`)
+    version = models.BigIntegerField(default=0, editable=False, db_index=True)
+    changed_at = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        # Command lists filter by pilot or plane and are paginated on (created_at, id), newest first
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='command_created_idx'),
+            models.Index(fields=['pilot', '-created_at', '-id'], name='command_pilot_created_idx'),
+            models.Index(fields=['plane', '-created_at', '-id'], name='command_plane_created_idx'),
+            # Pending commands are a small, hot slice of the table
+            models.Index(
+                fields=['pilot', '-created_at'], name='command_pending_idx', condition=models.Q(status='pending')
+            ),
+            models.Index(fields=['status', '-created_at', '-id'], name='command_status_created_idx'),
+            # Message filters of `fleet.filters`: full-text `search` and substring `message`.
+            # `target_location` already has the spatial index every geometry field gets.
+            GinIndex(SearchVector('message', config='simple'), name='command_message_search_idx'),
+            GinIndex(OpClass(Upper('message'), name='gin_trgm_ops'), name='command_message_trgm_idx'),
+        ]
+
+    def __str__(self):
+        return f"Command for {self.plane.tail_number} - {self.status}"
+
+class Tombstone(models.Model):
+    """Deleted plane/command ids, written by a database trigger so `?since=` clients learn about deletions."""
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['resource', 'version'], name='tombstone_resource_version_idx')]
+
+    def __str__(self):
+        return f"{self.resource} {self.object_id} deleted at version {self.version}"
+
+class PlanePosition(models.Model):
+    """
+    Append-only track history: one row per plane per simulator tick. The table is range
+    partitioned by day on `recorded_at` (migration 0005), so it is not managed by Django;
+    partitions are created and dropped by `fleet.tracks`.
+    """
+    pk = models.CompositePrimaryKey('plane', 'recorded_at')
+    # No constraint: tracks outlive deleted planes and COPY skips the foreign key check
+    plane = models.ForeignKey(Plane, on_delete=models.DO_NOTHING, db_constraint=False, related_name='positions')
+    recorded_at = models.DateTimeField()
+    lon = models.FloatField()
+    lat = models.FloatField()
+    bearing = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'fleet_planeposition'
+
     def __str__(self):
-        return f"Command for {self.plane.tail_number} - {self.status}"
\ No newline at end of file
+        return f"Plane {self.plane_id} at {self.recorded_at}"
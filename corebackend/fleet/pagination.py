@@ -0,0 +1,57 @@
+import json
+from itertools import islice
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+EXPORT_CHUNK_SIZE = 2000
+
+
+class CommandCursorPagination(CursorPagination):
+    """Keyset pagination over commands, newest first. `created_at` alone is not unique, so `id` breaks ties."""
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key, for planes and users."""
+    ordering = ('id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class NDJSONExportMixin:
+    """
+    Adds an opt-in bulk export to list endpoints: with `?export=ndjson` every row is
+    streamed as one JSON document per line, in the paginator's order. The queryset is
+    read with a server-side cursor (`iterator(chunk_size=...)`), so memory stays flat
+    however many rows are exported. Without it, responses are cursor paginated.
+    """
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def list_response(self, queryset, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        if self.request.query_params.get('export') == 'ndjson':
+            ordering = self.pagination_class.ordering
+            return self.ndjson_response(queryset.order_by(*ordering), serializer_class)
+
+        page = self.paginate_queryset(queryset)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    def ndjson_response(self, queryset, serializer_class):
+        context = self.get_serializer_context()
+
+        def lines():
+            rows = queryset.iterator(chunk_size=self.export_chunk_size)
+            while chunk := list(islice(rows, self.export_chunk_size)):
+                yield ''.join(
+                    json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + '\n'
+                    for item in serializer_class(chunk, many=True, context=context).data
+                )
+
+        return StreamingHttpResponse(lines(), content_type=NDJSON_CONTENT_TYPE)
@@ -0,0 +1,65 @@
+"""
+Replay of the recorded track history (see `fleet.tracks`) for `ReplayConsumer`.
+
+History is read in short, consecutive time slices, so a replay walks the day partitions
+in order through their `recorded_at` BRIN index, and only one slice (plus the consumer's
+bounded prefetch queue) is in memory however long the replayed window is.
+"""
+import datetime
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .frames import pack_positions
+
+MIN_REPLAY_SPEED = 1
+MAX_REPLAY_SPEED = 100
+MAX_REPLAY_WINDOW = datetime.timedelta(hours=24)
+# History read per query; at 10k planes and one tick per 2 s this is 100k rows
+REPLAY_SLICE = datetime.timedelta(seconds=20)
+# Frames read ahead of playback
+REPLAY_PREFETCH_FRAMES = 30
+
+
+def parse_replay_request(message):
+    """(start, end, speed) of a client's `replay` message. Raises ValueError if it is invalid."""
+    times = []
+    for name in ('from', 'to'):
+        value = parse_datetime(str(message.get(name, '')))
+        if value is None:
+            raise ValueError(f'`{name}` must be an ISO 8601 date and time.')
+        times.append(value if timezone.is_aware(value) else timezone.make_aware(value, datetime.timezone.utc))
+    start, end = times
+    if not start < end <= start + MAX_REPLAY_WINDOW:
+        raise ValueError(f'`from` must be before `to`, at most {MAX_REPLAY_WINDOW} apart.')
+    speed = float(message.get('speed', MIN_REPLAY_SPEED))
+    if not MIN_REPLAY_SPEED <= speed <= MAX_REPLAY_SPEED:
+        raise ValueError(f'`speed` must be between {MIN_REPLAY_SPEED} and {MAX_REPLAY_SPEED}.')
+    return start, end, speed
+
+
+def load_slice(start, end):
+    """
+    Frames recorded in [start, end), oldest first: one (epoch seconds, packed positions)
+    per simulator tick, in the format the live feed sends through the channel layer.
+    """
+    # Imported here: consumers are loaded before the app registry is ready (see core/asgi.py)
+    from .tracks import TRACK_TABLE
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT extract(epoch FROM recorded_at)::float8, plane_id, lon, lat, bearing FROM {TRACK_TABLE} "
+            "WHERE recorded_at >= %s AND recorded_at < %s ORDER BY recorded_at",
+            [start, end],
+        )
+        rows = np.array(cursor.fetchall(), dtype=float).reshape(-1, 5)
+
+    times, ids, lon, lat, bearing = rows.T
+    frames = []
+    for frame in np.split(np.arange(len(rows)), np.flatnonzero(np.diff(times)) + 1):
+        if len(frame):
+            frames.append((
+                times[frame[0]],
+                pack_positions(ids[frame].astype(np.int64), lon[frame], lat[frame], bearing[frame]),
+            ))
+    return frames
@@ -0,0 +1,79 @@
+import hashlib
+from functools import wraps
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Entries are invalidated by version bumps; the timeout only bounds Redis memory.
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+VERSION_KEY = 'fleet:version:{resource}'
+RESPONSE_KEY = 'fleet:response:{etag}'
+DATA_KEY = 'fleet:data:{digest}'
+
+
+def resource_versions(resources):
+    """Current version of each resource, 0 if it never changed since Redis was started."""
+    keys = [VERSION_KEY.format(resource=resource) for resource in resources]
+    found = cache.get_many(keys)
+    return [found.get(key, 0) for key in keys]
+
+
+def invalidate(*resources):
+    """
+    Bumps the version of `resources` once the current transaction commits, which
+    retires every cached response built from them. Called from `fleet.signals` and
+    from views that change rows without sending signals (e.g. `QuerySet.update()`).
+    """
+    def bump():
+        for resource in resources:
+            key = VERSION_KEY.format(resource=resource)
+            cache.add(key, 0, timeout=None)
+            cache.incr(key)
+
+    transaction.on_commit(bump)
+
+
+def cached_data(path, resources, build):
+    """
+    Caches the result of `build()` like `cached_response`, but without an ETag, for views
+    that combine it with live columns changing too often to be part of the key.
+    """
+    versions = '.'.join(str(version) for version in resource_versions(resources))
+    key = DATA_KEY.format(digest=hashlib.md5(f'{path}|{versions}'.encode()).hexdigest())
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=RESPONSE_CACHE_TIMEOUT)
+    return data
+
+
+def cached_response(*resources):
+    """
+    Caches the data of a read-only view method in Redis, keyed by the request path and the
+    versions of the `resources` it is built from. The key doubles as the ETag, so clients
+    revalidating with If-None-Match get a 304 without the view (or the cache) being read.
+    Only suitable for responses that do not depend on the requesting user.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            versions = '.'.join(str(version) for version in resource_versions(resources))
+            etag = '"%s"' % hashlib.md5(f'{request.get_full_path()}|{versions}'.encode()).hexdigest()
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            key = RESPONSE_KEY.format(etag=etag.strip('"'))
+            data = cache.get(key)
+            if data is None:
+                response = view_method(self, request, *args, **kwargs)
+                # Errors and streamed exports are not cached
+                if not isinstance(response, Response) or response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                cache.set(key, data, timeout=RESPONSE_CACHE_TIMEOUT)
+            return Response(data, headers=headers)
+        return wrapper
+    return decorator
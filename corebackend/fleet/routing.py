@@ -2,5 +2,7 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    # Before the live feed, whose pattern would also match it
+    re_path(r'ws/fleet/replay/', consumers.ReplayConsumer.as_asgi()),
     re_path(r'ws/fleet/', consumers.FleetConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -2,7 +2,9 @@ from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from rest_framework_gis.fields import GeometryField
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import F
 from .models import Pilot, Plane, Command, Airport
+from .simulation.state import X, Y
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -42,6 +44,16 @@ class AirportSerializer(serializers.ModelSerializer):
         model = Airport
         fields = ['name', 'code']
 
+class AirportLocationSerializer(serializers.ModelSerializer):
+    """
+    Presents airports with their location, for the map.
+    """
+    location = GeometryField()
+
+    class Meta:
+        model = Airport
+        fields = ['id', 'code', 'name', 'location']
+
 class PlaneDetailSerializer(serializers.ModelSerializer):
     """
     Presents all details of a single aircraft with pilot and route information.
@@ -106,6 +118,40 @@ class PlaneFeatureSerializer(serializers.ModelSerializer):
             'properties': properties
         }
 
+# Columns read by `plane_features`, in unpacking order
+PLANE_FEATURE_COLUMNS = (
+    'id', 'model', 'tail_number', 'altitude', 'bearing', 'speed', 'status', 'lon', 'lat',
+    'pilot_id', 'pilot__call_sign', 'pilot__user__username', 'pilot__user__first_name', 'pilot__user__last_name',
+)
+
+
+def plane_features(queryset):
+    """
+    Fast path for `PlaneFeatureSerializer(queryset, many=True).data`.
+    Builds the same features straight from `values_list()` tuples, with coordinates read by
+    PostGIS, so no model instances, GEOS points or per-field serializer calls are involved.
+    The rendered output is identical to the serializer's.
+    """
+    rows = queryset.annotate(lon=X(F('location')), lat=Y(F('location'))).values_list(*PLANE_FEATURE_COLUMNS)
+    features = []
+    for (pk, model, tail_number, altitude, bearing, speed, status, lon, lat,
+         pilot_id, call_sign, username, first_name, last_name) in rows:
+        pilot = None
+        if pilot_id is not None:
+            # Same as PilotSerializer.get_fullName
+            full_name = f'{first_name} {last_name}'.strip()
+            pilot = {'id': pilot_id, 'fullName': full_name or username, 'callSign': call_sign}
+        features.append({
+            'type': 'Feature',
+            'id': pk,
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {
+                'id': pk, 'model': model, 'tail_number': tail_number, 'altitude': altitude,
+                'bearing': bearing, 'speed_kmh': round(speed * 3600), 'status': status, 'pilot': pilot,
+            },
+        })
+    return features
+
 class CommandSerializer(serializers.ModelSerializer):
     """
     Used to read and create commands.
@@ -120,6 +166,29 @@ class CommandSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('pilot', 'created_at') # Pilot and creation date are automatically assigned
 
+class BulkCommandItemSerializer(serializers.Serializer):
+    """
+    One command of a bulk dispatch. The plane is a plain id so that all planes
+    of the batch can be resolved in a single query by the view.
+    """
+    plane = serializers.IntegerField()
+    message = serializers.CharField()
+    target_location = GeometryField()
+
+class BulkCommandSelectorSerializer(serializers.Serializer):
+    """
+    One message for many planes, selected by id or by a bbox ([min_lon, min_lat, max_lon, max_lat]).
+    """
+    message = serializers.CharField()
+    target_location = GeometryField()
+    plane_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    bbox = serializers.ListField(child=serializers.FloatField(), required=False, min_length=4, max_length=4)
+
+    def validate(self, data):
+        if ('plane_ids' in data) == ('bbox' in data):
+            raise serializers.ValidationError('Give exactly one of plane_ids or bbox.')
+        return data
+
 class UserAdminSerializer(serializers.ModelSerializer):
     """
     Used to list and edit users in the management panel.
@@ -0,0 +1,69 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .broadcast import SIMULATION_EVENTS_GROUP
+from .models import Plane, Airport, Pilot, Command
+from .response_cache import invalidate
+
+
+def notify_simulation(event):
+    """
+    Sends a change notification to the simulation engine once the transaction commits.
+    Notifications are best effort: the simulator also runs a periodic `updated_at` delta query.
+    """
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(SIMULATION_EVENTS_GROUP, event)
+        except Exception as e:
+            print(f"Could not notify simulation engine: {e}")
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=Plane)
+def plane_saved(sender, instance, **kwargs):
+    notify_simulation({'type': 'plane.changed', 'ids': [instance.pk]})
+    # Pilot availability depends on plane assignments
+    invalidate('planes', 'pilots')
+
+
+@receiver(post_delete, sender=Plane)
+def plane_deleted(sender, instance, **kwargs):
+    notify_simulation({'type': 'plane.deleted', 'ids': [instance.pk]})
+    invalidate('planes', 'pilots')
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+def airport_changed(sender, instance, **kwargs):
+    notify_simulation({'type': 'airports.changed'})
+    invalidate('airports')
+
+
+@receiver(post_save, sender=Command)
+def command_saved(sender, instance, **kwargs):
+    # The simulator steers planes towards the target of their accepted command
+    notify_simulation({
+        'type': 'command.changed', 'id': instance.pk, 'plane': instance.plane_id,
+        'status': instance.status, 'target': [instance.target_location.x, instance.target_location.y],
+    })
+
+
+@receiver(post_delete, sender=Command)
+def command_deleted(sender, instance, **kwargs):
+    notify_simulation({'type': 'command.deleted', 'id': instance.pk, 'plane': instance.plane_id})
+
+
+@receiver(post_save, sender=Pilot)
+@receiver(post_delete, sender=Pilot)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def pilot_changed(sender, instance, **kwargs):
+    # Pilot names come from their user
+    invalidate('pilots')
@@ -0,0 +1,102 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+# --- SCALAR REFERENCE IMPLEMENTATION ---
+def calculate_bearing(lat1, lon1, lat2, lon2):
+    """Calculates the initial bearing between two coordinates."""
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lon1)
+    lat2_rad = math.radians(lat2)
+    lon2_rad = math.radians(lon2)
+
+    dLon = lon2_rad - lon1_rad
+    x = math.cos(lat2_rad) * math.sin(dLon)
+    y = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(dLon)
+
+    initial_bearing = math.atan2(x, y)
+    initial_bearing = math.degrees(initial_bearing)
+    return (initial_bearing + 360) % 360
+
+def calculate_new_position(lat, lon, bearing, distance_km):
+    """Calculates a new point from a given point in a specific direction and distance."""
+    R = EARTH_RADIUS_KM
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    bearing_rad = math.radians(bearing)
+
+    new_lat_rad = math.asin(math.sin(lat_rad) * math.cos(distance_km / R) +
+                            math.cos(lat_rad) * math.sin(distance_km / R) * math.cos(bearing_rad))
+    new_lon_rad = lon_rad + math.atan2(math.sin(bearing_rad) * math.sin(distance_km / R) * math.cos(lat_rad),
+                                       math.cos(distance_km / R) - math.sin(lat_rad) * math.sin(new_lat_rad))
+
+    return (math.degrees(new_lat_rad), math.degrees(new_lon_rad))
+
+def step_plane(lat, lon, speed, dest_lat, dest_lon, time_delta):
+    """
+    Advances a single plane towards its destination.
+    Returns (new_lat, new_lon, bearing, arrived).
+    """
+    bearing = calculate_bearing(lat, lon, dest_lat, dest_lon)
+    new_lat, new_lon = calculate_new_position(lat, lon, bearing, speed * time_delta)
+
+    # If the bearing to the target deviates more than 90 degrees after the step, we have passed it
+    current_dest_bearing = calculate_bearing(new_lat, new_lon, dest_lat, dest_lon)
+    if abs(current_dest_bearing - bearing) > 90:
+        return dest_lat, dest_lon, bearing, True
+    return new_lat, new_lon, bearing, False
+
+
+# --- VECTORIZED ENGINE ---
+def bearing_array(lat1, lon1, lat2, lon2):
+    """Vectorized `calculate_bearing`. All arguments are arrays of degrees."""
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    dLon = np.radians(lon2) - np.radians(lon1)
+
+    x = np.cos(lat2_rad) * np.sin(dLon)
+    y = np.cos(lat1_rad) * np.sin(lat2_rad) - np.sin(lat1_rad) * np.cos(lat2_rad) * np.cos(dLon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+def new_position_array(lat, lon, bearing, distance_km):
+    """Vectorized `calculate_new_position`. Returns (new_lat, new_lon) arrays."""
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    bearing_rad = np.radians(bearing)
+    angular = np.asarray(distance_km) / EARTH_RADIUS_KM
+    sin_lat, cos_lat = np.sin(lat_rad), np.cos(lat_rad)
+    sin_ang, cos_ang = np.sin(angular), np.cos(angular)
+
+    new_lat_rad = np.arcsin(sin_lat * cos_ang + cos_lat * sin_ang * np.cos(bearing_rad))
+    new_lon_rad = lon_rad + np.arctan2(np.sin(bearing_rad) * sin_ang * cos_lat,
+                                       cos_ang - sin_lat * np.sin(new_lat_rad))
+    return np.degrees(new_lat_rad), np.degrees(new_lon_rad)
+
+def step_fleet(lat, lon, speed, dest_lat, dest_lon, time_delta):
+    """
+    Vectorized `step_plane` for the whole fleet.
+    Returns (new_lat, new_lon, bearing, arrived) where `arrived` is a boolean mask.
+    Planes that arrived are snapped onto their destination.
+    """
+    bearing = bearing_array(lat, lon, dest_lat, dest_lon)
+    new_lat, new_lon = new_position_array(lat, lon, bearing, speed * time_delta)
+
+    current_dest_bearing = bearing_array(new_lat, new_lon, dest_lat, dest_lon)
+    arrived = np.abs(current_dest_bearing - bearing) > 90
+
+    new_lat = np.where(arrived, dest_lat, new_lat)
+    new_lon = np.where(arrived, dest_lon, new_lon)
+    return new_lat, new_lon, bearing, arrived
+
+def pick_new_destinations(current_idx, airport_count, rng=None):
+    """
+    Picks a random airport index for every entry in `current_idx`, never returning the current one.
+    Draws from `airport_count - 1` slots and shifts the ones at or above the current index,
+    which keeps the choice uniform without a retry loop.
+    """
+    rng = rng or np.random.default_rng()
+    current_idx = np.asarray(current_idx)
+    picks = rng.integers(0, airport_count - 1, size=current_idx.shape)
+    return picks + (picks >= current_idx)
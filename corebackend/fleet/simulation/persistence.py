@@ -0,0 +1,184 @@
+import io
+import time
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from fleet.models import Plane, PlanePosition
+from fleet.tracks import rollover
+
+STAGE_TABLE = 'fleet_plane_position_stage'
+# Partitions are rolled over (and expired ones dropped) this often by the track recorder
+TRACK_ROLLOVER_INTERVAL = 60 * 60
+# Ticks kept for a retry while the database is unreachable; older ones are dropped
+MAX_BUFFERED_TICKS = 150
+
+
+def persist_positions(ids, lon, lat, bearing, origin_id, destination_id):
+    """
+    Writes simulated positions with a COPY into a temp table and a single `UPDATE ... FROM`.
+    This avoids the huge CASE/WHEN statement `bulk_update` builds for the whole fleet.
+    """
+    if not len(ids):
+        return 0
+
+    buffer = io.StringIO()
+    np.savetxt(
+        buffer,
+        np.column_stack([ids, lon, lat, bearing, origin_id, destination_id]),
+        fmt=['%d', '%.9f', '%.9f', '%.6f', '%d', '%d'],
+        delimiter='\t',
+    )
+    buffer.seek(0)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} ("
+            "id bigint, lon double precision, lat double precision, bearing double precision, "
+            "origin_id bigint, destination_id bigint"
+            ") ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(f"COPY {STAGE_TABLE} FROM STDIN", buffer)
+        cursor.execute(
+            f"UPDATE {Plane._meta.db_table} AS p SET "
+            "location = ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326), "
+            "bearing = s.bearing, origin_id = s.origin_id, destination_id = s.destination_id "
+            f"FROM {STAGE_TABLE} AS s WHERE p.id = s.id"
+        )
+        return cursor.rowcount
+
+
+class WriteBehindFlusher:
+    """
+    Persists the dirty rows of a `FleetState` at its own cadence, decoupled from the tick.
+
+    `snapshot()` must run between ticks and copies the dirty rows out of the state;
+    `write()` can then run in a worker thread while the simulation keeps ticking.
+    A failed write is remembered and merged back into the next snapshot.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.last_flush_at = time.monotonic()
+        self.last_flush_duration = 0.0
+        self.last_flush_rows = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.failed_snapshot = None
+
+    def snapshot(self):
+        """Copies and clears the dirty rows. Returns the column arrays to hand to `write`."""
+        state = self.state
+        if self.failed_snapshot is not None:
+            self._restore(self.failed_snapshot)
+            self.failed_snapshot = None
+        rows = np.flatnonzero(state.dirty)
+        state.dirty[rows] = False
+        return (
+            state.ids[rows], state.lon[rows], state.lat[rows], state.bearing[rows],
+            state.origin_id[rows], state.destination_id[rows], time.monotonic(),
+        )
+
+    def write(self, snapshot):
+        """Persists a snapshot. Meant to run outside the event loop thread."""
+        *columns, taken_at = snapshot
+        started = time.monotonic()
+        try:
+            self.last_flush_rows = persist_positions(*columns)
+        except Exception:
+            self.failed_snapshot = snapshot
+            self.failed_flushes += 1
+            raise
+        self.last_flush_duration = time.monotonic() - started
+        self.last_flush_at = taken_at
+        self.flush_count += 1
+        return self.last_flush_rows
+
+    def _restore(self, snapshot):
+        """Marks the rows of a failed snapshot dirty again so they are retried."""
+        ids = snapshot[0]
+        rows = [self.state.row_of[pk] for pk in ids.tolist() if pk in self.state.row_of]
+        self.state.dirty[rows] = True
+
+    def metrics(self):
+        dirty_rows = int(self.state.dirty.sum())
+        return {
+            'dirty_rows': dirty_rows,
+            # How far the database is behind the resident state
+            'flush_lag_seconds': time.monotonic() - self.last_flush_at if dirty_rows else 0.0,
+            'last_flush_rows': self.last_flush_rows,
+            'last_flush_seconds': self.last_flush_duration,
+            'flush_count': self.flush_count,
+            'failed_flushes': self.failed_flushes,
+        }
+
+
+def record_positions(batches):
+    """
+    Appends ticks of positions to the track history with a single COPY into the
+    partitioned table. `batches` holds one (recorded_at, ids, lon, lat, bearing) per tick.
+    """
+    buffer = io.StringIO()
+    rows = 0
+    for recorded_at, ids, lon, lat, bearing in batches:
+        # The tick's timestamp is the same for every row, so it is part of the format
+        np.savetxt(
+            buffer, np.column_stack([ids, lon, lat, bearing]),
+            fmt=f'%d\t{recorded_at.isoformat()}\t%.7f\t%.7f\t%.2f',
+        )
+        rows += len(ids)
+    if not rows:
+        return 0
+    buffer.seek(0)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {PlanePosition._meta.db_table} (plane_id, recorded_at, lon, lat, bearing) FROM STDIN", buffer
+        )
+    return rows
+
+
+class TrackRecorder:
+    """
+    Feeds the track history: `sample()` copies the positions of every plane after each
+    tick, and every `flush_every` ticks they are appended with one COPY.
+
+    Like `WriteBehindFlusher`, `take()` must run between ticks and `write()` can run in a
+    worker thread. Failed ticks are retried with the next write (up to `MAX_BUFFERED_TICKS`).
+    """
+
+    def __init__(self, state, flush_every=5):
+        self.state = state
+        self.flush_every = flush_every
+        self.batches = []
+        self.failed_batches = []
+        self.next_rollover_at = 0.0
+        self.last_write_rows = 0
+        self.last_write_duration = 0.0
+
+    def sample(self, recorded_at=None):
+        state = self.state
+        self.batches.append((
+            recorded_at or timezone.now(), state.ids.copy(), state.lon.copy(), state.lat.copy(), state.bearing.copy(),
+        ))
+
+    def due(self):
+        return len(self.batches) >= self.flush_every
+
+    def take(self):
+        batches = (self.failed_batches + self.batches)[-MAX_BUFFERED_TICKS:]
+        self.batches, self.failed_batches = [], []
+        return batches
+
+    def write(self, batches):
+        """Appends taken batches, rolling partitions over first when due. Meant to run outside the event loop thread."""
+        started = time.monotonic()
+        try:
+            if started >= self.next_rollover_at:
+                rollover()
+                self.next_rollover_at = started + TRACK_ROLLOVER_INTERVAL
+            self.last_write_rows = record_positions(batches)
+        except Exception:
+            self.failed_batches = batches
+            raise
+        self.last_write_duration = time.monotonic() - started
+        return self.last_write_rows
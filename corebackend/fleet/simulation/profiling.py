@@ -0,0 +1,61 @@
+import cProfile
+import pstats
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class TickProfiler:
+    """
+    cProfile over the first `ticks` simulation ticks.
+
+    A `cProfile.Profile` only sees the thread that enabled it, and the tick work is split
+    between the event loop thread and the `sync_to_async` worker thread, so each thread
+    gets its own profiler; their stats are merged when the profiled ticks are over.
+    """
+
+    def __init__(self, ticks, output=None, stream=None, limit=40):
+        self.remaining = ticks
+        self.output = output
+        self.stream = stream
+        self.limit = limit
+        self.profilers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.remaining > 0
+
+    def profile(self):
+        """Context manager profiling its body on the current thread while ticks remain."""
+        if not self.active:
+            return nullcontext()
+        with self._lock:
+            profiler = self.profilers.setdefault(threading.get_ident(), cProfile.Profile())
+        return self._enabled(profiler)
+
+    @staticmethod
+    @contextmanager
+    def _enabled(profiler):
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def tick_done(self):
+        if not self.active:
+            return
+        self.remaining -= 1
+        if not self.active:
+            self.dump()
+
+    def dump(self):
+        """Writes the merged stats to `output` (a .prof file for snakeviz etc.) or prints the top entries."""
+        if not self.profilers:
+            return
+        stats = pstats.Stats(*self.profilers.values(), stream=self.stream)
+        if self.output:
+            stats.dump_stats(self.output)
+        else:
+            stats.sort_stats('cumulative').print_stats(self.limit)
+        self.profilers = {}
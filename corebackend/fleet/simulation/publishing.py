@@ -0,0 +1,55 @@
+import asyncio
+from collections import Counter
+from fleet.frames import pack_positions
+from fleet.tiles import plane_group, split_by_tile, tile_group
+
+
+class TilePublisher:
+    """
+    Publishes each tick's positions to per-tile and per-plane channel groups.
+
+    Tiles that had planes on the previous tick but are empty now get an empty update,
+    so subscribed consumers drop the planes that left. Plane groups are only published
+    for planes some consumer watches (see `plane.watch` events), since a `group_send`
+    to 10k mostly empty groups every tick would cost more than it saves.
+    """
+
+    def __init__(self, zoom):
+        self.zoom = zoom
+        self.previous_tiles = set()
+        self.watched = Counter()
+
+    def note_event(self, event):
+        if event['type'] == 'plane.watch':
+            self.watched.update(event['ids'])
+        elif event['type'] == 'plane.unwatch':
+            self.watched.subtract(event['ids'])
+            self.watched = +self.watched  # drop ids nobody watches anymore
+
+    def messages(self, state, tick):
+        """Builds the (group, event) pairs to publish for the current tick."""
+        messages = []
+        tiles = split_by_tile(state.lon, state.lat, self.zoom)
+        for (x, y), rows in tiles.items():
+            messages.append((tile_group(self.zoom, x, y), self._event(state, rows, tick, tile=[self.zoom, x, y])))
+        for x, y in self.previous_tiles.difference(tiles):
+            messages.append((tile_group(self.zoom, x, y), self._event(state, [], tick, tile=[self.zoom, x, y])))
+        self.previous_tiles = set(tiles)
+
+        for plane_id in self.watched:
+            row = state.row_of.get(plane_id)
+            rows = [row] if row is not None else []
+            messages.append((plane_group(plane_id), self._event(state, rows, tick, plane=plane_id)))
+        return messages
+
+    @staticmethod
+    def _event(state, rows, tick, **key):
+        return {
+            'type': 'broadcast.message',
+            'positions': pack_positions(state.ids[rows], state.lon[rows], state.lat[rows], state.bearing[rows]),
+            'tick': tick,
+            **key,
+        }
+
+    async def publish(self, channel_layer, messages):
+        await asyncio.gather(*(channel_layer.group_send(group, event) for group, event in messages))
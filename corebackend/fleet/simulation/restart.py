@@ -0,0 +1,14 @@
+"""
+Entry point of the simulation shards restarted from the forkserver (see `fleet.simulation.sharding`).
+
+A forkserver child unpickles its target, importing the target's module, before anything
+else runs; this module therefore imports nothing that needs the app registry.
+"""
+import django
+
+
+def run_restarted_shard(*args):
+    """`run_shard` in a fresh process, which has to set up Django itself."""
+    django.setup()
+    from .sharding import run_shard
+    run_shard(*args)
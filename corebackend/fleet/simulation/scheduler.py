@@ -0,0 +1,117 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+PHASES = ('load', 'compute', 'persist', 'publish')
+# Upper bounds (seconds) of the tick duration histogram; the last bucket is open
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+
+class TickStats:
+    """Tick durations, overruns, per-phase time and throughput accumulated since the last `reset`."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.histogram = [0] * (len(DURATION_BUCKETS) + 1)
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.durations = []
+        self.planes = 0
+        self.sent_bytes = 0
+
+    def record(self, duration, phases, planes=0, sent_bytes=0):
+        self.ticks += 1
+        self.histogram[bisect.bisect_left(DURATION_BUCKETS, duration)] += 1
+        self.durations.append(duration)
+        self.planes += planes
+        self.sent_bytes += sent_bytes
+        for name, seconds in phases.items():
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+
+    def report(self):
+        """
+        One line: tick latency percentiles, planes simulated per second of tick work,
+        bytes broadcast per tick, histogram counts per bucket, overruns/skips and mean ms per phase.
+        """
+        labels = [f'<={bound * 1000:g}ms' for bound in DURATION_BUCKETS] + [f'>{DURATION_BUCKETS[-1] * 1000:g}ms']
+        histogram = ' '.join(f'{label}:{count}' for label, count in zip(labels, self.histogram) if count)
+        phases = ' '.join(
+            f'{name} {seconds / max(self.ticks, 1) * 1000:.0f}ms' for name, seconds in self.phase_seconds.items()
+        )
+        p50, p99, worst = np.percentile(self.durations, [50, 99, 100]) * 1000 if self.durations else (0, 0, 0)
+        busy = sum(self.durations)
+        return (
+            f'{self.ticks} ticks, p50 {p50:.0f}ms, p99 {p99:.0f}ms, max {worst:.0f}ms, '
+            f'{self.planes / busy if busy else 0:.0f} planes/s, '
+            f'{self.sent_bytes / max(self.ticks, 1) / 1024:.0f} KiB/tick, '
+            f'{self.overruns} overruns, {self.skipped} skipped | {histogram} | mean {phases}'
+        )
+
+
+class TickScheduler:
+    """
+    Runs ticks on fixed wall-clock boundaries (`interval` apart) instead of sleeping a fixed
+    time after the work, so the period does not stretch with the tick's own duration.
+
+    `start_tick` returns the time actually elapsed since the previous tick started, which is
+    what the kinematics should advance by. A tick that overruns its slot skips the boundaries
+    it missed; the time of the skipped ticks is coalesced into the next tick's time delta,
+    capped at `max_time_delta` so a stalled process does not teleport planes.
+
+    With a `profiler` (see `fleet.simulation.profiling`), the code run inside phases is profiled.
+    """
+
+    def __init__(self, interval, max_time_delta=None, clock=time.monotonic, profiler=None):
+        self.interval = interval
+        self.profiler = profiler
+        self.max_time_delta = max_time_delta or 5 * interval
+        self.clock = clock
+        self.started_at = None
+        self.next_at = None
+        self.phases = {}
+        self.stats = TickStats()
+
+    def start_tick(self):
+        """Marks the start of a tick and returns the simulated seconds it should cover."""
+        now = self.clock()
+        if self.started_at is None:
+            time_delta = self.interval
+            self.next_at = now
+        else:
+            time_delta = min(now - self.started_at, self.max_time_delta)
+        self.started_at = now
+        self.phases = {}
+        return time_delta
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            with self.profiler.profile() if self.profiler else nullcontext():
+                yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def record_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def finish_tick(self, planes=0, sent_bytes=0):
+        """Records the tick and returns how long to wait until the next tick boundary."""
+        now = self.clock()
+        self.stats.record(now - self.started_at, self.phases, planes, sent_bytes)
+        if self.profiler:
+            self.profiler.tick_done()
+        self.next_at += self.interval
+        if now > self.next_at:
+            # Overran: the boundaries already passed are skipped, not run back to back
+            missed = math.floor((now - self.next_at) / self.interval) + 1
+            self.stats.overruns += 1
+            self.stats.skipped += missed
+            self.next_at += missed * self.interval
+        return max(0.0, self.next_at - now)
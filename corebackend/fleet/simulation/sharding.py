@@ -0,0 +1,225 @@
+"""
+Multi-process simulation: the fleet is split by `plane id % shards` across worker
+processes, each with its own `FleetState`, database connection and position writes.
+The coordinator (the `run_simulation` process) forwards change notifications, asks
+every shard to advance one tick and merges their positions into one broadcast.
+
+A failing database call only costs its shard that step of the tick (unwritten
+positions are kept and retried, as with `WriteBehindFlusher`); a shard process that
+dies (or stops answering) is left out of that tick and started again on the next one.
+The first shards are forked before the event loop starts; replacements are started
+from a forkserver, since forking the running, multi-threaded coordinator is unsafe.
+"""
+import multiprocessing
+import multiprocessing.forkserver
+import sys
+import time
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from .persistence import TrackRecorder, WriteBehindFlusher
+from .restart import run_restarted_shard
+from .state import FleetState, positions_payload
+
+
+def _guarded(index, what, step, default=None):
+    """Runs one database step of a shard tick; a failure is logged and the connection reset."""
+    try:
+        return step()
+    except Exception as e:
+        print(f"Shard {index}: {what} failed: {e}", file=sys.stderr)
+        # A broken connection (reset, failed transaction) is reopened by the next query
+        connections.close_all()
+        return default
+
+
+# Seconds to wait for a shard's reply; a shard that takes longer is considered dead
+SHARD_TICK_TIMEOUT = 30
+SHARD_LOAD_TIMEOUT = 600
+
+
+def run_shard(index, count, pipe, seed):
+    """Worker process main loop: loads its shard once, then runs one tick per request."""
+    state = FleetState(np.random.default_rng(seed), shard=(index, count))
+    state.load()
+    flusher = WriteBehindFlusher(state)
+    # Each shard appends its own planes' track history
+    recorder = TrackRecorder(state) if settings.FLEET_TRACK_HISTORY else None
+    pipe.send(len(state))
+
+    while True:
+        message = pipe.recv()
+        if message is None:
+            # Shutting down: do not lose the positions simulated since the last write
+            _guarded(index, 'final position write', lambda: flusher.write(flusher.snapshot()))
+            if recorder:
+                _guarded(index, 'final track history write', lambda: recorder.write(recorder.take()))
+            pipe.send(None)
+            return
+
+        time_delta, full_delta, events, persist, recorded_at = message
+        started = time.perf_counter()
+        for event in events:
+            state.note_event(event)
+        # Notifications stay pending after a failed refresh, so the tick goes on without them
+        _guarded(index, 'refresh', lambda: state.refresh(full_delta=full_delta))
+        state.advance(time_delta)
+        computed = time.perf_counter()
+        # A failed snapshot is kept by the flusher and merged into the next one
+        written = _guarded(index, 'position write', lambda: flusher.write(flusher.snapshot()), 0) if persist else 0
+        if recorder:
+            # Every shard stamps the tick with the coordinator's time, so replays see one frame per tick
+            recorder.sample(recorded_at)
+            if recorder.due():
+                # The ticks are kept for the next write; the tick itself must not fail
+                _guarded(index, 'track history write', lambda: recorder.write(recorder.take()))
+        pipe.send((
+            state.ids, state.lon, state.lat, state.bearing,
+            computed - started, time.perf_counter() - computed, written,
+        ))
+
+
+class MergedFleet:
+    """
+    The positions of every shard for one tick, sorted by id. Exposes the attributes
+    of `FleetState` used for broadcasting (tile publishing, clusters, payload).
+    """
+
+    def __init__(self, ids, lon, lat, bearing):
+        order = np.argsort(ids, kind='stable')
+        self.ids, self.lon, self.lat, self.bearing = ids[order], lon[order], lat[order], bearing[order]
+        self._row_of = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def row_of(self):
+        if self._row_of is None:
+            self._row_of = {pk: i for i, pk in enumerate(self.ids.tolist())}
+        return self._row_of
+
+    def payload(self):
+        return positions_payload(self.ids, self.lon, self.lat, self.bearing)
+
+
+class ShardCoordinator:
+    """
+    Starts and drives the shard worker processes. `tick` is blocking and meant to
+    run in a thread; the workers compute in parallel while it waits for them.
+    """
+
+    def __init__(self, shards, seed=None):
+        self.shards = shards
+        self.seed = seed
+        self.pipes = []
+        self.processes = []
+        # Per-shard timings of the last tick: (compute seconds, persist seconds, rows written)
+        self.last_timings = []
+        self.planes = 0
+
+    def start(self):
+        """
+        Forks the workers and waits until each one has loaded its planes. Returns the plane count.
+        Must run before the event loop (or any thread or connection) starts.
+        """
+        self.seeds = np.random.SeedSequence(self.seed).spawn(self.shards)
+        self.pipes = [None] * self.shards
+        self.processes = [None] * self.shards
+        # Connections must not be shared with forked children
+        connections.close_all()
+        for index in range(self.shards):
+            self._spawn(index, multiprocessing.get_context('fork'), run_shard)
+        # Started now, while this process is still single-threaded; restarts fork from it.
+        # It preloads the heavy imports rather than __main__ (the default).
+        multiprocessing.forkserver.set_forkserver_preload(['django', 'numpy'])
+        multiprocessing.forkserver.ensure_running()
+        loaded = [self._receive(index, SHARD_LOAD_TIMEOUT) for index in range(self.shards)]
+        if None in loaded:
+            raise RuntimeError(f"Simulation shard {loaded.index(None)} failed to load its planes")
+        return sum(loaded)
+
+    def _spawn(self, index, context, target):
+        parent, child = context.Pipe()
+        process = context.Process(
+            target=target, args=(index, self.shards, child, self.seeds[index]), daemon=True,
+            name=f'simulation-shard-{index}',
+        )
+        process.start()
+        # Only the shard may hold this end, or its exit would never show as EOF here
+        child.close()
+        self.pipes[index], self.processes[index] = parent, process
+
+    def _receive(self, index, timeout):
+        """The shard's reply, or None if it died or did not answer in time (it is then killed)."""
+        pipe = self.pipes[index]
+        try:
+            if pipe.poll(timeout):
+                return pipe.recv()
+        except (EOFError, OSError):
+            pass
+        # A late reply would be read as the next tick's, so a slow shard is replaced too
+        self.processes[index].kill()
+        self.processes[index].join()
+        return None
+
+    def _restart(self, index):
+        """Replaces a dead shard; the new one loads its planes from the database."""
+        print(f"Simulation shard {index} died (exit code {self.processes[index].exitcode}), restarting it", file=sys.stderr)
+        self.pipes[index].close()
+        self._spawn(index, multiprocessing.get_context('forkserver'), run_restarted_shard)
+        # If the replacement fails too, it is left out and retried on the next tick
+        self._receive(index, SHARD_LOAD_TIMEOUT)
+
+    def tick(self, time_delta, full_delta=False, events=(), persist=True):
+        """
+        Advances every shard by one tick and returns the merged `MergedFleet`.
+        A shard that died is left out of this tick and restarted before the next one.
+        """
+        events = list(events)
+        recorded_at = timezone.now()
+        sent = []
+        for index, pipe in enumerate(self.pipes):
+            if not self.processes[index].is_alive():
+                self._restart(index)
+                pipe = self.pipes[index]
+            try:
+                pipe.send((time_delta, full_delta, events, persist, recorded_at))
+                sent.append(index)
+            except OSError:
+                pass
+
+        results = {}
+        for index in sent:
+            result = self._receive(index, SHARD_TICK_TIMEOUT)
+            if result is not None:
+                results[index] = result
+        self.last_timings = [results[index][4:] if index in results else (0.0, 0.0, 0) for index in range(self.shards)]
+        if results:
+            fleet = MergedFleet(*(np.concatenate([result[column] for result in results.values()]) for column in range(4)))
+        else:
+            fleet = MergedFleet(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0))
+        self.planes = len(fleet)
+        return fleet
+
+    def stop(self):
+        """Asks every live shard to write its remaining positions and exit."""
+        stopping = []
+        for pipe, process in zip(self.pipes, self.processes):
+            try:
+                pipe.send(None)
+                stopping.append((pipe, process))
+            except OSError:
+                pass
+        for pipe, process in stopping:
+            try:
+                # Shards write their remaining positions first, which can take a while
+                if pipe.poll(SHARD_LOAD_TIMEOUT):
+                    pipe.recv()
+            except (EOFError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+                process.join()
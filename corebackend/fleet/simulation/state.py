@@ -0,0 +1,314 @@
+import numpy as np
+from django.db.models import F, FloatField, Func
+from django.db.models.functions import Mod
+from django.utils import timezone
+from fleet.models import Plane, Airport, Command
+from .kinematics import step_fleet, pick_new_destinations
+
+
+class X(Func):
+    """PostGIS ST_X, lets us read longitudes without building GEOS objects."""
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class Y(Func):
+    """PostGIS ST_Y, lets us read latitudes without building GEOS objects."""
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+# Columns read for every plane, in the order they are unpacked in `FleetState._upsert`
+PLANE_COLUMNS = ('id', 'lon', 'lat', 'speed', 'bearing', 'origin_id', 'destination_id', 'pilot_id')
+NO_PILOT = -1
+
+
+def plane_rows(queryset):
+    """Returns plane tuples in `PLANE_COLUMNS` order."""
+    return queryset.annotate(lon=X(F('location')), lat=Y(F('location'))).values_list(*PLANE_COLUMNS)
+
+
+def command_rows(queryset):
+    """Returns (id, plane_id, status, target_lon, target_lat, version) command tuples."""
+    return queryset.annotate(
+        lon=X(F('target_location')), lat=Y(F('target_location'))
+    ).values_list('id', 'plane_id', 'status', 'lon', 'lat', 'version')
+
+
+def positions_payload(ids, lon, lat, bearing):
+    """WebSocket `plane_locations` payload of the given position columns."""
+    return [
+        {'id': pk, 'coordinates': [x, y], 'bearing': b}
+        for pk, x, y, b in zip(ids.tolist(), lon.tolist(), lat.tolist(), bearing.tolist())
+    ]
+
+
+class FleetState:
+    """
+    Resident, array-backed copy of the fleet used by the simulator.
+
+    The fleet is loaded once. Afterwards only the planes reported by change
+    notifications (see `fleet.signals`) or found by a cheap `updated_at` delta
+    query are read again, so a tick never rebuilds model instances.
+
+    Accepted commands are indexed per plane the same way: loaded once, then kept up to
+    date from `command.changed` notifications. Planes with an accepted command fly to
+    its target instead of their destination airport, and hold there until the command
+    is completed or rejected.
+
+    With `shard=(index, count)` the state only holds the planes whose `id % count == index`
+    (see `fleet.simulation.sharding`).
+    """
+
+    def __init__(self, rng=None, shard=None):
+        self.rng = rng or np.random.default_rng()
+        self.shard = shard
+        self.ids = np.empty(0, dtype=np.int64)
+        self.lon = np.empty(0)
+        self.lat = np.empty(0)
+        self.speed = np.empty(0)
+        self.bearing = np.empty(0)
+        self.origin_id = np.empty(0, dtype=np.int64)
+        self.destination_id = np.empty(0, dtype=np.int64)
+        self.pilot_id = np.empty(0, dtype=np.int64)
+        # Rows whose position changed since they were last persisted
+        self.dirty = np.empty(0, dtype=bool)
+        # Target of the plane's accepted command, NaN if it has none
+        self.target_lon = np.empty(0)
+        self.target_lat = np.empty(0)
+        self.row_of = {}
+
+        # plane id -> (command id, target lon, target lat) of its latest accepted command
+        self.commands = {}
+        self.command_version = 0
+        self.commands_changed = False
+
+        # Airports are kept sorted by id so that ids can be mapped to rows with searchsorted
+        self.airport_ids = np.empty(0, dtype=np.int64)
+        self.airport_lon = np.empty(0)
+        self.airport_lat = np.empty(0)
+
+        self.synced_at = None
+        self.changed_ids = set()
+        self.deleted_ids = set()
+        self.airports_changed = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- Loading ---
+    def load(self):
+        """Loads airports and the whole fleet. Only needed once at startup."""
+        self.synced_at = timezone.now()
+        self.load_airports()
+        self._set_rows(list(plane_rows(self._planes().order_by('id'))))
+        self._apply_command_rows(command_rows(self._commands().filter(status='accepted').order_by('id')))
+        self._apply_commands()
+
+    def load_airports(self):
+        rows = list(Airport.objects.annotate(lon=X(F('location')), lat=Y(F('location')))
+                    .order_by('id').values_list('id', 'lon', 'lat'))
+        ids, lon, lat = zip(*rows) if rows else ((), (), ())
+        self.airport_ids = np.array(ids, dtype=np.int64)
+        self.airport_lon = np.array(lon, dtype=float)
+        self.airport_lat = np.array(lat, dtype=float)
+
+    # --- Incremental updates ---
+    def note_event(self, event):
+        """Records a change notification sent by `fleet.signals`; applied on the next `refresh`."""
+        if event['type'] == 'plane.changed':
+            self.changed_ids.update(pk for pk in event['ids'] if self.owns(pk))
+        elif event['type'] == 'plane.deleted':
+            self.deleted_ids.update(pk for pk in event['ids'] if self.owns(pk))
+        elif event['type'] == 'airports.changed':
+            self.airports_changed = True
+        elif event['type'] == 'command.changed' and self.owns(event['plane']):
+            self._note_command(event['id'], event['plane'], event['status'], *event['target'])
+        elif event['type'] == 'command.deleted' and self.owns(event['plane']):
+            self._note_command(event['id'], event['plane'], 'deleted', None, None)
+
+    def owns(self, plane_id):
+        """Whether a plane belongs to this state's shard."""
+        return self.shard is None or plane_id % self.shard[1] == self.shard[0]
+
+    def _planes(self):
+        queryset = Plane.objects.all()
+        if self.shard:
+            index, count = self.shard
+            queryset = queryset.alias(shard=Mod('id', count)).filter(shard=index)
+        return queryset
+
+    def _commands(self):
+        queryset = Command.objects.all()
+        if self.shard:
+            index, count = self.shard
+            queryset = queryset.alias(shard=Mod('plane_id', count)).filter(shard=index)
+        return queryset
+
+    def refresh(self, full_delta=False):
+        """
+        Applies pending change notifications.
+        With `full_delta`, also runs the `updated_at` delta query and a deletion check,
+        which catches edits that bypass model signals (e.g. `QuerySet.update`).
+        If a query fails, the notifications it was applying stay pending for the next call.
+        """
+        if self.airports_changed:
+            self.load_airports()
+            self.airports_changed = False
+
+        if self.deleted_ids:
+            self._remove(self.deleted_ids)
+            self.deleted_ids = set()
+
+        if self.changed_ids:
+            changed = self.changed_ids
+            rows = list(plane_rows(self._planes().filter(pk__in=changed)))
+            self.changed_ids = set()
+            self._upsert(rows)
+            # Planes that were notified but no longer exist were deleted in the meantime
+            self._remove(changed.difference(row[0] for row in rows))
+
+        if full_delta:
+            since, synced_at = self.synced_at, timezone.now()
+            self._upsert(list(plane_rows(self._planes().filter(updated_at__gte=since))))
+            self.synced_at = synced_at
+            if self._planes().count() != len(self):
+                live_ids = set(self._planes().values_list('id', flat=True))
+                self._remove(set(self.row_of).difference(live_ids))
+            # Status changes made without signals (e.g. `QuerySet.update`)
+            self._apply_command_rows(command_rows(
+                self._commands().filter(version__gt=self.command_version).order_by('id')
+            ))
+
+        if self.commands_changed:
+            self._apply_commands()
+
+    def _upsert(self, rows):
+        """
+        Inserts new planes and refreshes the metadata of existing ones.
+        The resident state is authoritative for position, bearing and route, so those
+        are only taken from the database for planes we have not seen before.
+        """
+        new_rows = []
+        for row in rows:
+            pk, speed, pilot_id = row[0], row[3], row[7]
+            i = self.row_of.get(pk)
+            if i is None:
+                new_rows.append(row)
+                continue
+            self.speed[i] = speed
+            self.pilot_id[i] = NO_PILOT if pilot_id is None else pilot_id
+        if new_rows:
+            current = [getattr(self, name) for name in self._array_names()]
+            self._set_rows(new_rows)
+            for name, before in zip(self._array_names(), current):
+                setattr(self, name, np.concatenate([before, getattr(self, name)]))
+            self._reindex()
+            # A new plane may already have an accepted command
+            self.commands_changed = True
+
+    def _note_command(self, command_id, plane_id, status, lon, lat):
+        """Updates the accepted-command index with one command's current status."""
+        current = self.commands.get(plane_id)
+        if status == 'accepted':
+            # The latest accepted command of a plane wins
+            if current is None or current[0] <= command_id:
+                self.commands[plane_id] = (command_id, lon, lat)
+                self.commands_changed = True
+        elif current is not None and current[0] == command_id:
+            del self.commands[plane_id]
+            self.commands_changed = True
+
+    def _apply_command_rows(self, rows):
+        for command_id, plane_id, status, lon, lat, version in rows:
+            self._note_command(command_id, plane_id, status, lon, lat)
+            self.command_version = max(self.command_version, version)
+
+    def _apply_commands(self):
+        """Writes the command index into the target arrays."""
+        self.commands_changed = False
+        self.target_lon = np.full(len(self), np.nan)
+        self.target_lat = np.full(len(self), np.nan)
+        for plane_id, (_, lon, lat) in self.commands.items():
+            i = self.row_of.get(plane_id)
+            if i is not None:
+                self.target_lon[i], self.target_lat[i] = lon, lat
+
+    def _remove(self, ids):
+        ids = {pk for pk in ids if pk in self.row_of}
+        if not ids:
+            return
+        keep = ~np.isin(self.ids, list(ids))
+        for name in self._array_names():
+            setattr(self, name, getattr(self, name)[keep])
+        self._reindex()
+
+    # --- Simulation ---
+    def destination_rows(self):
+        """Maps every plane's destination id onto the airport arrays."""
+        return np.searchsorted(self.airport_ids, self.destination_id)
+
+    def advance(self, time_delta):
+        """
+        Moves every plane `time_delta` seconds towards its command target or destination
+        and assigns new routes to the ones that reached their airport.
+        Returns the boolean mask of planes that reached an airport.
+        """
+        if not len(self) or not len(self.airport_ids):
+            return np.zeros(len(self), dtype=bool)
+
+        dest_rows = self.destination_rows()
+        steering = ~np.isnan(self.target_lon)
+        # Planes already at their command target hold position (and heading)
+        holding = steering & (self.lat == self.target_lat) & (self.lon == self.target_lon)
+        previous_lat, previous_lon, previous_bearing = self.lat, self.lon, self.bearing
+
+        self.lat, self.lon, bearing, arrived = step_fleet(
+            self.lat, self.lon, np.where(holding, 0.0, self.speed),
+            np.where(steering, self.target_lat, self.airport_lat[dest_rows]),
+            np.where(steering, self.target_lon, self.airport_lon[dest_rows]),
+            time_delta
+        )
+        self.bearing = np.where(holding, previous_bearing, bearing)
+        # Reaching a command target does not end the route
+        arrived &= ~steering
+
+        # Determine a new route; skip re-routing if there is no other airport to fly to
+        if arrived.any() and len(self.airport_ids) > 1:
+            new_dest_rows = pick_new_destinations(dest_rows[arrived], len(self.airport_ids), self.rng)
+            self.origin_id[arrived] = self.destination_id[arrived]
+            self.destination_id[arrived] = self.airport_ids[new_dest_rows]
+
+        self.dirty |= (self.lat != previous_lat) | (self.lon != previous_lon) | arrived
+        return arrived
+
+    def payload(self):
+        """WebSocket payload of the current positions."""
+        return positions_payload(self.ids, self.lon, self.lat, self.bearing)
+
+    # --- Internals ---
+    @staticmethod
+    def _array_names():
+        return (
+            'ids', 'lon', 'lat', 'speed', 'bearing', 'origin_id', 'destination_id', 'pilot_id', 'dirty',
+            'target_lon', 'target_lat',
+        )
+
+    def _set_rows(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * len(PLANE_COLUMNS)
+        pk, lon, lat, speed, bearing, origin_id, destination_id, pilot_id = columns
+        self.ids = np.array(pk, dtype=np.int64)
+        self.lon = np.array(lon, dtype=float)
+        self.lat = np.array(lat, dtype=float)
+        self.speed = np.array(speed, dtype=float)
+        self.bearing = np.array(bearing, dtype=float)
+        self.origin_id = np.array(origin_id, dtype=np.int64)
+        self.destination_id = np.array(destination_id, dtype=np.int64)
+        self.pilot_id = np.array([NO_PILOT if p is None else p for p in pilot_id], dtype=np.int64)
+        self.dirty = np.zeros(len(self.ids), dtype=bool)
+        self.target_lon = np.full(len(self.ids), np.nan)
+        self.target_lat = np.full(len(self.ids), np.nan)
+        self._reindex()
+
+    def _reindex(self):
+        self.row_of = {pk: i for i, pk in enumerate(self.ids.tolist())}
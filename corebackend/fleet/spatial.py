@@ -0,0 +1,94 @@
+import numpy as np
+from .frames import COORD_SCALE
+
+# Grid cell size used to bucket current positions, in degrees.
+GRID_CELL_DEGREES = 1.0
+
+
+class PositionGrid:
+    """
+    Uniform lon/lat grid over one tick's positions.
+
+    Rows are sorted by cell key, so every row of cells touched by a bounding box is a
+    contiguous slice. A bbox query costs a couple of binary searches per grid row plus
+    the planes in the touched cells, instead of a scan of the whole fleet.
+    """
+
+    def __init__(self, ids, lon, lat, bearing, cell_degrees=GRID_CELL_DEGREES):
+        """Takes the quantized, id-sorted columns produced by `fleet.frames.unpack_positions`."""
+        self.ids, self.lon, self.lat, self.bearing = ids, lon, lat, bearing
+        self.cell = int(cell_degrees * COORD_SCALE)
+        self.columns = int(np.ceil(360 / cell_degrees))
+
+        keys = self._cell_y(lat) * self.columns + self._cell_x(lon)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def _cell_x(self, lon):
+        return (np.asarray(lon, dtype=np.int64) + 180 * COORD_SCALE) // self.cell
+
+    def _cell_y(self, lat):
+        return (np.asarray(lat, dtype=np.int64) + 90 * COORD_SCALE) // self.cell
+
+    def query_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Returns the (id-sorted) row indices of planes inside the bbox, given in degrees."""
+        lo_lon, lo_lat = int(min_lon * COORD_SCALE), int(min_lat * COORD_SCALE)
+        hi_lon, hi_lat = int(max_lon * COORD_SCALE), int(max_lat * COORD_SCALE)
+        x0, x1 = int(self._cell_x(lo_lon)), int(self._cell_x(hi_lon))
+        y0, y1 = int(self._cell_y(lo_lat)), int(self._cell_y(hi_lat))
+
+        starts = np.searchsorted(self.keys, [y * self.columns + x0 for y in range(y0, y1 + 1)], side='left')
+        ends = np.searchsorted(self.keys, [y * self.columns + x1 for y in range(y0, y1 + 1)], side='right')
+        if not len(starts) or (ends - starts).sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = self.order[np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])]
+
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        inside = (lon >= lo_lon) & (lon <= hi_lon) & (lat >= lo_lat) & (lat <= hi_lat)
+        return np.sort(candidates[inside])
+
+    def query_ids(self, plane_ids):
+        """Returns the row indices of the given plane ids that are present this tick."""
+        plane_ids = np.asarray(plane_ids, dtype=self.ids.dtype)
+        rows = np.searchsorted(self.ids, plane_ids).clip(max=max(len(self.ids) - 1, 0))
+        if not len(self.ids):
+            return rows[:0]
+        return np.unique(rows[self.ids[rows] == plane_ids])
+
+
+def split_bbox(min_lon, min_lat, max_lon, max_lat):
+    """
+    Splits a viewport crossing the antimeridian (`min_lon > max_lon`, or longitudes past
+    ±180 as maps report them after panning) into boxes within [-180, 180].
+    """
+    if max_lon - min_lon >= 360:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+    min_lon, max_lon = (lon if -180 <= lon <= 180 else (lon + 180) % 360 - 180 for lon in (min_lon, max_lon))
+    if min_lon <= max_lon:
+        return [(min_lon, min_lat, max_lon, max_lat)]
+    return [(min_lon, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon, max_lat)]
+
+
+class Subscription:
+    """What a WebSocket client asked to receive: a bbox, a list of plane ids, or both (union)."""
+
+    def __init__(self, bbox=None, plane_ids=None):
+        self.bbox = [float(v) for v in bbox] if bbox else None
+        self.plane_ids = [int(pk) for pk in plane_ids] if plane_ids else []
+        if self.bbox and len(self.bbox) != 4:
+            raise ValueError('bbox must be [min_lon, min_lat, max_lon, max_lat]')
+        # One box, or two for a viewport across the antimeridian
+        self.boxes = split_bbox(*self.bbox) if self.bbox else []
+
+    @classmethod
+    def from_message(cls, data):
+        """Builds a subscription from a `subscribe` message; returns None for "everything"."""
+        if not data.get('bbox') and not data.get('plane_ids'):
+            return None
+        return cls(data.get('bbox'), data.get('plane_ids'))
+
+    def rows(self, grid):
+        parts = [grid.query_bbox(*box) for box in self.boxes]
+        if self.plane_ids:
+            parts.append(grid.query_ids(self.plane_ids))
+        return np.unique(np.concatenate(parts)) if len(parts) > 1 else parts[0]
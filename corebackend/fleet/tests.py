@@ -1,3 +1,1203 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import random
+import time
+from unittest import mock
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from fleet.broadcast import FLEET_GROUP, encode_message
+from fleet.clusters import CLUSTER_MAX_ZOOM, ClusterLevel, build_cluster_levels
+from fleet.consumers import FleetConsumer, ReplayConsumer
+from fleet.frames import FRAME_HEADER, FLAG_KEYFRAME, DeltaEncoder, pack_positions, unpack_positions
+from fleet.management.commands.seed_data import seed_chunk, seed_rows
+from fleet.models import Airport, Command, Pilot, Plane, PlanePosition
+from fleet.replay import load_slice, parse_replay_request
+from fleet.serializers import PlaneFeatureSerializer, plane_features
+from fleet.spatial import PositionGrid, Subscription, split_bbox
+from fleet.tracks import drop_expired_partitions, ensure_partitions, existing_partitions, partition_name
+from fleet.tiles import lonlat_to_tile, split_by_tile, tile_bounds, tiles_for_bbox
+from fleet.simulation.kinematics import step_plane, step_fleet, pick_new_destinations
+from fleet.simulation.persistence import TrackRecorder, WriteBehindFlusher, persist_positions, record_positions
+from fleet.simulation.profiling import TickProfiler
+from fleet.simulation.publishing import TilePublisher
+from fleet.simulation.scheduler import TickScheduler
+from fleet.simulation.sharding import MergedFleet, ShardCoordinator, run_shard
+from fleet.simulation.state import FleetState
+from fleet.vector_tiles import TILE_CONTENT_TYPE, set_current_tick
 
-# Create your tests here.
+
+def create_fleet(count, airports=None, start=0):
+    """Creates `count` planes flying between two airports. Returns (airports, planes)."""
+    airports = airports or [
+        Airport.objects.create(code='IST', name='Istanbul', location=Point(28.7519, 41.2753)),
+        Airport.objects.create(code='ESB', name='Ankara', location=Point(32.9951, 40.1281)),
+    ]
+    planes = Plane.objects.bulk_create([
+        Plane(
+            model='Bayraktar TB2', tail_number=f'TC-TST-{i:04d}',
+            origin=airports[0], destination=airports[1],
+            location=Point(29 + i * 0.001, 40.5), speed=300 / 3600,
+        )
+        for i in range(start, start + count)
+    ])
+    return airports, planes
+
+
+class KinematicsEquivalenceTests(SimpleTestCase):
+    """
+    The vectorized engine must match the scalar reference implementation.
+    """
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.samples = [
+            (
+                rng.uniform(36, 42), rng.uniform(26, 45),  # current lat/lon
+                rng.uniform(200, 400) / 3600,               # speed (km/s)
+                rng.uniform(36, 42), rng.uniform(26, 45),  # destination lat/lon
+            )
+            for _ in range(2000)
+        ]
+        # Planes sitting right next to their destination must be detected as arrived
+        self.samples += [(40.0, 30.0, 0.1, 40.0001, 30.0001), (38.0, 35.0, 0.1, 37.9999, 35.0)]
+
+    def test_step_fleet_matches_scalar_reference(self):
+        lat, lon, speed, dest_lat, dest_lon = (np.array(col) for col in zip(*self.samples))
+        new_lat, new_lon, bearing, arrived = step_fleet(lat, lon, speed, dest_lat, dest_lon, 2)
+
+        for i, sample in enumerate(self.samples):
+            ref_lat, ref_lon, ref_bearing, ref_arrived = step_plane(*sample, 2)
+            self.assertEqual(bool(arrived[i]), ref_arrived)
+            self.assertAlmostEqual(new_lat[i], ref_lat, places=9)
+            self.assertAlmostEqual(new_lon[i], ref_lon, places=9)
+            self.assertAlmostEqual(bearing[i], ref_bearing, places=9)
+
+        self.assertTrue(arrived[-2:].all())
+
+    def test_pick_new_destinations_never_returns_current_airport(self):
+        current = np.random.default_rng(0).integers(0, 11, size=5000)
+        picks = pick_new_destinations(current, 11, np.random.default_rng(1))
+        self.assertFalse((picks == current).any())
+        self.assertTrue(((picks >= 0) & (picks < 11)).all())
+
+
+class FleetStateTests(TestCase):
+    """
+    The resident simulation state picks up edits without reloading the fleet.
+    """
+
+    def setUp(self):
+        self.airports, self.planes = create_fleet(5)
+        self.state = FleetState(np.random.default_rng(0))
+        self.state.load()
+
+    def test_load_reads_whole_fleet(self):
+        self.assertEqual(sorted(self.state.ids.tolist()), sorted(p.pk for p in self.planes))
+        self.assertAlmostEqual(self.state.lat[0], 40.5)
+
+    def test_notifications_apply_new_planes_deletions_and_pilot_changes(self):
+        new_plane = Plane.objects.create(
+            model='Akinci', tail_number='TC-TST-NEW', origin=self.airports[1],
+            destination=self.airports[0], location=Point(32, 40)
+        )
+        pilot = Pilot.objects.create(user=User.objects.create(username='p1'), rank='Captain', call_sign='P1')
+        Plane.objects.filter(pk=self.planes[0].pk).update(pilot=pilot)
+        deleted_pk = self.planes[1].pk
+        self.planes[1].delete()
+
+        self.state.note_event({'type': 'plane.changed', 'ids': [new_plane.pk, self.planes[0].pk]})
+        self.state.note_event({'type': 'plane.deleted', 'ids': [deleted_pk]})
+        with self.assertNumQueries(1):
+            self.state.refresh()
+
+        self.assertIn(new_plane.pk, self.state.row_of)
+        self.assertNotIn(deleted_pk, self.state.row_of)
+        self.assertEqual(self.state.pilot_id[self.state.row_of[self.planes[0].pk]], pilot.pk)
+
+    def test_delta_query_catches_edits_without_notifications(self):
+        Plane.objects.filter(pk=self.planes[0].pk).update(speed=1.0, updated_at=self.state.synced_at)
+        Plane.objects.filter(pk=self.planes[1].pk).delete()
+
+        self.state.refresh(full_delta=True)
+
+        self.assertEqual(self.state.speed[self.state.row_of[self.planes[0].pk]], 1.0)
+        self.assertNotIn(self.planes[1].pk, self.state.row_of)
+        self.assertEqual(len(self.state), 4)
+
+    def test_advance_moves_planes_towards_destination(self):
+        before = self.state.lon.copy()
+        self.state.advance(2)
+        self.assertTrue((self.state.lon > before).all())
+
+    def test_accepted_command_steers_plane_until_completed(self):
+        plane = self.planes[0]
+        pilot = Pilot.objects.create(user=User.objects.create(username='p1'), rank='Captain', call_sign='P1')
+        command = Command.objects.create(
+            plane=plane, pilot=pilot, message='Go north', target_location=Point(29, 40.6), status='accepted'
+        )
+        event = {'type': 'command.changed', 'id': command.pk, 'plane': plane.pk, 'status': 'accepted', 'target': [29, 40.6]}
+        self.state.note_event(event)
+        row = self.state.row_of[plane.pk]
+
+        with self.assertNumQueries(0):
+            self.state.refresh()
+            for _ in range(5):
+                arrived = self.state.advance(60)
+        # Holds at the target instead of being rerouted
+        self.assertEqual((self.state.lon[row], self.state.lat[row]), (29, 40.6))
+        self.assertFalse(arrived[row])
+
+        self.state.note_event({**event, 'status': 'completed'})
+        self.state.refresh()
+        self.state.advance(2)
+        self.assertGreater(self.state.lon[row], 29)
+
+    def test_load_picks_up_accepted_commands(self):
+        pilot = Pilot.objects.create(user=User.objects.create(username='p1'), rank='Captain', call_sign='P1')
+        Command.objects.create(
+            plane=self.planes[1], pilot=pilot, message='Hold', target_location=Point(30, 41), status='accepted'
+        )
+        state = FleetState()
+        state.load()
+        row = state.row_of[self.planes[1].pk]
+        self.assertEqual((state.target_lon[row], state.target_lat[row]), (30, 41))
+        self.assertTrue(np.isnan(state.target_lon[state.row_of[self.planes[0].pk]]))
+
+    def test_shards_partition_the_fleet(self):
+        shards = [FleetState(shard=(index, 3)) for index in range(3)]
+        for shard in shards:
+            shard.load()
+        ids = np.concatenate([shard.ids for shard in shards])
+        self.assertEqual(sorted(ids.tolist()), sorted(self.state.ids.tolist()))
+
+        # Notifications about planes of other shards are ignored
+        other = next(pk for pk in ids.tolist() if pk % 3 != 0)
+        shards[0].note_event({'type': 'plane.changed', 'ids': [other]})
+        with self.assertNumQueries(0):
+            shards[0].refresh()
+        self.assertNotIn(other, shards[0].row_of)
+
+        merged = MergedFleet(ids, *(np.concatenate([getattr(s, name) for s in shards]) for name in ('lon', 'lat', 'bearing')))
+        self.assertEqual(merged.ids.tolist(), sorted(ids.tolist()))
+        self.assertEqual(merged.payload(), self.state.payload())
+
+
+class FakePipe:
+    """One end of a shard pipe: `send`s are recorded, `recv` pops the queued replies (EOF once they run out)."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def poll(self, timeout=None):
+        return True
+
+    def recv(self):
+        if not self.replies:
+            raise EOFError
+        return self.replies.pop(0)
+
+    def close(self):
+        pass
+
+
+class ShardTests(TestCase):
+    """
+    A failing database call or a dead shard process must not stop the sharded simulation.
+    """
+
+    def setUp(self):
+        create_fleet(3)
+
+    @override_settings(FLEET_TRACK_HISTORY=False)
+    @mock.patch('fleet.simulation.sharding.connections')
+    def test_worker_survives_a_failed_write(self, connections):
+        recorded_at = timezone.now()
+        pipe = FakePipe((2, False, [], True, recorded_at), (2, False, [], True, recorded_at), None)
+        with mock.patch('fleet.simulation.persistence.persist_positions', side_effect=[OperationalError('reset'), 3, 0]):
+            run_shard(0, 1, pipe, 0)
+
+        loaded, first, second, stopped = pipe.sent
+        self.assertEqual((loaded, stopped), (3, None))
+        self.assertEqual(len(first[0]), 3)
+        # The failed snapshot is written with the next tick
+        self.assertEqual((first[-1], second[-1]), (0, 3))
+        connections.close_all.assert_called_once()
+
+    def test_coordinator_restarts_a_dead_shard(self):
+        reply = lambda *ids: (np.array(ids), np.zeros(len(ids)), np.zeros(len(ids)), np.zeros(len(ids)), 0.1, 0.2, len(ids))
+        coordinator = ShardCoordinator(2)
+        coordinator.seeds = [0, 1]
+        coordinator.pipes = [FakePipe(reply(2), reply(2)), FakePipe()]
+        coordinator.processes = [mock.Mock(is_alive=lambda: True), mock.Mock(is_alive=lambda: True)]
+
+        # Shard 1 dies during the tick: its planes are missing from this one only
+        fleet = coordinator.tick(2)
+        self.assertEqual(fleet.ids.tolist(), [2])
+        self.assertEqual(coordinator.last_timings, [(0.1, 0.2, 1), (0.0, 0.0, 0)])
+
+        coordinator.processes[1].is_alive = lambda: False
+        def spawn(index, context, target):
+            coordinator.pipes[index] = FakePipe(1, reply(1, 3))
+            coordinator.processes[index] = mock.Mock(is_alive=lambda: True)
+        with mock.patch.object(coordinator, '_spawn', side_effect=spawn):
+            fleet = coordinator.tick(2)
+        self.assertEqual(fleet.ids.tolist(), [1, 2, 3])
+        coordinator.stop()
+
+
+@override_settings(FLEET_TRACK_HISTORY=False)
+class ShardProcessTests(SimpleTestCase):
+    """
+    Real shard processes, with empty states so they never query the database.
+    Patches made before `start()` are inherited by the forked shards.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(FleetState, 'load')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tick_with_failing_shards(self, failing, fail):
+        def advance(state, time_delta):
+            if state.shard[0] in failing:
+                fail()
+
+        with mock.patch.object(FleetState, 'advance', autospec=True, side_effect=advance):
+            coordinator = ShardCoordinator(2)
+            self.assertEqual(coordinator.start(), 0)
+            started = time.monotonic()
+            fleet = coordinator.tick(2)
+            self.assertLess(time.monotonic() - started, 5)
+            coordinator.stop()
+        return coordinator, fleet
+
+    def test_shard_dying_mid_tick(self):
+        # A dead shard shows up as EOF at once, not as a reply timeout
+        coordinator, fleet = self.tick_with_failing_shards({1}, lambda: os._exit(1))
+        self.assertEqual(len(fleet), 0)
+        self.assertEqual(coordinator.last_timings[1], (0.0, 0.0, 0))
+        self.assertEqual(coordinator.processes[1].exitcode, 1)
+        self.assertEqual(coordinator.processes[0].exitcode, 0)
+
+    def test_every_shard_dying(self):
+        coordinator, fleet = self.tick_with_failing_shards({0, 1}, lambda: os._exit(1))
+        self.assertEqual((len(fleet), coordinator.planes), (0, 0))
+
+    @mock.patch('fleet.simulation.sharding.SHARD_TICK_TIMEOUT', 1)
+    def test_hung_shard_is_killed(self):
+        coordinator, fleet = self.tick_with_failing_shards({1}, lambda: time.sleep(60))
+        self.assertEqual(coordinator.last_timings[1], (0.0, 0.0, 0))
+        self.assertEqual(coordinator.processes[1].exitcode, -9)
+        self.assertEqual(coordinator.processes[0].exitcode, 0)
+
+
+class WriteBehindFlusherTests(TestCase):
+    """
+    Positions are persisted with COPY + UPDATE ... FROM, only for dirty rows.
+    """
+
+    def setUp(self):
+        self.airports, self.planes = create_fleet(3)
+        self.state = FleetState(np.random.default_rng(0))
+        self.state.load()
+        self.flusher = WriteBehindFlusher(self.state)
+
+    def test_flush_writes_dirty_positions(self):
+        self.state.advance(2)
+        self.assertEqual(self.flusher.metrics()['dirty_rows'], 3)
+
+        self.assertEqual(self.flusher.write(self.flusher.snapshot()), 3)
+
+        self.assertEqual(self.flusher.metrics()['dirty_rows'], 0)
+        for plane in Plane.objects.all():
+            i = self.state.row_of[plane.pk]
+            self.assertAlmostEqual(plane.location.x, self.state.lon[i], places=6)
+            self.assertAlmostEqual(plane.location.y, self.state.lat[i], places=6)
+            self.assertAlmostEqual(plane.bearing, self.state.bearing[i], places=4)
+
+    def test_clean_state_flushes_nothing(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.flusher.write(self.flusher.snapshot()), 0)
+
+
+class TrackHistoryTests(TestCase):
+    """
+    Every tick's positions are appended to the day-partitioned track history.
+    """
+
+    def setUp(self):
+        self.airports, self.planes = create_fleet(3)
+        self.state = FleetState(np.random.default_rng(0))
+        self.state.load()
+        self.today = timezone.now().date()
+        ensure_partitions(self.today)
+
+    def test_failed_write_is_retried_with_the_next_ticks(self):
+        recorder = TrackRecorder(self.state, flush_every=1)
+        recorder.next_rollover_at = float('inf')
+        recorder.sample()
+        with mock.patch('fleet.simulation.persistence.record_positions', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                recorder.write(recorder.take())
+
+        recorder.sample()
+        self.assertEqual(recorder.write(recorder.take()), 6)
+
+    def test_positions_are_copied_into_the_partition_of_their_day(self):
+        recorder = TrackRecorder(self.state, flush_every=2)
+        recorder.next_rollover_at = float('inf')
+        for _ in range(2):
+            self.state.advance(2)
+            recorder.sample()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(recorder.write(recorder.take()), 6)
+        track = PlanePosition.objects.filter(plane=self.planes[0]).order_by('recorded_at')
+        self.assertEqual(track.count(), 2)
+        self.assertAlmostEqual(track.last().lon, self.state.lon[self.state.row_of[self.planes[0].pk]], places=6)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {partition_name(self.today)}")
+            self.assertEqual(cursor.fetchone()[0], 6)
+
+    def test_rollover_drops_expired_partitions(self):
+        old_day = self.today - datetime.timedelta(days=30)
+        ensure_partitions(old_day, days_ahead=0)
+
+        dropped = drop_expired_partitions(self.today, retention_days=7)
+
+        self.assertEqual(dropped, [partition_name(old_day)])
+        days = [day for day, _ in existing_partitions()]
+        self.assertEqual(days, [self.today + datetime.timedelta(days=offset) for offset in range(3)])
+
+    def test_track_endpoint_returns_simplified_line(self):
+        plane = self.planes[0]
+        start = timezone.now() - datetime.timedelta(minutes=10)
+        points = [(29, 40), (29.5, 40.00001), (30, 40), (30, 41)]
+        record_positions([
+            (start + datetime.timedelta(seconds=2 * i), np.array([plane.pk]), np.array([lon]), np.array([lat]), np.zeros(1))
+            for i, (lon, lat) in enumerate(points)
+        ])
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='viewer'))
+
+        response = client.get(f'/api/fleet/planes/{plane.pk}/track/', {'tolerance': 50})
+
+        self.assertEqual(response.status_code, 200)
+        # The middle point is ~1 m off the line and is simplified away
+        self.assertEqual(response.data['geometry'], {'type': 'LineString', 'coordinates': [[29, 40], [30, 40], [30, 41]]})
+        self.assertEqual(response.data['properties']['sampled_points'], 4)
+        self.assertEqual(client.get(f'/api/fleet/planes/{plane.pk}/track/', {'from': 'yesterday'}).status_code, 400)
+
+    def test_replay_slices_are_one_frame_per_tick(self):
+        start = timezone.now() - datetime.timedelta(minutes=10)
+        recorder = TrackRecorder(self.state)
+        recorder.next_rollover_at = float('inf')
+        for tick in range(3):
+            self.state.advance(2)
+            recorder.sample(start + datetime.timedelta(seconds=2 * tick))
+        recorder.write(recorder.take())
+
+        frames = load_slice(start, start + datetime.timedelta(seconds=4))
+
+        self.assertEqual([recorded_at for recorded_at, _ in frames], [start.timestamp(), start.timestamp() + 2])
+        ids, lon, lat, bearing = unpack_positions(frames[1][1])
+        self.assertEqual(ids.tolist(), sorted(p.pk for p in self.planes))
+
+
+class ReplayRequestTests(SimpleTestCase):
+    def test_replay_request_is_validated(self):
+        start, end, speed = parse_replay_request({'from': '2025-08-01T10:00:00Z', 'to': '2025-08-01T12:00', 'speed': 50})
+        self.assertEqual((end - start, speed), (datetime.timedelta(hours=2), 50))
+        for message in (
+            {'from': '2025-08-01T10:00:00Z', 'to': '2025-08-01T12:00:00Z', 'speed': 500},
+            {'from': '2025-08-01T12:00:00Z', 'to': '2025-08-01T10:00:00Z'},
+            {'from': '2025-08-01T10:00:00Z', 'to': '2025-08-03T10:00:00Z'},
+            {'to': '2025-08-01T10:00:00Z'},
+        ):
+            with self.assertRaises(ValueError):
+                parse_replay_request(message)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ReplayConsumerTests(SimpleTestCase):
+    """
+    The replay socket streams recorded frames (read here from a fake history) in time order.
+    """
+
+    start = datetime.datetime(2025, 8, 1, 10, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        # One frame per 2 s tick for the first 10 s
+        self.frames = [
+            (self.start.timestamp() + t, pack_positions(np.array([1, 2]), np.array([30.0, 31.0 + t]), np.full(2, 40.0), np.zeros(2)))
+            for t in range(0, 10, 2)
+        ]
+        patcher = mock.patch('fleet.consumers.read_slice', side_effect=self.read_slice)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def read_slice(self, start, end):
+        return [frame for frame in self.frames if start.timestamp() <= frame[0] < end.timestamp()]
+
+    async def connect(self, path='/ws/fleet/replay/'):
+        communicator = WebsocketCommunicator(ReplayConsumer.as_asgi(), path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def request(self, seconds=10, speed=100):
+        end = self.start + datetime.timedelta(seconds=seconds)
+        return {'type': 'replay', 'from': self.start.isoformat(), 'to': end.isoformat(), 'speed': speed}
+
+    async def test_replays_frames_in_order(self):
+        communicator = await self.connect()
+        await communicator.send_json_to(self.request())
+        self.assertEqual((await communicator.receive_json_from())['type'], 'replay_started')
+        frames = [await communicator.receive_json_from() for _ in self.frames]
+        self.assertEqual([frame['type'] for frame in frames], ['plane_locations'] * len(self.frames))
+        self.assertEqual(frames[1]['time'], (self.start + datetime.timedelta(seconds=2)).isoformat())
+        self.assertEqual([plane['coordinates'][0] for plane in frames[2]['data']], [30.0, 35.0])
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'replay_finished', 'frames': 5, 'skipped': 0})
+        await communicator.disconnect()
+
+    async def test_binary_frames(self):
+        communicator = await self.connect('/ws/fleet/replay/?frames=binary')
+        await communicator.send_json_to(self.request())
+        self.assertEqual((await communicator.receive_json_from())['type'], 'replay_started')
+        frame = await communicator.receive_output()
+        self.assertEqual(FRAME_HEADER.unpack_from(frame['bytes'])[4], 2)
+        await communicator.disconnect()
+
+    async def test_stop_and_errors(self):
+        communicator = await self.connect()
+        await communicator.send_to(text_data='not json')
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.send_json_to({**self.request(), 'speed': 1000})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+
+        # At 1x the second frame is 2 s away; stopping ends the replay before it
+        await communicator.send_json_to(self.request(speed=1))
+        self.assertEqual((await communicator.receive_json_from())['type'], 'replay_started')
+        self.assertEqual((await communicator.receive_json_from())['type'], 'plane_locations')
+        await communicator.send_json_to({'type': 'stop'})
+        self.assertTrue(await communicator.receive_nothing(timeout=0.5))
+
+        with mock.patch('fleet.consumers.read_slice', side_effect=OperationalError('gone')):
+            await communicator.send_json_to(self.request())
+            self.assertEqual((await communicator.receive_json_from())['type'], 'replay_started')
+            self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+            self.assertEqual((await communicator.receive_json_from())['frames'], 0)
+        await communicator.disconnect()
+
+
+class TickSchedulerTests(SimpleTestCase):
+    """
+    Ticks start on fixed boundaries and advance planes by the time that actually passed.
+    """
+
+    def setUp(self):
+        self.now = 100.0
+        self.scheduler = TickScheduler(2, clock=lambda: self.now)
+
+    def test_waits_until_the_next_boundary(self):
+        self.assertEqual(self.scheduler.start_tick(), 2)
+        self.now += 0.5
+        self.assertEqual(self.scheduler.finish_tick(), 1.5)
+        self.now += 1.5
+        self.assertEqual(self.scheduler.start_tick(), 2)
+        self.assertEqual(self.scheduler.stats.overruns, 0)
+
+    def test_overrun_skips_boundaries_and_coalesces_their_time(self):
+        self.scheduler.start_tick()
+        self.now += 4.5
+        # Boundaries at +2 and +4 were missed, the next one is at +6
+        self.assertEqual(self.scheduler.finish_tick(), 1.5)
+        self.now += 1.5
+        self.assertEqual(self.scheduler.start_tick(), 6)
+        self.assertEqual((self.scheduler.stats.overruns, self.scheduler.stats.skipped), (1, 2))
+
+    def test_stats_histogram_and_phases(self):
+        self.scheduler.start_tick()
+        self.scheduler.record_phase('compute', 0.2)
+        self.now += 0.3
+        self.scheduler.finish_tick()
+        stats = self.scheduler.stats
+        self.assertEqual(sum(stats.histogram), 1)
+        self.assertEqual(stats.phase_seconds['compute'], 0.2)
+        self.assertIn('compute 200ms', stats.report())
+
+    def test_throughput_and_latency_percentiles(self):
+        for duration in (0.1, 0.1, 0.3):
+            self.scheduler.start_tick()
+            self.now += duration
+            self.scheduler.finish_tick(planes=1000, sent_bytes=2048)
+            self.now += 2 - duration
+        report = self.scheduler.stats.report()
+        self.assertIn('p50 100ms', report)
+        self.assertIn('6000 planes/s', report)
+        self.assertIn('2 KiB/tick', report)
+
+    def test_profiler_dumps_after_the_profiled_ticks(self):
+        stream = io.StringIO()
+        self.scheduler.profiler = TickProfiler(2, stream=stream)
+        for _ in range(3):
+            self.scheduler.start_tick()
+            with self.scheduler.phase('compute'):
+                sorted(range(1000), reverse=True)
+            self.scheduler.finish_tick()
+        self.assertFalse(self.scheduler.profiler.active)
+        self.assertEqual(stream.getvalue().count('function calls'), 1)
+
+
+class BinaryFrameTests(SimpleTestCase):
+    """
+    Binary frames only carry planes that moved since the last acknowledged frame.
+    """
+
+    def positions(self, lon_by_id):
+        ids = np.array(list(lon_by_id))
+        lon = np.array(list(lon_by_id.values()))
+        return unpack_positions(pack_positions(ids, lon, np.full(len(ids), 40.0), np.zeros(len(ids))))
+
+    def header(self, frame):
+        version, frame_type, flags, seq, count, removed = FRAME_HEADER.unpack_from(frame)
+        return {'flags': flags, 'seq': seq, 'count': count, 'removed': removed}
+
+    def test_first_frame_is_a_full_keyframe(self):
+        frame = DeltaEncoder().encode(*self.positions({1: 30.0, 2: 31.0}))
+        header = self.header(frame)
+        self.assertEqual(header['flags'] & FLAG_KEYFRAME, FLAG_KEYFRAME)
+        self.assertEqual(header['count'], 2)
+        self.assertEqual(len(frame), FRAME_HEADER.size + 2 * 16)
+
+    def test_unacknowledged_planes_are_resent(self):
+        encoder = DeltaEncoder()
+        encoder.encode(*self.positions({1: 30.0, 2: 31.0}))
+        self.assertEqual(self.header(encoder.encode(*self.positions({1: 30.0, 2: 31.0})))['count'], 2)
+
+    def test_only_moved_and_removed_planes_are_sent_after_ack(self):
+        encoder = DeltaEncoder()
+        first = self.header(encoder.encode(*self.positions({1: 30.0, 2: 31.0, 3: 32.0})))
+        encoder.ack(first['seq'])
+
+        frame = encoder.encode(*self.positions({1: 30.0, 2: 31.01}))
+        header = self.header(frame)
+
+        self.assertEqual(header['flags'] & FLAG_KEYFRAME, 0)
+        self.assertEqual(header['count'], 1)
+        self.assertEqual(header['removed'], 1)
+        ids = np.frombuffer(frame, dtype='<i4', count=1, offset=FRAME_HEADER.size)
+        removed = np.frombuffer(frame, dtype='<i4', count=1, offset=FRAME_HEADER.size + 16)
+        self.assertEqual(ids.tolist(), [2])
+        self.assertEqual(removed.tolist(), [3])
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS, FLEET_TILE_GROUPS=False)
+class FleetConsumerTests(SimpleTestCase):
+    """
+    WebSocket clients of the live feed: malformed messages are dropped, not fatal.
+    """
+
+    async def connect(self, path='/ws/fleet/'):
+        communicator = WebsocketCommunicator(FleetConsumer.as_asgi(), path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_bad_messages_are_dropped(self):
+        communicator = await self.connect('/ws/fleet/?frames=binary')
+        await communicator.send_to(bytes_data=b'\x00')
+        await communicator.send_to(text_data='{not json')
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.send_to(text_data='[1, 2]')
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        for ack in ({'type': 'ack'}, {'type': 'ack', 'seq': 'x'}, {'type': 'ack', 'seq': None}):
+            await communicator.send_json_to(ack)
+        self.assertTrue(await communicator.receive_nothing())
+        # Still connected: a resync is handled as usual
+        await communicator.send_json_to({'type': 'resync'})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_bbox_subscription_filters_positions(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'subscribe', 'bbox': [179, 0, -179, 20], 'plane_ids': [3]})
+        await communicator.send_json_to({'type': 'subscribe', 'bbox': [1, 2, 3]})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+
+        ids, lon = np.array([1, 2, 3, 4]), np.array([179.5, -179.5, 30.0, 31.0])
+        positions = pack_positions(ids, lon, np.full(4, 10.0), np.zeros(4))
+        await get_channel_layer().group_send(FLEET_GROUP, encode_message('plane_locations', [], positions=positions, tick='t1'))
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'plane_locations')
+        self.assertEqual([plane['id'] for plane in message['data']], [1, 2, 3])
+        await communicator.disconnect()
+
+    @override_settings(FLEET_TILE_GROUPS=True, FLEET_TILE_ZOOM=4)
+    async def test_tile_groups_across_the_antimeridian(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'subscribe', 'bbox': [179, 0, -179, 20]})
+        self.assertTrue(await communicator.receive_nothing())
+
+        ids, lon = np.array([1, 2, 3]), np.array([179.5, -179.5, 30.0])
+        fleet = MergedFleet(ids, lon, np.full(3, 10.0), np.zeros(3))
+        publisher = TilePublisher(4)
+        await publisher.publish(get_channel_layer(), publisher.messages(fleet, 't1'))
+        message = await communicator.receive_json_from()
+        self.assertEqual([plane['id'] for plane in message['data']], [1, 2])
+        await communicator.disconnect()
+
+
+class PositionGridTests(SimpleTestCase):
+    """
+    Grid queries must return exactly what a full scan would.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        count = 5000
+        self.ids = np.arange(1, count + 1)
+        self.lon = rng.uniform(26, 45, count)
+        self.lat = rng.uniform(36, 42, count)
+        self.grid = PositionGrid(*unpack_positions(pack_positions(self.ids, self.lon, self.lat, np.zeros(count))))
+
+    def test_bbox_query_matches_full_scan(self):
+        for bbox in [(30, 38, 31.5, 39), (26, 36, 45, 42), (44.9, 41.9, 50, 50), (0, 0, 1, 1)]:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            expected = np.flatnonzero(
+                (self.lon >= min_lon) & (self.lon <= max_lon) & (self.lat >= min_lat) & (self.lat <= max_lat)
+            )
+            self.assertEqual(self.grid.query_bbox(*bbox).tolist(), expected.tolist())
+
+    def test_subscription_combines_bbox_and_plane_ids(self):
+        subscription = Subscription(bbox=[30, 38, 31.5, 39], plane_ids=[1, 999999])
+        rows = subscription.rows(self.grid)
+        self.assertIn(0, rows)
+        self.assertEqual(len(rows), len(set(rows.tolist())))
+
+    def test_bbox_across_the_antimeridian(self):
+        ids, lon = np.array([1, 2, 3, 4]), np.array([179.5, -179.5, 0.0, 190.0 - 360])
+        grid = PositionGrid(*unpack_positions(pack_positions(ids, lon, np.full(4, 10.0), np.zeros(4))))
+        # As sent by a map panned across ±180°: min_lon > max_lon, or longitudes past 180
+        for bbox in ([179, 0, -169, 20], [179, 0, 191, 20]):
+            self.assertEqual(grid.ids[Subscription(bbox=bbox).rows(grid)].tolist(), [1, 2, 4])
+        self.assertEqual(split_bbox(-200, 0, 200, 20), [(-180.0, 0, 180.0, 20)])
+
+    def test_empty_subscription_means_everything(self):
+        self.assertIsNone(Subscription.from_message({'type': 'subscribe'}))
+
+
+class TileTests(SimpleTestCase):
+    """
+    Web-mercator tile helpers used to shard position updates into channel groups.
+    """
+
+    def test_tile_contains_its_points(self):
+        x, y = lonlat_to_tile(np.array([28.9784]), np.array([41.0082]), 7)
+        min_lon, min_lat, max_lon, max_lat = tile_bounds(7, int(x[0]), int(y[0]))
+        self.assertTrue(min_lon <= 28.9784 <= max_lon and min_lat <= 41.0082 <= max_lat)
+
+    def test_bbox_tiles_cover_split_tiles(self):
+        rng = np.random.default_rng(3)
+        lon, lat = rng.uniform(30, 33, 500), rng.uniform(38, 40, 500)
+        tiles = split_by_tile(lon, lat, 8)
+        self.assertEqual(sum(len(rows) for rows in tiles.values()), 500)
+        self.assertTrue(set(tiles).issubset(tiles_for_bbox(30, 38, 33, 40, 8)))
+
+
+class ClusterTests(SimpleTestCase):
+    """
+    Low-zoom clusters published by the simulator for the plane list.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.lon, self.lat = rng.uniform(26, 45, 2000), rng.uniform(36, 42, 2000)
+        self.levels = build_cluster_levels(self.lon, self.lat)
+
+    def test_coarser_levels_match_direct_clustering(self):
+        for zoom in (0, 4, CLUSTER_MAX_ZOOM - 1):
+            direct = ClusterLevel.from_positions(zoom, self.lon, self.lat).cells
+            derived = self.levels[zoom].cells
+            self.assertEqual(derived[['x', 'y', 'count']].tolist(), direct[['x', 'y', 'count']].tolist())
+            np.testing.assert_allclose(derived['lon_sum'], direct['lon_sum'])
+
+    def test_bbox_keeps_clusters_overlapping_it(self):
+        level = self.levels[6].in_bbox(30, 38, 33, 40)
+        inside = (self.lon >= 30) & (self.lon <= 33) & (self.lat >= 38) & (self.lat <= 40)
+        self.assertGreaterEqual(level.cells['count'].sum(), inside.sum())
+        self.assertLess(level.cells['count'].sum(), len(self.lon))
+
+    def test_bbox_across_the_antimeridian(self):
+        lon, lat = np.array([179.5, -179.5, 0.0]), np.array([10.0, 10.0, 10.0])
+        level = build_cluster_levels(lon, lat)[4].in_bbox(179, 5, -179, 15)
+        self.assertEqual(level.cells['count'].sum(), 2)
+
+    def test_round_trip_through_cache_bytes(self):
+        level = ClusterLevel.from_bytes(3, self.levels[3].to_bytes())
+        self.assertEqual(sum(f['properties']['count'] for f in level.features()), len(self.lon))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class VectorTileTests(TestCase):
+    """
+    /api/fleet/tiles/<z>/<x>/<y>.mvt renders with ST_AsMVT and is cached per simulation tick.
+    """
+
+    def setUp(self):
+        create_fleet(3)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('viewer', password='pass'))
+        x, y = lonlat_to_tile(np.array([29.0]), np.array([40.5]), 7)
+        self.url = f'/api/fleet/tiles/7/{int(x[0])}/{int(y[0])}.mvt'
+
+    def test_tile_contains_planes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], TILE_CONTENT_TYPE)
+        self.assertIn(b'planes', response.content)
+        self.assertEqual(self.client.get('/api/fleet/tiles/7/0/0.mvt').content, b'')
+
+    def test_tile_is_rendered_once_per_tick(self):
+        set_current_tick('run:1')
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        set_current_tick('run:2')
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_out_of_range_tile(self):
+        self.assertEqual(self.client.get('/api/fleet/tiles/2/4/0.mvt').status_code, 404)
+
+
+# Responses must come from the database every time
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryCountTests(TestCase):
+    """
+    Fleet endpoints must run a constant number of queries, however many rows they return.
+    """
+    ENDPOINTS = [
+        '/api/fleet/planes/',
+        '/api/fleet/planes/management-list/',
+        '/api/fleet/pilots/',
+        '/api/fleet/commands/',
+        '/api/fleet/commands/my-commands/',
+        '/api/fleet/users/',
+    ]
+
+    def setUp(self):
+        self.airports = None
+        self.rows = 0
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='pass', is_staff=True))
+
+    def add_rows(self, count):
+        """Adds `count` planes, each with a pilot and a command, plus as many unassigned pilots."""
+        self.airports, planes = create_fleet(count, self.airports, start=self.rows)
+        for plane in planes:
+            pilot, _spare = (
+                Pilot.objects.create(
+                    user=User.objects.create_user(f'pilot-{call_sign}', first_name='Test', last_name='Pilot'),
+                    rank='Captain', call_sign=call_sign,
+                )
+                for call_sign in (plane.tail_number, f'{plane.tail_number}-spare')
+            )
+            plane.pilot = pilot
+            plane.save()
+            Command.objects.create(plane=plane, pilot=pilot, message='Hold', target_location=Point(30, 40))
+        self.rows += count
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        small = {url: self.query_count(url) for url in self.ENDPOINTS}
+        self.add_rows(20)
+        for url in self.ENDPOINTS:
+            self.assertEqual(self.query_count(url), small[url], url)
+
+
+class PlaneFeedTests(TestCase):
+    """
+    The raw-row plane feed must render exactly like PlaneFeatureSerializer.
+    """
+
+    def test_fast_path_is_byte_identical(self):
+        _, planes = create_fleet(3)
+        named = User.objects.create_user('named', first_name='Ayşe', last_name='Kaya')
+        unnamed = User.objects.create_user('unnamed')
+        Plane.objects.filter(pk=planes[0].pk).update(pilot=Pilot.objects.create(user=named, rank='Major', call_sign='AY1'))
+        Plane.objects.filter(pk=planes[1].pk).update(pilot=Pilot.objects.create(user=unnamed, rank='Major', call_sign='UN1'))
+
+        queryset = Plane.objects.select_related('pilot__user').order_by('id')
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(plane_features(queryset)),
+            renderer.render(PlaneFeatureSerializer(queryset, many=True).data),
+        )
+
+
+class CursorPaginationTests(TestCase):
+    """
+    Command and management lists are keyset paginated and can be exported as NDJSON.
+    """
+
+    def setUp(self):
+        _, planes = create_fleet(1)
+        pilot = Pilot.objects.create(user=User.objects.create_user('pilot'), rank='Captain', call_sign='P1')
+        Command.objects.bulk_create([
+            Command(plane=planes[0], pilot=pilot, message=f'Command {i}', target_location=Point(30, 40))
+            for i in range(7)
+        ])
+        # Identical timestamps: the id has to break the tie
+        Command.objects.update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_pages_cover_every_command_once(self):
+        ids, url = [], '/api/fleet/commands/?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            ids += [command['id'] for command in page['results']]
+            url = page['next']
+        self.assertEqual(ids, sorted(Command.objects.values_list('id', flat=True), reverse=True))
+
+    def test_ndjson_export_streams_every_row(self):
+        response = self.client.get('/api/fleet/commands/my-commands/?export=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(json.loads(lines[0])['message'], 'Command 6')
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN harness: on a seeded 10k-command table, the command list queries of every
+    endpoint variant must be served by an index instead of a sequential scan.
+    """
+    COMMANDS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        _, planes = create_fleet(100)
+        pilots = [
+            Pilot.objects.create(user=User.objects.create_user(f'pilot-{i}'), rank='Captain', call_sign=f'P{i}')
+            for i in range(50)
+        ]
+        Command.objects.bulk_create([
+            Command(
+                plane=planes[i % len(planes)], pilot=pilots[i % len(pilots)], message=f'Command {i}',
+                target_location=Point(30, 40), status='pending' if i % 10 == 0 else 'accepted',
+            )
+            for i in range(cls.COMMANDS)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE fleet_command')
+        cls.plane, cls.pilot = planes[0], pilots[0]
+        cls.admin = User.objects.create_user('admin', is_staff=True)
+
+    def command_plans(self, user, url):
+        """Runs `url` as `user` and returns the EXPLAIN output of its queries on fleet_command."""
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get(url).status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT') and 'FROM "fleet_command"' in query['sql']:
+                    cursor.execute('EXPLAIN ' + query['sql'])
+                    plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+        self.assertTrue(plans, url)
+        return plans
+
+    def test_command_lists_use_indexes(self):
+        cases = [
+            (self.admin, '/api/fleet/commands/'),
+            (self.admin, f'/api/fleet/commands/?plane_id={self.plane.pk}'),
+            (self.pilot.user, '/api/fleet/commands/'),
+            (self.pilot.user, '/api/fleet/commands/my-commands/'),
+            (self.pilot.user, f'/api/fleet/commands/?plane_id={self.plane.pk}'),
+            # History page filters
+            (self.admin, '/api/fleet/commands/?status=pending'),
+            (self.admin, f'/api/fleet/commands/?pilot={self.pilot.pk}&status=pending'),
+            (self.admin, '/api/fleet/commands/?search=%22command%204242%22'),
+            (self.admin, '/api/fleet/commands/?message=nd%20424'),
+            (self.admin, '/api/fleet/commands/?bbox=0,0,1,1'),
+            (self.admin, '/api/fleet/commands/?created_after=2100-01-01T00:00:00Z'),
+        ]
+        for user, url in cases:
+            for plan in self.command_plans(user, url):
+                self.assertNotIn('Seq Scan on fleet_command', plan, f'{url}\n{plan}')
+                self.assertIn('Index', plan, f'{url}\n{plan}')
+
+
+class CommandFilterTests(TestCase):
+    """
+    The command history is filtered server-side and the filters combine with pagination.
+    """
+
+    def setUp(self):
+        _, planes = create_fleet(2)
+        pilots = [
+            Pilot.objects.create(user=User.objects.create_user(f'pilot-{i}'), rank='Captain', call_sign=f'P{i}')
+            for i in range(2)
+        ]
+        self.commands = [
+            Command.objects.create(plane=planes[0], pilot=pilots[0], message='Climb to FL350 and hold',
+                                   target_location=Point(30, 40), status='pending'),
+            Command.objects.create(plane=planes[1], pilot=pilots[1], message='Return to base',
+                                   target_location=Point(35, 39), status='accepted'),
+            Command.objects.create(plane=planes[1], pilot=pilots[1], message='Hold position over the base',
+                                   target_location=Point(35, 39), status='rejected'),
+        ]
+        self.planes, self.pilots = planes, pilots
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def ids(self, **params):
+        response = self.client.get('/api/fleet/commands/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(command['id'] for command in response.data['results'])
+
+    def test_filters(self):
+        first, second, third = (command.pk for command in self.commands)
+        self.assertEqual(self.ids(status='pending,rejected'), [first, third])
+        self.assertEqual(self.ids(pilot=self.pilots[1].pk, status='accepted'), [second])
+        self.assertEqual(self.ids(plane=self.planes[0].pk), [first])
+        self.assertEqual(self.ids(bbox='34,38,36,40'), [second, third])
+        self.assertEqual(self.ids(search='hold'), [first, third])
+        self.assertEqual(self.ids(search='base -return'), [third])
+        self.assertEqual(self.ids(message='fl35'), [first])
+        self.assertEqual(self.ids(created_after=(timezone.now() + datetime.timedelta(hours=1)).isoformat()), [])
+
+    @override_settings(TIME_ZONE='Europe/Istanbul')
+    def test_naive_times_are_utc(self):
+        # Read as Istanbul time (UTC+3), this would be two hours ago and match nothing
+        in_an_hour = (timezone.now() + datetime.timedelta(hours=1)).replace(tzinfo=None).isoformat()
+        self.assertEqual(self.ids(created_before=in_an_hour), sorted(command.pk for command in self.commands))
+
+    def test_filters_combine_with_pagination(self):
+        response = self.client.get('/api/fleet/commands/', {'plane': self.planes[1].pk, 'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        following = self.client.get(response.data['next'])
+        self.assertEqual(
+            sorted([response.data['results'][0]['id'], following.data['results'][0]['id']]),
+            [self.commands[1].pk, self.commands[2].pk],
+        )
+        self.assertIsNone(following.data['next'])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'status': 'lost'}, {'pilot': 'abc'}, {'bbox': '1,2,3'}, {'created_before': 'soon'},
+                       {'created_after': '2026-13-01T00:00'}):
+            self.assertEqual(self.client.get('/api/fleet/commands/', params).status_code, 400, params)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResponseCacheTests(TestCase):
+    """
+    Read-heavy admin lists are served from the cache with ETags until a change invalidates them.
+    """
+
+    def setUp(self):
+        _, self.planes = create_fleet(3)
+        self.pilot = Pilot.objects.create(user=User.objects.create_user('pilot'), rank='Captain', call_sign='P1')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_cached_until_invalidated(self):
+        url = '/api/fleet/airports/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)['ETag'], etag)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Airport.objects.create(name='Izmir', code='ADB', location=Point(27.15, 38.29))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ADB', [airport['code'] for airport in response.json()])
+
+    def test_management_list_caches_the_page(self):
+        url = '/api/fleet/planes/management-list/'
+        self.client.get(url)
+        # Only the simulated columns are read again
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/fleet/planes/{self.planes[0].pk}/', {'pilot_id': self.pilot.pk}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['pilot']['callSign'], 'P1')
+
+    def test_management_list_shows_simulated_positions(self):
+        url = '/api/fleet/planes/management-list/'
+        self.client.get(url)
+        plane = self.planes[0]
+        persist_positions(
+            np.array([plane.pk]), np.array([30.0]), np.array([39.0]), np.array([90.0]),
+            np.array([plane.destination_id]), np.array([plane.origin_id]),
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        row = next(row for row in response.json()['results'] if row['id'] == plane.pk)
+        self.assertEqual(row['location']['coordinates'], [30.0, 39.0])
+        self.assertEqual(row['bearing'], 90.0)
+        self.assertEqual(row['origin']['code'], 'ESB')
+
+    def test_pilot_list_follows_assignments(self):
+        self.assertEqual(len(self.client.get('/api/fleet/pilots/').json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.planes[0].pilot = self.pilot
+            self.planes[0].save()
+        self.assertEqual(self.client.get('/api/fleet/pilots/').json(), [])
+
+
+class VersionTests(TestCase):
+    """
+    Plane and command lists expose a version ETag and a `?since=` delta mode.
+    """
+
+    def setUp(self):
+        _, self.planes = create_fleet(3)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_plane_list_delta(self):
+        etag = self.client.get('/api/fleet/planes/')['ETag']
+        version = etag.strip('"')
+        self.assertEqual(self.client.get('/api/fleet/planes/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A simulator-style bulk position write bumps the version too
+        Plane.objects.filter(pk=self.planes[0].pk).update(location=Point(31, 40))
+        self.planes[1].delete()
+        delta = self.client.get(f'/api/fleet/planes/?since={version}')
+        self.assertNotEqual(delta['ETag'], etag)
+        self.assertEqual([f['id'] for f in delta.json()['features']], [self.planes[0].pk])
+        self.assertEqual(delta.json()['deleted'], [self.planes[1].pk])
+
+    def test_my_commands_delta(self):
+        pilot = Pilot.objects.create(user=User.objects.create_user('pilot'), rank='Captain', call_sign='P1')
+        command = Command.objects.create(plane=self.planes[0], pilot=pilot, message='Hold', target_location=Point(30, 40))
+        version = self.client.get('/api/fleet/commands/my-commands/')['ETag'].strip('"')
+
+        command.status = 'accepted'
+        command.save()
+        delta = self.client.get(f'/api/fleet/commands/my-commands/?since={version}').json()
+        self.assertEqual([(c['id'], c['status']) for c in delta['results']], [(command.pk, 'accepted')])
+        self.assertEqual(delta['deleted'], [])
+
+
+class BulkCommandTests(TestCase):
+    """
+    POST /commands/bulk/ creates many commands with a constant number of queries and one notification.
+    """
+
+    def setUp(self):
+        _, self.planes = create_fleet(3)
+        for i, plane in enumerate(self.planes[:2]):
+            plane.pilot = Pilot.objects.create(user=User.objects.create_user(f'pilot-{i}'), rank='Captain', call_sign=f'P{i}')
+            plane.save()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        self.target = {'type': 'Point', 'coordinates': [32.0, 39.5]}
+
+    @mock.patch('fleet.views.broadcast')
+    def test_selector_by_plane_ids(self, broadcast):
+        ids = [plane.pk for plane in self.planes] + [999999]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/fleet/commands/bulk/',
+                {'message': 'Form up', 'target_location': self.target, 'plane_ids': ids}, format='json'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([c['plane'] for c in response.json()['created']], ids[:2])
+        self.assertEqual([s['reason'] for s in response.json()['skipped']], ['no pilot', 'not found'])
+        broadcast.assert_called_once_with('command_batch', response.json()['created'])
+
+    @mock.patch('fleet.views.broadcast')
+    def test_list_and_bbox_forms(self, broadcast):
+        response = self.client.post('/api/fleet/commands/bulk/', [
+            {'plane': self.planes[0].pk, 'message': 'A', 'target_location': self.target},
+            {'plane': self.planes[1].pk, 'message': 'B', 'target_location': self.target},
+        ], format='json')
+        self.assertEqual(len(response.json()['created']), 2)
+
+        # create_fleet lines the planes up along latitude 40.5 from longitude 29
+        response = self.client.post('/api/fleet/commands/bulk/', {
+            'message': 'Hold', 'target_location': self.target, 'bbox': [28.9, 40.4, 29.0005, 40.6],
+        }, format='json')
+        self.assertEqual([c['plane'] for c in response.json()['created']], [self.planes[0].pk])
+        self.assertEqual(Command.objects.count(), 3)
+
+    def test_needs_exactly_one_selector(self):
+        response = self.client.post('/api/fleet/commands/bulk/', {'message': 'Hold', 'target_location': self.target}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class FastSeedTests(TestCase):
+    def seed(self, count):
+        call_command('seed_data', count=count, fast=True, workers=1, chunk_size=4, stdout=io.StringIO())
+
+    def test_rows_are_deterministic(self):
+        rows = seed_rows(1, 50, [1, 2, 3], seed=7)
+        self.assertEqual(rows, seed_rows(1, 50, [1, 2, 3], seed=7))
+        for line in rows.splitlines():
+            fields = line.split('\t')
+            self.assertNotEqual(fields[7], fields[8])
+
+    def test_resumes_without_duplicates(self):
+        self.seed(6)
+        self.assertEqual(Plane.objects.count(), 6)
+        self.seed(10)
+        self.assertEqual(Plane.objects.count(), 10)
+        self.assertEqual(Pilot.objects.count(), 10)
+        plane = Plane.objects.select_related('pilot__user').get(tail_number='TC-BYK-0010')
+        self.assertEqual(plane.pilot.call_sign, 'Asena-10')
+        self.assertTrue(plane.pilot.user.check_password('12345'))
+        self.assertTrue(plane.pilot.user.groups.filter(name='Pilots').exists())
+
+    def test_tail_numbers_past_9999(self):
+        airports = [Airport.objects.create(name=code, code=code, location=Point(29, 40)).pk for code in ('AAA', 'BBB')]
+        group = Group.objects.create(name='Pilots')
+        self.assertEqual(seed_chunk(9998, 10001, airports, group.pk, make_password('12345'), 0), 4)
+        self.assertEqual(
+            sorted(Plane.objects.values_list('tail_number', flat=True)),
+            ['TC-BYK-10000', 'TC-BYK-10001', 'TC-BYK-9998', 'TC-BYK-9999'],
+        )
+        # Done chunks are skipped when resuming
+        self.assertEqual(seed_chunk(9998, 10001, airports, group.pk, make_password('12345'), 0), 0)
+        self.assertEqual(Plane.objects.count(), 4)
+
+    def test_picks_up_existing_users(self):
+        # As left by an interrupted run, or by the regular seeding
+        User.objects.create_user('pilot2', password='12345')
+        self.seed(4)
+        self.assertEqual(Plane.objects.count(), 4)
+        self.assertEqual(Plane.objects.get(pilot__user__username='pilot2').tail_number, 'TC-BYK-0002')
+        self.assertEqual(User.objects.filter(username__startswith='pilot').count(), 4)
@@ -0,0 +1,56 @@
+import math
+import numpy as np
+
+# Web mercator cannot represent the poles
+MAX_LATITUDE = 85.05112878
+# Above this many tiles a viewport is better served by the full positions group
+MAX_SUBSCRIBED_TILES = 64
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Vectorized lon/lat (degrees) to web-mercator z/x/y tile indices."""
+    n = 1 << zoom
+    lat_rad = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_bounds(zoom, x, y):
+    """Returns the (min_lon, min_lat, max_lon, max_lat) of a tile, in degrees."""
+    n = 1 << zoom
+
+    def lat_of(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return (x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y))
+
+
+def tiles_for_bbox(min_lon, min_lat, max_lon, max_lat, zoom):
+    """Lists the (x, y) tiles covering a bbox at `zoom`."""
+    x, y = lonlat_to_tile(np.array([min_lon, max_lon]), np.array([min_lat, max_lat]), zoom)
+    # Tile rows grow southwards, so the max latitude gives the smallest y
+    x0, x1, y0, y1 = int(x[0]), int(x[1]), int(y[1]), int(y[0])
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def split_by_tile(lon, lat, zoom):
+    """Groups row indices by tile. Returns {(x, y): rows}."""
+    x, y = lonlat_to_tile(lon, lat, zoom)
+    keys = (x << zoom) | y
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    return {
+        (int(key) >> zoom, int(key) & ((1 << zoom) - 1)): np.sort(rows)
+        for key, rows in zip(unique_keys.tolist(), np.split(order, starts[1:]))
+    }
+
+
+def tile_group(zoom, x, y):
+    """Channels group of the planes inside one tile."""
+    return f'fleet_tile_{zoom}_{x}_{y}'
+
+
+def plane_group(plane_id):
+    """Channels group of a single plane."""
+    return f'fleet_plane_{plane_id}'
@@ -0,0 +1,161 @@
+"""
+Track history (`PlanePosition`): partition management and track queries.
+
+The table is range partitioned by UTC day; partitions are named `<table>_pYYYYMMDD`.
+`rollover` creates the partitions for today and the next few days ahead of time (rows
+for a day without a partition would be rejected) and drops the ones older than
+`FLEET_TRACK_RETENTION_DAYS`, which is far cheaper than deleting rows.
+
+`plane_track` returns one plane's track as a GeoJSON LineString, reduced in PostGIS:
+long windows are first downsampled to one point per time bucket (at most
+`MAX_TRACK_POINTS`), then simplified with Douglas-Peucker (`ST_Simplify`).
+"""
+import datetime
+import json
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from .models import PlanePosition
+
+TRACK_TABLE = PlanePosition._meta.db_table
+PARTITIONS_AHEAD = 2
+
+# Seconds between two recorded positions of a plane (one simulator tick)
+TRACK_RESOLUTION = 2
+MAX_TRACK_POINTS = 2000
+DEFAULT_TRACK_WINDOW = datetime.timedelta(hours=1)
+MAX_TRACK_WINDOW = datetime.timedelta(days=7)
+# Meters; tracks are simplified in degrees, so this is converted at the equator's scale
+DEFAULT_TRACK_TOLERANCE = 50
+METERS_PER_DEGREE = 111_320
+
+TRACK_SQL = f'''
+WITH points AS (
+    SELECT DISTINCT ON (bucket) recorded_at, lon, lat
+    FROM (
+        SELECT recorded_at, lon, lat, floor(extract(epoch FROM recorded_at) / %(bucket)s) AS bucket
+        FROM {TRACK_TABLE}
+        WHERE plane_id = %(plane)s AND recorded_at >= %(start)s AND recorded_at < %(end)s
+    ) AS raw
+    ORDER BY bucket, recorded_at
+),
+line AS (
+    SELECT count(*) AS sampled, min(recorded_at) AS first_at, max(recorded_at) AS last_at,
+           ST_Simplify(ST_MakeLine(ST_MakePoint(lon, lat) ORDER BY recorded_at), %(tolerance)s, true) AS geom
+    FROM points
+)
+SELECT sampled, first_at, last_at, ST_NPoints(geom), ST_AsGeoJSON(geom, 6) FROM line
+'''
+
+
+def partition_name(day):
+    return f'{TRACK_TABLE}_p{day:%Y%m%d}'
+
+
+def _day_start(day):
+    return datetime.datetime.combine(day, datetime.time(), tzinfo=datetime.timezone.utc)
+
+
+def ensure_partitions(today=None, days_ahead=PARTITIONS_AHEAD):
+    """Creates the missing partitions from `today` to `days_ahead` days later."""
+    today = today or timezone.now().date()
+    with connection.cursor() as cursor:
+        for offset in range(days_ahead + 1):
+            day = today + datetime.timedelta(days=offset)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(day)} PARTITION OF {TRACK_TABLE} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [_day_start(day), _day_start(day + datetime.timedelta(days=1))],
+            )
+
+
+def existing_partitions():
+    """(day, name) of every partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TRACK_TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+    prefix = f'{TRACK_TABLE}_p'
+    return sorted(
+        (datetime.datetime.strptime(name[len(prefix):], '%Y%m%d').date(), name)
+        for name in names if name.startswith(prefix)
+    )
+
+
+def drop_expired_partitions(today=None, retention_days=None):
+    """Drops the partitions whose whole day is older than the retention period. Returns their names."""
+    today = today or timezone.now().date()
+    retention_days = settings.FLEET_TRACK_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = today - datetime.timedelta(days=retention_days)
+    dropped = []
+    with connection.cursor() as cursor:
+        for day, name in existing_partitions():
+            if day < cutoff:
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    return dropped
+
+
+def rollover(today=None):
+    """Creates upcoming partitions and applies retention. Returns the dropped partition names."""
+    ensure_partitions(today)
+    return drop_expired_partitions(today)
+
+
+def parse_track_window(params):
+    """(start, end, tolerance in meters) of a track request's `from`, `to` and `tolerance`."""
+    end = _parse_time(params, 'to') or timezone.now()
+    start = _parse_time(params, 'from') or end - DEFAULT_TRACK_WINDOW
+    if start >= end:
+        raise ValidationError({'from': 'Must be before `to`.'})
+    if end - start > MAX_TRACK_WINDOW:
+        raise ValidationError({'from': f'The window can span at most {MAX_TRACK_WINDOW.days} days.'})
+    try:
+        tolerance = float(params.get('tolerance', DEFAULT_TRACK_TOLERANCE))
+    except ValueError:
+        raise ValidationError({'tolerance': 'Must be a number of meters.'})
+    if tolerance < 0:
+        raise ValidationError({'tolerance': 'Must not be negative.'})
+    return start, end, tolerance
+
+
+def _parse_time(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Must be an ISO 8601 date and time.'})
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, datetime.timezone.utc)
+
+
+def plane_track(plane_id, start, end, tolerance=DEFAULT_TRACK_TOLERANCE):
+    """One plane's positions between `start` and `end` as a GeoJSON LineString feature."""
+    bucket = max(TRACK_RESOLUTION, (end - start).total_seconds() / MAX_TRACK_POINTS)
+    with connection.cursor() as cursor:
+        cursor.execute(TRACK_SQL, {
+            'plane': plane_id, 'start': start, 'end': end, 'bucket': bucket,
+            'tolerance': tolerance / METERS_PER_DEGREE,
+        })
+        sampled, first_at, last_at, points, geometry = cursor.fetchone()
+    return {
+        'type': 'Feature',
+        'geometry': json.loads(geometry) if geometry else {'type': 'LineString', 'coordinates': []},
+        'properties': {
+            'plane': plane_id,
+            'from': first_at,
+            'to': last_at,
+            'points': points or 0,
+            # Points left after time-bucket downsampling, before simplification
+            'sampled_points': sampled,
+            'bucket_seconds': bucket,
+        },
+    }
@@ -5,7 +5,9 @@ from .views import (
     CommandViewSet,
     UserDetailView,     # Import 'UserDetailView' instead of 'user_detail_view'
     UserAdminViewSet,
-    PilotListView # Import PilotListView
+    PilotListView, # Import PilotListView
+    FleetTileView,
+    AirportListView,
 )
 
 router = DefaultRouter()
@@ -18,5 +20,7 @@ router.register(r'users', UserAdminViewSet, basename='user-admin')
 urlpatterns = [
     path('users/me/', UserDetailView.as_view(), name='user-detail'),
     path('pilots/', PilotListView.as_view(), name='pilot-list'), # New endpoint
+    path('airports/', AirportListView.as_view(), name='airport-list'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', FleetTileView.as_view(), name='fleet-tile'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
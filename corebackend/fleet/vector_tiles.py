@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.db import connection
+
+TILE_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+MAX_TILE_ZOOM = 22
+# Tiles are re-rendered at least this often even while the simulator is stopped
+TILE_CACHE_TIMEOUT = 5
+TILE_CACHE_KEY = 'fleet:mvt:{tick}:{z}:{x}:{y}'
+# Set by the simulator after each tick's positions are written to the database
+TICK_CACHE_KEY = 'fleet:tick'
+TICK_CACHE_TIMEOUT = 30
+
+TILE_SQL = '''
+WITH bounds AS (
+    SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom
+),
+planes AS (
+    SELECT p.id, p.tail_number, p.model, p.status, p.bearing, p.speed, p.altitude, p.pilot_id,
+           ST_AsMVTGeom(ST_Transform(p.location, 3857), bounds.geom) AS geom
+    FROM fleet_plane AS p, bounds
+    WHERE p.location && ST_Transform(bounds.geom, 4326)
+),
+airports AS (
+    SELECT a.id, a.code, a.name,
+           ST_AsMVTGeom(ST_Transform(a.location, 3857), bounds.geom) AS geom
+    FROM fleet_airport AS a, bounds
+    WHERE a.location && ST_Transform(bounds.geom, 4326)
+)
+SELECT COALESCE((SELECT ST_AsMVT(planes, 'planes', 4096, 'geom') FROM planes), '')
+    || COALESCE((SELECT ST_AsMVT(airports, 'airports', 4096, 'geom') FROM airports), '')
+'''
+
+
+def set_current_tick(tick):
+    """Called by the simulator once a tick's positions are in the database; invalidates every tile."""
+    cache.set(TICK_CACHE_KEY, tick, timeout=TICK_CACHE_TIMEOUT)
+
+
+def render_tile(z, x, y):
+    """Renders the `planes` and `airports` layers of one web-mercator tile with PostGIS."""
+    with connection.cursor() as cursor:
+        cursor.execute(TILE_SQL, {'z': z, 'x': x, 'y': y})
+        return bytes(cursor.fetchone()[0])
+
+
+def cached_tile(z, x, y):
+    """
+    Returns the tile for the current simulation tick, rendering it at most once per
+    tick (and per TILE_CACHE_TIMEOUT) no matter how many map clients request it.
+    """
+    key = TILE_CACHE_KEY.format(tick=cache.get(TICK_CACHE_KEY, 'idle'), z=z, x=x, y=y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = render_tile(z, x, y)
+        cache.set(key, tile, timeout=TILE_CACHE_TIMEOUT)
+    return tile
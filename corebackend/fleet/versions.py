@@ -0,0 +1,60 @@
+"""
+Per-resource version counters for conditional and delta GETs.
+
+Every plane and command row carries the `version` a database trigger drew from its
+resource's sequence on the last insert/update, so planes are bumped both by metadata
+writes and by each simulator position flush. Deleted rows leave a `Tombstone`.
+The version of a resource is the highest one among its rows and tombstones; it is sent
+as the ETag, and `?since=<version>` returns only the rows changed after it.
+
+Versions are drawn before commit, so a write that commits after a later-numbered one
+can be missed by a delta taken in between. Moving planes are rewritten every tick, so
+this only matters for rare concurrent command edits.
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from .models import Tombstone
+
+
+def current_version(model, resource):
+    """Returns (version, changed_at) of the latest change to `resource`, or (0, None)."""
+    latest = [
+        model.objects.order_by('-version').values_list('version', 'changed_at').first(),
+        Tombstone.objects.filter(resource=resource).order_by('-version').values_list('version', 'deleted_at').first(),
+    ]
+    return max((change for change in latest if change), default=(0, None))
+
+
+def parse_since(request):
+    """The `?since=` version of a delta request, or None for a full response."""
+    since = request.query_params.get('since')
+    if since is None:
+        return None
+    try:
+        return int(since)
+    except ValueError:
+        raise ValidationError({'since': 'Must be a version number.'})
+
+
+def deleted_since(resource, version):
+    """Ids of `resource` rows deleted after `version`."""
+    return list(
+        Tombstone.objects.filter(resource=resource, version__gt=version).values_list('object_id', flat=True)
+    )
+
+
+def not_modified(request, version, changed_at):
+    """Returns a 304 response if the client already has `version`, otherwise None."""
+    return get_conditional_response(
+        request, etag=f'"{version}"', last_modified=int(changed_at.timestamp()) if changed_at else None
+    )
+
+
+def set_version_headers(response, version, changed_at):
+    response['ETag'] = f'"{version}"'
+    if changed_at:
+        response['Last-Modified'] = http_date(changed_at.timestamp())
+    # Responses differ per user (e.g. my-commands), so only private caches may keep them
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,24 +1,46 @@
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.contrib.auth.models import User
+from django.contrib.gis.geos import Polygon
+from django.db import transaction
 from django.db.models import Q # Import Q object
-from .models import Plane, Command, Pilot
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils import timezone
+from .models import Airport, Plane, Command, Pilot
 from .serializers import (
-    PlaneFeatureSerializer, PlaneDetailSerializer, CommandSerializer, PilotSerializer, 
-    UserSerializer, UserAdminSerializer, UserCreateAdminSerializer, PasswordResetSerializer
+    AirportLocationSerializer, PlaneFeatureSerializer, PlaneDetailSerializer, CommandSerializer, PilotSerializer, 
+    UserSerializer, UserAdminSerializer, UserCreateAdminSerializer, PasswordResetSerializer,
+    BulkCommandItemSerializer, BulkCommandSelectorSerializer,
+    plane_features,
 )
 from .permissions import IsAdminOrReadOnly, IsPilotOwner, IsAdminUser
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from .broadcast import broadcast
+from .pagination import CommandCursorPagination, IdCursorPagination, NDJSONExportMixin
+from .response_cache import cached_data, cached_response, invalidate
+from .versions import current_version, deleted_since, not_modified, parse_since, set_version_headers
+from .clusters import CLUSTER_MAX_ZOOM, cluster_level
+from .tracks import parse_track_window, plane_track
+from .filters import filter_commands
+from .vector_tiles import MAX_TILE_ZOOM, TILE_CACHE_TIMEOUT, TILE_CONTENT_TYPE, cached_tile
 
-class UserAdminViewSet(viewsets.ModelViewSet):
+# Upper bound on the commands one bulk dispatch may create
+MAX_BULK_COMMANDS = 1000
+
+class UserAdminViewSet(NDJSONExportMixin, viewsets.ModelViewSet):
     """
     User management endpoint for administrators.
     Only admins can access.
+    list: Cursor paginated by id; `?export=ndjson` streams every user instead.
     """
     queryset = User.objects.all().order_by('-date_joined')
     permission_classes = [IsAdminUser]
+    pagination_class = IdCursorPagination
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -87,16 +109,80 @@ class PilotListView(generics.ListAPIView):
         
         return Pilot.objects.filter(query).select_related('user').distinct()
 
+    @cached_response('pilots', 'planes')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class PlaneViewSet(viewsets.ModelViewSet): # Changed from ReadOnlyModelViewSet to ModelViewSet
+
+class AirportListView(generics.ListAPIView):
+    """
+    Lists airports with their locations.
+    Endpoint: /api/fleet/airports/
+    """
+    queryset = Airport.objects.order_by('code')
+    serializer_class = AirportLocationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @cached_response('airports')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
+class FleetTileView(APIView):
+    """
+    Serves planes and airports as Mapbox Vector Tiles (layers `planes` and `airports`).
+    Endpoint: /api/fleet/tiles/<z>/<x>/<y>.mvt
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, z, x, y):
+        if z > MAX_TILE_ZOOM or x >= 1 << z or y >= 1 << z:
+            raise Http404('Tile out of range.')
+        response = HttpResponse(cached_tile(z, x, y), content_type=TILE_CONTENT_TYPE)
+        patch_cache_control(response, private=True, max_age=TILE_CACHE_TIMEOUT)
+        return response
+
+
+class PlaneViewSet(NDJSONExportMixin, viewsets.ModelViewSet): # Changed from ReadOnlyModelViewSet to ModelViewSet
     """
     Lists all aircraft. Only Admin or authenticated users can access.
     list: Returns GeoJSON list of aircraft. (For map)
+          With `?zoom=` (and optionally `?bbox=min_lon,min_lat,max_lon,max_lat`) at low zoom
+          levels, returns plane clusters with counts and centroids instead.
     retrieve: Returns detailed information of a specific aircraft.
     update/partial_update: Updates aircraft information (e.g.: pilot).
+    management_list: Cursor paginated by id; `?export=ndjson` streams every aircraft instead.
+    The list carries the planes' version as ETag/Last-Modified; `?since=<version>` returns
+    only the aircraft changed (or deleted) after it.
     """
     queryset = Plane.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    # Only used by management_list; the map list is never paginated
+    pagination_class = IdCursorPagination
+
+    # Columns read by the serializers, so list endpoints load them in a single query
+    PILOT_FIELDS = (
+        'pilot', 'pilot__call_sign',
+        'pilot__user', 'pilot__user__username', 'pilot__user__first_name', 'pilot__user__last_name',
+    )
+    FEATURE_FIELDS = ('id', 'model', 'tail_number', 'altitude', 'bearing', 'speed', 'status', 'location')
+    DETAIL_FIELDS = FEATURE_FIELDS + (
+        'origin', 'origin__name', 'origin__code', 'destination', 'destination__name', 'destination__code',
+    )
+    # Written by the simulator's flushes, every few seconds (see `persist_positions`)
+    SIMULATED_FIELDS = (
+        'location', 'bearing', 'origin__name', 'origin__code', 'destination__name', 'destination__code',
+    )
+
+    def get_queryset(self):
+        """Joins the pilot (and route) each action serializes instead of querying them per aircraft."""
+        queryset = super().get_queryset().select_related('pilot__user')
+        if self.action == 'list':
+            return queryset.only(*self.FEATURE_FIELDS, *self.PILOT_FIELDS)
+        queryset = queryset.select_related('origin', 'destination')
+        if self.action == 'management_list':
+            return queryset.only(*self.DETAIL_FIELDS, *self.PILOT_FIELDS)
+        return queryset
 
     def get_serializer_class(self):
         """Return different serializer based on action."""
@@ -123,39 +209,118 @@ class PlaneViewSet(viewsets.ModelViewSet): # Changed from ReadOnlyModelViewSet t
             
             # Find other aircraft assigned to this pilot (if any).
             # We exclude the aircraft being updated from this query.
-            Plane.objects.filter(pilot=pilot_to_assign).exclude(pk=self.get_object().pk).update(pilot=None)
+            # `update()` bypasses auto_now, so bump `updated_at` for the simulator's delta query.
+            Plane.objects.filter(pilot=pilot_to_assign).exclude(pk=self.get_object().pk).update(
+                pilot=None, updated_at=timezone.now()
+            )
+            # `update()` sends no signals, so cached plane and pilot lists are retired here
+            invalidate('planes', 'pilots')
 
         # Perform standard save operation.
         serializer.save()
 
     def list(self, request, *args, **kwargs):
         """Returns list in GeoJSON format for map."""
+        if 'zoom' in request.query_params:
+            try:
+                zoom = int(request.query_params['zoom'])
+                bbox = request.query_params.get('bbox')
+                bbox = [float(v) for v in bbox.split(',')] if bbox else None
+            except ValueError:
+                return Response({'detail': 'zoom must be an integer and bbox four comma separated numbers.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if bbox is not None and len(bbox) != 4:
+                return Response({'detail': 'bbox must be min_lon,min_lat,max_lon,max_lat.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            # Above the clustered zoom levels the map shows every plane
+            if zoom <= CLUSTER_MAX_ZOOM:
+                return self.clustered(max(zoom, 0), bbox)
+
+        since = parse_since(request)
+        version, changed_at = current_version(Plane, 'planes')
+        unchanged = not_modified(request, version, changed_at)
+        if unchanged:
+            return unchanged
+
         queryset = self.filter_queryset(self.get_queryset())
-        # PlaneFeatureSerializer is used
-        serializer = self.get_serializer(queryset, many=True)
+        if since is not None:
+            queryset = queryset.filter(version__gt=since)
+        # Same output as PlaneFeatureSerializer, built from raw rows (see `plane_features`)
         feature_collection = {
             'type': 'FeatureCollection',
-            'features': serializer.data
+            'features': plane_features(queryset)
         }
-        return Response(feature_collection)
+        if since is not None:
+            feature_collection.update(version=version, deleted=deleted_since('planes', since))
+        return set_version_headers(Response(feature_collection), version, changed_at)
+
+    def clustered(self, zoom, bbox):
+        """
+        Returns the clusters precomputed by the simulator for `zoom`,
+        so a low-zoom map never receives (or clusters) the whole fleet.
+        """
+        level = cluster_level(zoom)
+        if bbox:
+            level = level.in_bbox(*bbox)
+        return Response({
+            'type': 'FeatureCollection',
+            'zoom': zoom,
+            'features': level.features(),
+        })
+
+    @action(detail=True, methods=['get'])
+    def track(self, request, pk=None):
+        """
+        Returns the plane's recorded track between `?from=` and `?to=` (ISO 8601, default:
+        the last hour) as a GeoJSON LineString, downsampled and simplified to `?tolerance=` meters.
+        """
+        plane = self.get_object()
+        start, end, tolerance = parse_track_window(request.query_params)
+        return Response(plane_track(plane.pk, start, end, tolerance))
 
     @action(detail=False, methods=['get'], url_path='management-list')
     def management_list(self, request):
-        """Returns detailed aircraft list for management panel."""
+        """
+        Returns detailed aircraft list for management panel.
+        Pages are cached until a plane, pilot or airport changes; the columns the simulator
+        writes on every flush are then read fresh for the page's planes in one query.
+        """
         queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get('export') == 'ndjson':
+            return self.list_response(queryset, PlaneDetailSerializer)
         # PlaneDetailSerializer is used
-        serializer = PlaneDetailSerializer(queryset, many=True)
-        return Response(serializer.data)
+        page = cached_data(
+            request.get_full_path(), ('planes', 'pilots', 'airports'),
+            lambda: self.list_response(queryset, PlaneDetailSerializer).data,
+        )
+        self.set_simulated_fields(page['results'])
+        return Response(page)
+
+    def set_simulated_fields(self, rows):
+        """Overwrites the location, bearing and route of serialized planes with their current values."""
+        simulated = Plane.objects.filter(pk__in=[row['id'] for row in rows]).values_list('id', *self.SIMULATED_FIELDS)
+        current = {pk: values for pk, *values in simulated}
+        for row in rows:
+            # Deleted since the page was cached
+            if row['id'] not in current:
+                continue
+            location, bearing, origin_name, origin_code, destination_name, destination_code = current[row['id']]
+            row['location'] = {'type': 'Point', 'coordinates': [location.x, location.y]}
+            row['bearing'] = bearing
+            row['origin'] = {'name': origin_name, 'code': origin_code}
+            row['destination'] = {'name': destination_name, 'code': destination_code}
 
 
-class CommandViewSet(viewsets.ModelViewSet):
+class CommandViewSet(NDJSONExportMixin, viewsets.ModelViewSet):
     """
     Manages commands.
     - Admins can view, create, update and delete all commands.
     - Pilots can only list commands and view their details.
+    - Lists are cursor paginated on (created_at, id), newest first; `?export=ndjson` streams every command instead.
     """
     queryset = Command.objects.all().order_by('-created_at')
     serializer_class = CommandSerializer
+    pagination_class = CommandCursorPagination
     
     def get_permissions(self):
         """
@@ -163,12 +328,67 @@ class CommandViewSet(viewsets.ModelViewSet):
         - 'create', 'update', 'partial_update', 'destroy' operations can only be performed by admins.
         - 'list' and 'retrieve' operations can be performed by all authenticated users.
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             self.permission_classes = [IsAdminUser]
         else:
             self.permission_classes = [permissions.IsAuthenticated]
         return super().get_permissions()
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Creates many commands at once. Accepts either a list of
+        `{plane, message, target_location}` objects, or a single
+        `{message, target_location}` with `plane_ids` or a `bbox` selecting the planes.
+        Pilots are resolved in one query, commands are inserted with one `bulk_create`
+        and clients get a single `command_batch` notification.
+        Planes that do not exist or have no pilot are reported in `skipped`.
+        """
+        if isinstance(request.data, list):
+            serializer = BulkCommandItemSerializer(data=request.data, many=True)
+            serializer.is_valid(raise_exception=True)
+            items = serializer.validated_data
+            planes = Plane.objects.filter(pk__in={item['plane'] for item in items})
+        else:
+            serializer = BulkCommandSelectorSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            selector = serializer.validated_data
+            if 'bbox' in selector:
+                planes = Plane.objects.filter(location__within=Polygon.from_bbox(selector['bbox']))
+            else:
+                planes = Plane.objects.filter(pk__in=selector['plane_ids'])
+            items = None
+
+        pilot_of = dict(planes.values_list('id', 'pilot_id'))
+        if items is None:
+            items = [
+                {'plane': pk, 'message': selector['message'], 'target_location': selector['target_location']}
+                for pk in selector.get('plane_ids') or sorted(pilot_of)
+            ]
+        if len(items) > MAX_BULK_COMMANDS:
+            return Response({'detail': f'At most {MAX_BULK_COMMANDS} commands per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        commands, skipped = [], []
+        for item in items:
+            if item['plane'] not in pilot_of:
+                skipped.append({'plane': item['plane'], 'reason': 'not found'})
+            elif pilot_of[item['plane']] is None:
+                skipped.append({'plane': item['plane'], 'reason': 'no pilot'})
+            else:
+                commands.append(Command(
+                    plane_id=item['plane'], pilot_id=pilot_of[item['plane']],
+                    message=item['message'], target_location=item['target_location'],
+                ))
+
+        with transaction.atomic():
+            created = Command.objects.bulk_create(commands)
+            data = CommandSerializer(created, many=True).data
+            if created:
+                # One notification for the whole batch, once it is committed
+                transaction.on_commit(lambda: broadcast('command_batch', data))
+        return Response({'created': data, 'skipped': skipped}, status=status.HTTP_201_CREATED)
+
     def perform_create(self, serializer):
         """
         Automatically assign pilot when creating a new command.
@@ -185,61 +405,60 @@ class CommandViewSet(viewsets.ModelViewSet):
             serializer.save()
 
     def get_queryset(self):
-        """Filter commands based on user role."""
+        """
+        Filter commands based on user role, then by the query parameters
+        (`plane_id`, `status`, `pilot`, `created_after`, `search`, ...; see `filter_commands`).
+        """
         user = self.request.user
 
-        # Filter by ?plane_id=... query parameter
-        plane_id = self.request.query_params.get('plane_id')
-        if plane_id is not None:
-            # If admin, show all; otherwise filter own commands by plane_id
-            if user.is_staff:
-                return Command.objects.filter(plane_id=plane_id).order_by('-created_at')
+        # If admin, see all commands
+        queryset = Command.objects.all()
+        if not user.is_staff:
+            # If pilot, only see own commands
             try:
-                pilot = Pilot.objects.get(user=user)
-                return Command.objects.filter(plane_id=plane_id, pilot=pilot).order_by('-created_at')
+                queryset = queryset.filter(pilot=Pilot.objects.get(user=user))
             except Pilot.DoesNotExist:
                 return Command.objects.none() # Return empty list if pilot profile doesn't exist
 
-        # General filtering for list
-        if user.is_staff: # If admin, see all commands
-            return Command.objects.all().order_by('-created_at')
-        
-        # If pilot, only see own commands
-        try:
-            pilot = Pilot.objects.get(user=user)
-            return Command.objects.filter(pilot=pilot).order_by('-created_at')
-        except Pilot.DoesNotExist:
-            return Command.objects.none() # Return empty list if pilot profile doesn't exist
+        return filter_commands(queryset, self.request.query_params).order_by('-created_at')
     
     @action(detail=False, methods=['get'], url_path='my-commands')
     def my_commands(self, request):
         """
         Lists all commands belonging to the logged-in pilot.
         Special endpoint for mobile application.
+        With `?since=<version>` (the ETag of an earlier response) only the commands changed
+        or deleted after that version are returned, unpaginated.
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        since = parse_since(request)
+        version, changed_at = current_version(Command, 'commands')
+        unchanged = not_modified(request, version, changed_at)
+        if unchanged:
+            return unchanged
+
+        if since is None:
+            response = self.list_response(self.get_queryset())
+        else:
+            changed = self.get_queryset().filter(version__gt=since).order_by('version')
+            response = Response({
+                'version': version,
+                'results': self.get_serializer(changed, many=True).data,
+                # Deletions are not filtered by pilot: ids the client does not know are ignored
+                'deleted': deleted_since('commands', since),
+            })
+        return set_version_headers(response, version, changed_at)
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
 
     def _update_command_status(self, command, new_status):
         """Helper function to update status and notify clients."""
         command.status = new_status
         command.save()
 
-        # Notify clients via WebSocket
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'fleet_updates',
-            {
-                'type': 'broadcast_message',
-                # The entire payload dictionary is sent to the client.
-                # It must match what the client expects.
-                'payload': {
-                    'type': 'command_update',
-                    'data': CommandSerializer(command).data
-                }
-            }
-        )
+        # Notify clients via WebSocket.
+        # The message is encoded once and forwarded as-is by every consumer.
+        broadcast('command_update', CommandSerializer(command).data)
         return Response(CommandSerializer(command).data)
 
     @action(detail=True, methods=['post'])
@@ -264,13 +483,5 @@ class CommandViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         updated_command = serializer.save()
 
-        # Send message to channel
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            'fleet_updates',
-            {
-                'type': 'broadcast.message',
-                'payload_type': 'command_update',
-                'payload': CommandSerializer(updated_command).data
-            }
-        )
\ No newline at end of file
+        # Send message to channel, in the same shape as the status actions above
+        broadcast('command_update', CommandSerializer(updated_command).data)
@@ -1,13 +1,14 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import toast from 'react-hot-toast';
 import type { PlaneInfo } from '../types';
-import { sendCommand, getCommandsForPlane, searchLocation } from '../services/api';
+import { sendCommand, getCommandPage, searchLocation } from '../services/api';
 import type { CommandPayload, LocationSearchResult } from '../services/api';
 import { debounce } from 'lodash';
 import { fromLonLat } from 'ol/proj';
 import { Map } from 'ol';
 import { useAuth } from '../contexts/AuthContext'; // useAuth hook'unu import et
 import { usePlaneSocket } from '../hooks/usePlaneSocket'; // WebSocket hook'unu import et
+import { useCursorList } from '../hooks/useCursorList';
 
 interface VehicleDetailPanelProps {
     planeDetails: PlaneInfo;
@@ -36,11 +37,10 @@ const VehicleDetailPanel: React.FC<VehicleDetailPanelProps> = ({
     planeDetails, onClose, onToggleMapSelect, onSetCoords, selectedCoords, mapRef
 }) => {
     const { user } = useAuth(); // Get user information
-    const { sendJsonMessage } = usePlaneSocket(); // Get WebSocket sending function
+    const { sendJsonMessage, commandBatch } = usePlaneSocket(); // Get WebSocket sending function
     const [lat, setLat] = useState('');
     const [lon, setLon] = useState('');
     const [message, setMessage] = useState('');
-    const [commandHistory, setCommandHistory] = useState<Command[]>([]);
     const [inputMode, setInputMode] = useState<'none' | 'manual' | 'map' | 'search'>('none');
 
     const [searchTerm, setSearchTerm] = useState('');
@@ -103,19 +103,20 @@ const VehicleDetailPanel: React.FC<VehicleDetailPanelProps> = ({
     }, [searchTerm, debouncedSearch]);
 
 
-    useEffect(() => {
-        const fetchCommands = async () => {
-            if (!planeDetails) return;
-            try {
-                const response = await getCommandsForPlane(planeDetails.id);
-                setCommandHistory(response.data);
-            } catch (err) {
-                console.error("Failed to fetch command history:", err);
-            }
-        };
+    // The newest page of the plane's history; older commands are loaded on demand
+    const fetchCommandPage = useCallback(
+        (cursor: string | null) => getCommandPage({ plane: String(planeDetails.id) }, cursor),
+        [planeDetails.id]
+    );
+    const {
+        rows: commandHistory, hasMore, loadingMore, reload: reloadCommands, loadMore,
+    } = useCursorList<Command>(fetchCommandPage);
 
-        fetchCommands();
-    }, [planeDetails]);
+    // A bulk dispatch that includes this plane adds to its history
+    useEffect(() => {
+        if (!commandBatch?.some(command => command.plane === planeDetails.id)) return;
+        reloadCommands().catch(err => console.error("Failed to fetch command history:", err));
+    }, [commandBatch]);
 
     const handleClearCoords = () => {
         onSetCoords(null);
@@ -185,8 +186,7 @@ const VehicleDetailPanel: React.FC<VehicleDetailPanelProps> = ({
                 console.error("sendJsonMessage function is not available.");
             }
 
-            const commandsResponse = await getCommandsForPlane(planeDetails.id);
-            setCommandHistory(commandsResponse.data);
+            await reloadCommands();
             handleClearCoords();
             setMessage('');
             setInputMode('none');
@@ -521,6 +521,16 @@ const VehicleDetailPanel: React.FC<VehicleDetailPanelProps> = ({
                     ) : (
                         <p style={{ color: '#999', fontSize: '14px', textAlign: 'center' }}>No command history found for this aircraft.</p>
                     )}
+                    {hasMore && (
+                        <button
+                            type="button"
+                            onClick={() => loadMore().catch(err => console.error("Failed to fetch command history:", err))}
+                            disabled={loadingMore}
+                            style={{ ...utilityButtonStyle, width: '100%', marginTop: '12px', cursor: loadingMore ? 'default' : 'pointer' }}
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             </div>
         </div>
@@ -0,0 +1,43 @@
+import { useState, useEffect, useCallback } from 'react';
+import { cursorOf, type CursorPage } from '../services/api';
+
+/**
+ * Loads a cursor paginated list one page at a time: the first page on mount,
+ * the next one on `loadMore`. `setRows` updates loaded rows in place after an edit,
+ * so the pages already loaded are kept.
+ */
+export const useCursorList = <T>(fetchPage: (cursor: string | null) => Promise<{ data: CursorPage<T> }>) => {
+    const [rows, setRows] = useState<T[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [isLoading, setIsLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const reload = useCallback(async () => {
+        setIsLoading(true);
+        try {
+            const response = await fetchPage(null);
+            setRows(response.data.results);
+            setNextCursor(cursorOf(response.data.next));
+        } finally {
+            setIsLoading(false);
+        }
+    }, [fetchPage]);
+
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await fetchPage(nextCursor);
+            setRows(prevRows => [...prevRows, ...response.data.results]);
+            setNextCursor(cursorOf(response.data.next));
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    useEffect(() => {
+        reload().catch(error => console.error(error));
+    }, [reload]);
+
+    return { rows, setRows, hasMore: nextCursor !== null, isLoading, loadingMore, reload, loadMore };
+};
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { useAuth } from '../contexts/AuthContext';
+import { BINARY_SUBPROTOCOL, applyFrame, decodeFrame } from './fleetFrames';
 
 export type LocationPayload = {
     id: number;
@@ -19,8 +20,11 @@ const WEBSOCKET_URL = 'ws://localhost:8000/ws/fleet/';
 export const usePlaneSocket = () => {
     const { tokens } = useAuth();
     const socketRef = useRef<WebSocket | null>(null);
+    const positionsRef = useRef(new Map<number, LocationPayload>());
     const [planeLocations, setPlaneLocations] = useState<LocationPayload[]>([]);
     const [updatedCommand, setUpdatedCommand] = useState<CommandPayload | null>(null);
+    // Commands created together by a bulk dispatch arrive as one `command_batch`
+    const [commandBatch, setCommandBatch] = useState<CommandPayload[] | null>(null);
 
     const connect = useCallback(() => {
         const token = tokens?.access;
@@ -28,8 +32,11 @@ export const usePlaneSocket = () => {
             return;
         }
 
-        const socket = new WebSocket(`${WEBSOCKET_URL}?token=${token}`);
+        // Ask for binary delta frames; the server falls back to JSON if it does not support them.
+        const socket = new WebSocket(`${WEBSOCKET_URL}?token=${token}`, [BINARY_SUBPROTOCOL]);
+        socket.binaryType = 'arraybuffer';
         socketRef.current = socket;
+        positionsRef.current.clear();
 
         socket.onopen = () => console.log('Fleet WebSocket connected');
         socket.onclose = () => {
@@ -39,11 +46,21 @@ export const usePlaneSocket = () => {
         socket.onerror = (error) => console.error('WebSocket Error:', error);
 
         socket.onmessage = (event) => {
+            if (event.data instanceof ArrayBuffer) {
+                const frame = decodeFrame(event.data);
+                applyFrame(positionsRef.current, frame);
+                setPlaneLocations(Array.from(positionsRef.current.values()));
+                // Acknowledge so the next frame only carries planes that moved since this one
+                socket.send(JSON.stringify({ type: 'ack', seq: frame.seq }));
+                return;
+            }
             const data = JSON.parse(event.data);
             if (data.type === 'plane_locations') {
                 setPlaneLocations(data.data || []);
             } else if (data.type === 'command_update') {
                 setUpdatedCommand(data.data);
+            } else if (data.type === 'command_batch') {
+                setCommandBatch(data.data || []);
             }
         };
     }, [tokens]);
@@ -66,5 +83,5 @@ export const usePlaneSocket = () => {
         }
     }, []);
 
-    return { planeLocations, updatedCommand, sendJsonMessage };
+    return { planeLocations, updatedCommand, commandBatch, sendJsonMessage };
 };
\ No newline at end of file
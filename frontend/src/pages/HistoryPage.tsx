@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getCommands } from '../services/api';
+import { CommandFilters, cursorOf, getCommandPage } from '../services/api';
 import { io, Socket } from 'socket.io-client';
 import CommandDetailModal from '../components/CommandDetailModal';
 
@@ -17,47 +17,78 @@ interface Command {
 
 const HistoryPage: React.FC = () => {
     const navigate = useNavigate();
+    // Pages loaded so far for the current filters, newest first
     const [commands, setCommands] = useState<Command[]>([]);
-    const [filteredCommands, setFilteredCommands] = useState<Command[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [selectedCommand, setSelectedCommand] = useState<Command | null>(null);
     
     // Filter states
     const [pilotFilter, setPilotFilter] = useState('');
     const [planeFilter, setPlaneFilter] = useState('');
     const [statusFilter, setStatusFilter] = useState('all');
+    const [searchFilter, setSearchFilter] = useState('');
+    const [fromFilter, setFromFilter] = useState('');
+    const [toFilter, setToFilter] = useState('');
+
+    // Filtering happens on the server, so only one page is downloaded at a time
+    const filters: CommandFilters = {
+        pilot: pilotFilter.trim(),
+        plane: planeFilter.trim(),
+        status: statusFilter === 'all' ? '' : statusFilter,
+        search: searchFilter.trim(),
+        created_after: fromFilter ? new Date(fromFilter).toISOString() : '',
+        created_before: toFilter ? new Date(toFilter).toISOString() : '',
+    };
+    const filtersKey = JSON.stringify(filters);
 
     useEffect(() => {
-        // Fetch all commands initially
-        const fetchCommands = async () => {
+        // Debounced so typing in a filter does not send a request per key
+        let cancelled = false;
+        const timer = setTimeout(async () => {
             try {
-                const response = await getCommands();
-                // Sort commands from newest to oldest
-                const sortedCommands = response.data.sort((a: Command, b: Command) => 
-                    new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-                );
-                setCommands(sortedCommands);
+                const response = await getCommandPage(filters);
+                if (!cancelled) {
+                    setCommands(response.data.results);
+                    setNextCursor(cursorOf(response.data.next));
+                }
             } catch (error) {
                 console.error("Commands could not be fetched:", error);
             } finally {
-                setLoading(false);
+                if (!cancelled) setLoading(false);
             }
+        }, 300);
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
         };
-        fetchCommands();
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [filtersKey]);
+
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await getCommandPage(filters, nextCursor);
+            setCommands(prevCommands => [...prevCommands, ...response.data.results]);
+            setNextCursor(cursorOf(response.data.next));
+        } catch (error) {
+            console.error("Commands could not be fetched:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
+    useEffect(() => {
         // Connect to WebSocket for real-time updates
         const socket: Socket = io('http://localhost:4000');
         socket.on('command_update', (updatedCommand: Command) => {
             console.log('Command update received:', updatedCommand);
-            setCommands(prevCommands => {
-                const updatedCommands = prevCommands.map(cmd =>
-                    cmd.id === updatedCommand.id ? updatedCommand : cmd
-                );
-                // Also sort updated commands
-                return updatedCommands.sort((a, b) => 
-                    new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-                );
-            });
+            // Loaded commands are updated in place; the server keeps them newest first
+            setCommands(prevCommands => prevCommands.map(cmd =>
+                cmd.id === updatedCommand.id ? updatedCommand : cmd
+            ));
         });
 
         return () => {
@@ -65,34 +96,6 @@ const HistoryPage: React.FC = () => {
         };
     }, []);
 
-    // Filter commands based on criteria
-    useEffect(() => {
-        let filtered = commands;
-
-        if (pilotFilter) {
-            filtered = filtered.filter(cmd => 
-                cmd.pilot_id.toString().includes(pilotFilter)
-            );
-        }
-
-        if (planeFilter) {
-            filtered = filtered.filter(cmd => 
-                cmd.plane_id.toString().includes(planeFilter)
-            );
-        }
-
-        if (statusFilter !== 'all') {
-            filtered = filtered.filter(cmd => cmd.status === statusFilter);
-        }
-
-        // Also sort filtered commands from newest to oldest
-        const sortedFiltered = filtered.sort((a, b) => 
-            new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-        );
-
-        setFilteredCommands(sortedFiltered);
-    }, [commands, pilotFilter, planeFilter, statusFilter]);
-
     const getStatusBadge = (status: Command['status']) => {
         const baseStyle: React.CSSProperties = {
             padding: '6px 12px',
@@ -120,6 +123,23 @@ const HistoryPage: React.FC = () => {
         setPilotFilter('');
         setPlaneFilter('');
         setStatusFilter('all');
+        setSearchFilter('');
+        setFromFilter('');
+        setToFilter('');
+    };
+
+    const inputStyle: React.CSSProperties = {
+        padding: '10px 14px',
+        border: '1px solid #d1d5db',
+        borderRadius: '8px',
+        fontSize: '14px',
+        backgroundColor: 'white',
+        color: '#1e293b'
+    };
+    const labelStyle: React.CSSProperties = {
+        fontSize: '14px',
+        fontWeight: '600',
+        color: '#374151'
     };
 
     if (loading) {
@@ -286,6 +306,37 @@ const HistoryPage: React.FC = () => {
                             </select>
                         </div>
 
+                        <div style={{display: 'flex', flexDirection: 'column', gap: '6px'}}>
+                            <label style={labelStyle}>Message</label>
+                            <input
+                                type="text"
+                                placeholder="Search messages..."
+                                value={searchFilter}
+                                onChange={(e) => setSearchFilter(e.target.value)}
+                                style={{...inputStyle, width: '200px'}}
+                            />
+                        </div>
+
+                        <div style={{display: 'flex', flexDirection: 'column', gap: '6px'}}>
+                            <label style={labelStyle}>From</label>
+                            <input
+                                type="datetime-local"
+                                value={fromFilter}
+                                onChange={(e) => setFromFilter(e.target.value)}
+                                style={inputStyle}
+                            />
+                        </div>
+
+                        <div style={{display: 'flex', flexDirection: 'column', gap: '6px'}}>
+                            <label style={labelStyle}>To</label>
+                            <input
+                                type="datetime-local"
+                                value={toFilter}
+                                onChange={(e) => setToFilter(e.target.value)}
+                                style={inputStyle}
+                            />
+                        </div>
+
                         <button
                             onClick={clearFilters}
                             style={{
@@ -338,7 +389,7 @@ const HistoryPage: React.FC = () => {
                             margin: '0 0 4px 0',
                             fontWeight: '600'
                         }}>
-                            Total Commands
+                            Loaded Commands
                         </p>
                         <p style={{
                             fontSize: '24px', 
@@ -362,7 +413,7 @@ const HistoryPage: React.FC = () => {
                             margin: '0 0 4px 0',
                             fontWeight: '600'
                         }}>
-                            Filtered Results
+                            More Results
                         </p>
                         <p style={{
                             fontSize: '24px', 
@@ -370,7 +421,7 @@ const HistoryPage: React.FC = () => {
                             color: '#3b82f6', 
                             margin: 0
                         }}>
-                            {filteredCommands.length}
+                            {nextCursor ? 'Yes' : 'No'}
                         </p>
                     </div>
                 </div>
@@ -394,11 +445,11 @@ const HistoryPage: React.FC = () => {
                             color: '#1e293b',
                             margin: 0
                         }}>
-                            Commands ({filteredCommands.length})
+                            Commands ({commands.length}{nextCursor ? '+' : ''})
                         </h3>
                     </div>
                     
-                    {filteredCommands.length === 0 ? (
+                    {commands.length === 0 ? (
                         <div style={{
                             padding: '48px 24px',
                             textAlign: 'center',
@@ -502,11 +553,11 @@ const HistoryPage: React.FC = () => {
                     </tr>
                 </thead>
                 <tbody>
-                                    {filteredCommands.map((cmd, index) => (
+                                    {commands.map((cmd, index) => (
                         <tr 
                             key={cmd.id} 
                                             style={{
-                                                borderBottom: index < filteredCommands.length - 1 ? '1px solid #e2e8f0' : 'none',
+                                                borderBottom: index < commands.length - 1 ? '1px solid #e2e8f0' : 'none',
                                                 cursor: 'pointer',
                                                 transition: 'background-color 0.2s'
                                             }}
@@ -577,6 +628,26 @@ const HistoryPage: React.FC = () => {
             </table>
                         </div>
                     )}
+                    {nextCursor && (
+                        <div style={{padding: '16px', textAlign: 'center', borderTop: '1px solid #e2e8f0'}}>
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                style={{
+                                    padding: '10px 16px',
+                                    backgroundColor: '#3b82f6',
+                                    color: 'white',
+                                    border: 'none',
+                                    borderRadius: '8px',
+                                    fontSize: '14px',
+                                    fontWeight: '600',
+                                    cursor: loadingMore ? 'default' : 'pointer'
+                                }}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
             
@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { 
-    getManagementPlanes, 
+    getManagementPlanePage, 
     getPilots, 
     assignPilotToPlane, 
     unassignPilotFromPlane,
@@ -9,6 +9,7 @@ import {
     type Pilot 
 } from '../../services/api';
 import { toast } from 'react-hot-toast';
+import { useCursorList } from '../../hooks/useCursorList';
 
 const PilotAssignModal: React.FC<{
     pilots: Pilot[];
@@ -50,28 +51,22 @@ const PilotAssignModal: React.FC<{
 
 
 const PlaneManagementPage: React.FC = () => {
-    const [planes, setPlanes] = useState<ManagementPlane[]>([]);
+    // Pages are loaded on demand; edits update the loaded rows in place
+    const { rows: planes, setRows: setPlanes, hasMore, isLoading, loadingMore, loadMore } = useCursorList(getManagementPlanePage);
     const [availablePilots, setAvailablePilots] = useState<Pilot[]>([]);
-    const [isLoading, setIsLoading] = useState(true);
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [selectedPlane, setSelectedPlane] = useState<ManagementPlane | null>(null);
 
-    const fetchPlanes = async () => {
-        setIsLoading(true);
-        try {
-            const planesRes = await getManagementPlanes();
-            setPlanes(planesRes.data);
-        } catch (error) {
-                            toast.error("An error occurred while fetching aircraft data.");
-            console.error(error);
-        } finally {
-            setIsLoading(false);
-        }
+    const replacePlane = (updated: ManagementPlane) => {
+        setPlanes(prevPlanes => prevPlanes.map(plane => plane.id === updated.id ? updated : plane));
     };
 
-    useEffect(() => {
-        fetchPlanes();
-    }, []);
+    const handleLoadMore = () => {
+        loadMore().catch(error => {
+            toast.error("An error occurred while fetching aircraft data.");
+            console.error(error);
+        });
+    };
     
     const handleOpenModal = async (plane: ManagementPlane) => {
         try {
@@ -95,9 +90,9 @@ const PlaneManagementPage: React.FC = () => {
         if (!selectedPlane) return;
         
         try {
-            await assignPilotToPlane(selectedPlane.id, pilotId);
+            const response = await assignPilotToPlane(selectedPlane.id, pilotId);
             toast.success('Pilot successfully assigned.');
-                            fetchPlanes(); // Refresh the table by fetching data again
+            replacePlane(response.data);
         } catch (error) {
                             toast.error('An error occurred while assigning the pilot.');
         } finally {
@@ -108,9 +103,9 @@ const PlaneManagementPage: React.FC = () => {
     const handleUnassignPilot = async (plane: ManagementPlane) => {
         if (window.confirm(`Are you sure you want to remove the pilot from aircraft with tail number '${plane.tail_number}'?`)) {
             try {
-                await unassignPilotFromPlane(plane.id);
+                const response = await unassignPilotFromPlane(plane.id);
                 toast.success('Pilot assignment successfully removed.');
-                fetchPlanes();
+                replacePlane(response.data);
             } catch (error) {
                 toast.error('An error occurred while removing the pilot assignment.');
             }
@@ -122,7 +117,7 @@ const PlaneManagementPage: React.FC = () => {
             try {
                 await deletePlane(plane.id);
                 toast.success('Aircraft successfully deleted.');
-                fetchPlanes();
+                setPlanes(prevPlanes => prevPlanes.filter(p => p.id !== plane.id));
             } catch (error) {
                 toast.error('An error occurred while deleting the aircraft.');
             }
@@ -204,6 +199,13 @@ const PlaneManagementPage: React.FC = () => {
                         ))}
                     </tbody>
                 </table>
+                {hasMore && (
+                    <div style={{ padding: '16px', textAlign: 'center', borderTop: '1px solid #e2e8f0' }}>
+                        <button style={actionButtonStyle} onClick={handleLoadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {isModalOpen && selectedPlane && (
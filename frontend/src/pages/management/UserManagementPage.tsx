@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import {
-    getUsers,
+    getUserPage,
     createUser,
     updateUser,
     deleteUser,
@@ -9,29 +9,20 @@ import {
     type UserPayload
 } from '../../services/api';
 import { toast } from 'react-hot-toast';
+import { useCursorList } from '../../hooks/useCursorList';
 import UserFormModal from './UserFormModal'; // Modal bileşenini import et
 
 const UserManagementPage: React.FC = () => {
-    const [users, setUsers] = useState<AdminUser[]>([]);
-    const [isLoading, setIsLoading] = useState(true);
+    // Pages are loaded on demand; edits update the loaded rows in place
+    const { rows: users, setRows: setUsers, hasMore, isLoading, loadingMore, reload, loadMore } = useCursorList(getUserPage);
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [editingUser, setEditingUser] = useState<AdminUser | null>(null);
 
-    useEffect(() => {
-        fetchUsers();
-    }, []);
-
-    const fetchUsers = async () => {
-        setIsLoading(true);
-        try {
-            const response = await getUsers();
-            setUsers(response.data);
-        } catch (error) {
+    const handleLoadMore = () => {
+        loadMore().catch(error => {
             toast.error('An error occurred while fetching users.');
             console.error(error);
-        } finally {
-            setIsLoading(false);
-        }
+        });
     };
 
     const handleOpenModal = (user: AdminUser | null) => {
@@ -48,14 +39,16 @@ const UserManagementPage: React.FC = () => {
         try {
             if (userId) {
                 // Update user
-                await updateUser(userId, userData);
+                const response = await updateUser(userId, userData);
                 toast.success('User successfully updated.');
+                setUsers(prevUsers => prevUsers.map(user => user.id === userId ? { ...user, ...response.data } : user));
             } else {
                 // Create new user
                 await createUser(userData);
                 toast.success('User successfully created.');
+                // New users are listed by id, so the list starts over
+                reload().catch(error => console.error(error));
             }
-            fetchUsers(); // Refresh the list
         } catch (error: any) {
             const errorMsg = error.response?.data?.username?.[0] || 'An error occurred.';
             toast.error(`Save failed: ${errorMsg}`);
@@ -69,7 +62,7 @@ const UserManagementPage: React.FC = () => {
             try {
                 await deleteUser(userId);
                 toast.success('User successfully deleted.');
-                fetchUsers(); // Refresh the list
+                setUsers(prevUsers => prevUsers.filter(user => user.id !== userId));
             } catch (error) {
                 toast.error('An error occurred while deleting the user.');
             }
@@ -237,6 +230,13 @@ const UserManagementPage: React.FC = () => {
                         ))}
                     </tbody>
                 </table>
+                {hasMore && (
+                    <div style={{ padding: '16px', textAlign: 'center', borderTop: '1px solid #e2e8f0' }}>
+                        <button style={{ ...actionButtonStyle, backgroundColor: '#3b82f6', color: 'white' }} onClick={handleLoadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    </div>
+                )}
             </div>
 
             {isModalOpen && (
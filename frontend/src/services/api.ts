@@ -18,6 +18,21 @@ export const clearAuthHeader = () => {
 
 // We remove interceptor because we will move this logic to AuthContext.
 
+// Shape of the backend's cursor paginated list responses
+export interface CursorPage<T> {
+    next: string | null;
+    previous: string | null;
+    results: T[];
+}
+
+// The cursor of a page's `next` link, null on the last page
+export const cursorOf = (next: string | null) => next ? new URL(next).searchParams.get('cursor') : null;
+
+// One cursor page of a paginated list endpoint
+export const getPage = <T = any>(url: string, params: Record<string, unknown> = {}, cursor: string | null = null) => {
+    return apiClient.get<CursorPage<T>>(url, { params: cursor ? { ...params, cursor } : params });
+};
+
 export interface LocationSearchResult {
     place_id: number;
     lat: string;
@@ -60,12 +75,32 @@ export const sendCommand = (commandData: CommandPayload) => {
   return apiClient.post('/fleet/commands/', commandData);
 };
 
-export const getCommands = () => {
-  return apiClient.get('/fleet/commands/');
+// Server-side command history filters; ids may be comma separated
+export interface CommandFilters {
+  status?: string;
+  pilot?: string;
+  plane?: string;
+  search?: string; // full-text search on the message
+  created_after?: string; // ISO 8601
+  created_before?: string; // ISO 8601
+  bbox?: string; // min_lon,min_lat,max_lon,max_lat around the target location
+}
+
+// One cursor page of the filtered command history, newest first
+export const getCommandPage = (filters: CommandFilters = {}, cursor: string | null = null) => {
+  const params = Object.fromEntries(Object.entries(filters).filter(([, value]) => value));
+  return getPage('/fleet/commands/', params, cursor);
 };
 
-export const getCommandsForPlane = (planeId: number) => {
-  return apiClient.get(`/fleet/commands/?plane_id=${planeId}`);
+export interface TrackParams {
+  from?: string; // ISO 8601, defaults to one hour before `to`
+  to?: string; // ISO 8601, defaults to now
+  tolerance?: number; // simplification tolerance in meters
+}
+
+// GeoJSON LineString feature of the plane's recorded track, simplified server-side
+export const getPlaneTrack = (planeId: number, params: TrackParams = {}) => {
+  return apiClient.get(`/fleet/planes/${planeId}/track/`, { params });
 };
 
 // --- Fleet Management API ---
@@ -84,8 +119,9 @@ export interface Pilot {
     callSign: string;
 }
 
-export const getManagementPlanes = () => {
-    return apiClient.get<ManagementPlane[]>('/fleet/planes/management-list/');
+// One cursor page of the management list, by id
+export const getManagementPlanePage = (cursor: string | null = null) => {
+    return getPage<ManagementPlane>('/fleet/planes/management-list/', {}, cursor);
 };
 
 export const getPilots = (for_plane_id?: number) => {
@@ -95,12 +131,12 @@ export const getPilots = (for_plane_id?: number) => {
 };
 
 export const assignPilotToPlane = (planeId: number, pilotId: number) => {
-    return apiClient.patch(`/fleet/planes/${planeId}/`, { pilot_id: pilotId });
+    return apiClient.patch<ManagementPlane>(`/fleet/planes/${planeId}/`, { pilot_id: pilotId });
 };
 
 export const unassignPilotFromPlane = (planeId: number) => {
     // We send pilot_id as null to unassign the pilot
-    return apiClient.patch(`/fleet/planes/${planeId}/`, { pilot_id: null });
+    return apiClient.patch<ManagementPlane>(`/fleet/planes/${planeId}/`, { pilot_id: null });
 };
 
 export const deletePlane = (planeId: number) => {
@@ -133,8 +169,9 @@ export interface UserPayload {
 }
 
 
-export const getUsers = () => {
-    return apiClient.get<AdminUser[]>('/fleet/users/');
+// One cursor page of the user list, by id
+export const getUserPage = (cursor: string | null = null) => {
+    return getPage<AdminUser>('/fleet/users/', {}, cursor);
 };
 
 export const createUser = (userData: UserPayload) => {
@@ -0,0 +1,63 @@
+// Decoder for the binary position frames sent by the fleet WebSocket
+// (see corebackend/fleet/frames.py for the layout).
+
+export const BINARY_SUBPROTOCOL = 'fleet.binary.v1';
+
+const COORD_SCALE = 1_000_000;
+const HEADER_BYTES = 16;
+const FLAG_KEYFRAME = 1;
+
+export type PositionFrame = {
+    seq: number;
+    keyframe: boolean;
+    ids: Int32Array;
+    lon: Int32Array;
+    lat: Int32Array;
+    bearing: Float32Array;
+    removed: Int32Array;
+};
+
+export const decodeFrame = (buffer: ArrayBuffer): PositionFrame => {
+    const view = new DataView(buffer);
+    const flags = view.getUint16(2, true);
+    const seq = view.getUint32(4, true);
+    const count = view.getUint32(8, true);
+    const removedCount = view.getUint32(12, true);
+
+    let offset = HEADER_BYTES;
+    const next = <T>(Type: new (b: ArrayBuffer, o: number, l: number) => T, length: number): T => {
+        const array = new Type(buffer, offset, length);
+        offset += length * 4;
+        return array;
+    };
+
+    return {
+        seq,
+        keyframe: (flags & FLAG_KEYFRAME) !== 0,
+        ids: next(Int32Array, count),
+        lon: next(Int32Array, count),
+        lat: next(Int32Array, count),
+        bearing: next(Float32Array, count),
+        removed: next(Int32Array, removedCount),
+    };
+};
+
+/**
+ * Applies a frame to the positions kept by the client, keyed by plane id.
+ */
+export const applyFrame = <T extends { id: number; coordinates: [number, number]; bearing: number }>(
+    positions: Map<number, T>,
+    frame: PositionFrame,
+) => {
+    if (frame.keyframe) {
+        positions.clear();
+    }
+    frame.removed.forEach((id) => positions.delete(id));
+    for (let i = 0; i < frame.ids.length; i++) {
+        positions.set(frame.ids[i], {
+            id: frame.ids[i],
+            coordinates: [frame.lon[i] / COORD_SCALE, frame.lat[i] / COORD_SCALE],
+            bearing: frame.bearing[i],
+        } as T);
+    }
+};
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { Command } from '../types'; // Will be added
+import { BINARY_SUBPROTOCOL, applyFrame, decodeFrame } from './fleetFrames';
 
 // Match the web app's location data structure
 interface LocationData {
@@ -17,7 +18,10 @@ export const useFleetSocket = () => {
     const { token } = useAuth();
     const [planeLocations, setPlaneLocations] = useState<LocationData[]>([]);
     const [incomingCommand, setIncomingCommand] = useState<Command | null>(null);
+    // Bulk dispatches reach every pilot as one `command_batch`; screens pick their own command
+    const [commandBatch, setCommandBatch] = useState<Command[] | null>(null);
     const socketRef = useRef<WebSocket | null>(null);
+    const positionsRef = useRef(new Map<number, LocationData>());
 
     useEffect(() => {
         if (!token) {
@@ -27,14 +31,24 @@ export const useFleetSocket = () => {
 
         const connect = () => {
             // Append token for authentication if your backend expects it
-            const socket = new WebSocket(`${WS_URL}?token=${token}`);
+            // Binary delta frames keep the cellular traffic down; JSON is still understood as a fallback
+            const socket = new WebSocket(`${WS_URL}?token=${token}`, [BINARY_SUBPROTOCOL]);
+            socket.binaryType = 'arraybuffer';
             socketRef.current = socket;
+            positionsRef.current.clear();
 
             socket.onopen = () => {
                 console.log('Fleet WebSocket connected');
             };
 
             socket.onmessage = (event) => {
+                if (event.data instanceof ArrayBuffer) {
+                    const frame = decodeFrame(event.data);
+                    applyFrame(positionsRef.current, frame);
+                    setPlaneLocations(Array.from(positionsRef.current.values()));
+                    socket.send(JSON.stringify({ type: 'ack', seq: frame.seq }));
+                    return;
+                }
                 const data = JSON.parse(event.data);
                 
                 if (data.type === 'plane_locations') {
@@ -44,6 +58,8 @@ export const useFleetSocket = () => {
                 } else if (data.type === 'command_notification') {
                     console.log('[useFleetSocket] Received new command:', JSON.stringify(data.command, null, 2));
                     setIncomingCommand(data.command);
+                } else if (data.type === 'command_batch') {
+                    setCommandBatch(data.data || []);
                 }
             };
 
@@ -67,5 +83,5 @@ export const useFleetSocket = () => {
         };
     }, [token]);
 
-    return { planeLocations, incomingCommand, setIncomingCommand };
+    return { planeLocations, incomingCommand, setIncomingCommand, commandBatch };
 }; 
\ No newline at end of file
@@ -11,7 +11,7 @@ import CommandHistorySheet from '../components/CommandHistorySheet';
 
 const MapScreen = () => {
   const { user, logout } = useAuth();
-  const { planeLocations, incomingCommand, setIncomingCommand } = useFleetSocket();
+  const { planeLocations, incomingCommand, setIncomingCommand, commandBatch } = useFleetSocket();
   const [planes, setPlanes] = useState<Plane[]>([]);
   const [isLoading, setIsLoading] = useState(true); // Loading state
   const [selectedPlane, setSelectedPlane] = useState<Plane | null>(null); // Hangi uçağın seçildiğini tutar
@@ -154,6 +154,14 @@ const MapScreen = () => {
     });
   }, [planeLocations]);
 
+  // A bulk dispatch carries every pilot's command; show the one for our plane
+  useEffect(() => {
+    if (!commandBatch || !user) return;
+    const myPlane = planes.find(p => p.pilot?.id === user.id);
+    const command = myPlane && commandBatch.find(c => c.plane === myPlane.id);
+    if (command) setIncomingCommand(command);
+  }, [commandBatch]);
+
   // Animate map to pilot's plane if tracking is enabled
   useEffect(() => {
     if (!user || planes.length === 0 || !isTracking) return;
@@ -20,8 +20,31 @@ export const getPlanes = () => {
     return api.get('/fleet/planes/');
 };
 
+// Shape of the backend's cursor paginated list responses
+interface CursorPage<T> {
+    next: string | null;
+    previous: string | null;
+    results: T[];
+}
+
+// The server's max_page_size for cursor paginated lists
+const MAX_PAGE_SIZE = 1000;
+
+/** Follows every cursor page of a paginated list endpoint and returns all rows as `{ data }`. */
+const getAllPages = async <T = any>(url: string): Promise<{ data: T[] }> => {
+    const rows: T[] = [];
+    let cursor: string | null = null;
+    do {
+        const params = { page_size: MAX_PAGE_SIZE };
+        const response = await api.get<CursorPage<T>>(url, { params: cursor ? { ...params, cursor } : params });
+        rows.push(...response.data.results);
+        cursor = response.data.next ? new URL(response.data.next).searchParams.get('cursor') : null;
+    } while (cursor);
+    return { data: rows };
+};
+
 export const getMyCommands = () => {
-    return api.get('/fleet/commands/my-commands/');
+    return getAllPages('/fleet/commands/my-commands/');
 };
 
 export const updateCommandStatus = (commandId: number, status: 'accepted' | 'rejected' | 'completed') => {